@@ -0,0 +1,101 @@
+import dask
+
+from benchmarks import parameterized
+from benchmarks.products import clear_caches, filesystems, product_path, product_url
+from safe_rcm.api import open_rcm
+from safe_rcm.imagery import default_tile_cache
+from safe_rcm.tiles import iter_tiles
+
+
+class OpenRcm:
+    number = 1
+    repeat = 5
+
+    @parameterized(
+        ["filesystem", "n_poles", "shape"],
+        [filesystems, [2, 4], [(512, 512), (4096, 4096)]],
+    )
+    def setup(self, filesystem, n_poles, shape):
+        poles = ("HH", "HV", "VV", "VH")[:n_poles]
+        path = product_path(poles=poles, shape=shape)
+
+        self.url, self.storage_options = product_url(filesystem, path)
+        clear_caches()
+
+    def time_open_rcm(self, filesystem, n_poles, shape):
+        open_rcm(self.url, backend_kwargs={"storage_options": self.storage_options})
+
+    def time_open_rcm_load(self, filesystem, n_poles, shape):
+        # include reading a single tile of each image
+        tree = open_rcm(
+            self.url, backend_kwargs={"storage_options": self.storage_options}
+        )
+        tree["imagery/band_data"].isel(y=slice(256), x=slice(256)).load()
+
+
+class OpenRcmMemory:
+    @parameterized(["dtype_policy"], [[None, "compact"]])
+    def setup(self, dtype_policy):
+        path = product_path(
+            poles=("HH", "HV", "VV", "VH"), lut_length=4096, tie_points=(64, 64)
+        )
+
+        self.url, self.storage_options = product_url("local", path)
+        clear_caches()
+
+    def track_nbytes(self, dtype_policy):
+        tree = open_rcm(self.url, dtype_policy=dtype_policy).load()
+
+        return sum(node.to_dataset(inherit=False).nbytes for node in tree.subtree)
+
+    track_nbytes.unit = "bytes"
+
+
+class ReadImagery:
+    number = 1
+    repeat = 5
+
+    @parameterized(["filesystem", "tile_cache"], [filesystems, [False, True]])
+    def setup(self, filesystem, tile_cache):
+        path = product_path(poles=("HH", "HV"), shape=(4096, 4096))
+
+        self.url, self.storage_options = product_url(filesystem, path)
+        clear_caches()
+        default_tile_cache.clear()
+
+    def time_read_imagery(self, filesystem, tile_cache):
+        tree = open_rcm(
+            self.url,
+            backend_kwargs={"storage_options": self.storage_options},
+            tile_cache=tile_cache,
+            chunks={"y": 1024, "x": 1024},
+        )
+        with dask.config.set(scheduler="threads", num_workers=8):
+            tree["imagery/band_data"].load()
+
+
+class IterTiles:
+    number = 1
+    repeat = 5
+
+    @parameterized(["filesystem", "prefetch"], [filesystems, [0, 2]])
+    def setup(self, filesystem, prefetch):
+        path = product_path(poles=("HH", "HV"), shape=(4096, 4096))
+
+        self.url, self.storage_options = product_url(filesystem, path)
+        clear_caches()
+
+    def _consume(self, prefetch):
+        tree = open_rcm(
+            self.url, backend_kwargs={"storage_options": self.storage_options}
+        )
+        for tile in iter_tiles(
+            tree, size=(512, 512), calibrate="Sigma Nought", prefetch=prefetch
+        ):
+            pass
+
+    def time_iter_tiles(self, filesystem, prefetch):
+        self._consume(prefetch)
+
+    def peakmem_iter_tiles(self, filesystem, prefetch):
+        self._consume(prefetch)
@@ -0,0 +1,57 @@
+import os
+
+from benchmarks import parameterized
+from benchmarks.products import clear_caches, filesystems, product_path, product_url
+from safe_rcm.api import open_rcm
+from safe_rcm.calibrations import calibrate
+from safe_rcm.export import open_zarr, to_zarr
+
+window = {"y": slice(1024, 1536), "x": slice(1024, 1536)}
+
+
+def exported_path(path):
+    """export a product to zarr, unless it was already exported"""
+    store = path + ".zarr"
+    if not os.path.exists(os.path.join(store, ".zmetadata")):
+        to_zarr(open_rcm(path), store, calibration="Sigma Nought", resume=False)
+
+    return store
+
+
+class ReadExported:
+    """compare reading the exported zarr store with the GeoTIFF and XML files"""
+
+    number = 1
+    repeat = 5
+
+    @parameterized(["filesystem", "format"], [filesystems, ["safe", "zarr"]])
+    def setup(self, filesystem, format):
+        path = product_path(poles=("HH", "HV"), shape=(4096, 4096))
+        if format == "zarr":
+            path = exported_path(path)
+
+        self.url, self.storage_options = product_url(filesystem, path)
+        clear_caches()
+
+    def open(self, format):
+        if format == "zarr":
+            return open_zarr(self.url, storage_options=self.storage_options)
+
+        return open_rcm(
+            self.url, backend_kwargs={"storage_options": self.storage_options}
+        )
+
+    def time_open(self, filesystem, format):
+        self.open(format)
+
+    def time_read_window(self, filesystem, format):
+        tree = self.open(format)
+        tree["imagery/band_data"].isel(window).load()
+
+    def time_read_calibrated(self, filesystem, format):
+        tree = self.open(format)
+        if format == "zarr":
+            sigma0 = tree["imagery/sigma0"]
+        else:
+            sigma0 = calibrate(tree, "Sigma Nought")
+        sigma0.isel(window).load()
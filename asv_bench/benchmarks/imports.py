@@ -0,0 +1,17 @@
+class Import:
+    """import time of the package, measured in a fresh interpreter
+
+    Check which modules are responsible using ``python -X importtime``.
+    """
+
+    def timeraw_import_safe_rcm(self):
+        return "import safe_rcm"
+
+    def timeraw_import_manifest(self):
+        return "from safe_rcm.manifest import read_manifest"
+
+    def timeraw_import_backend(self):
+        return "import safe_rcm.backend", "import xarray"
+
+    def timeraw_import_api(self):
+        return "import safe_rcm.api"
@@ -0,0 +1,22 @@
+from benchmarks import parameterized
+from benchmarks.products import (
+    clear_caches,
+    filesystems,
+    product_mapper,
+    product_path,
+)
+from safe_rcm.manifest import read_manifest
+
+
+class ReadManifest:
+    number = 1
+    repeat = 10
+
+    @parameterized(["filesystem", "n_poles"], [filesystems, [1, 2, 4]])
+    def setup(self, filesystem, n_poles):
+        poles = ("HH", "HV", "VV", "VH")[:n_poles]
+        self.mapper = product_mapper(filesystem, product_path(poles=poles))
+        clear_caches()
+
+    def time_read_manifest(self, filesystem, n_poles):
+        read_manifest(self.mapper, "manifest.safe")
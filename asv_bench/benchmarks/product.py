@@ -0,0 +1,80 @@
+import xarray as xr
+
+from benchmarks import parameterized
+from benchmarks.products import (
+    clear_caches,
+    filesystems,
+    product_mapper,
+    product_path,
+)
+from safe_rcm.calibrations import read_lookup_tables, read_noise_levels
+from safe_rcm.product.reader import read_product
+from safe_rcm.tests.synthetic import calibration_types
+
+
+class ReadProduct:
+    number = 1
+    repeat = 5
+
+    @parameterized(
+        ["filesystem", "size"],
+        [filesystems, ["small", "large"]],
+    )
+    def setup(self, filesystem, size):
+        if size == "small":
+            params = {"n_bursts": 4, "tie_points": (8, 8), "n_state_vectors": 16}
+        else:
+            params = {"n_bursts": 32, "tie_points": (64, 64), "n_state_vectors": 256}
+
+        self.mapper = product_mapper(filesystem, product_path(poles=("HH",), **params))
+        clear_caches()
+
+    def time_read_product(self, filesystem, size):
+        read_product(self.mapper, "metadata/product.xml")
+
+
+class ReadNoiseLevels:
+    number = 1
+    repeat = 5
+
+    @parameterized(
+        ["filesystem", "n_poles", "lut_length", "n_beams"],
+        [filesystems, [1, 4], [64, 4096], [1, 8]],
+    )
+    def setup(self, filesystem, n_poles, lut_length, n_beams):
+        poles = ("HH", "HV", "VV", "VH")[:n_poles]
+        path = product_path(poles=poles, lut_length=lut_length, n_beams=n_beams)
+
+        self.mapper = product_mapper(filesystem, path)
+        self.fnames = xr.Variable("pole", [f"noiseLevels_{pole}.xml" for pole in poles])
+        clear_caches()
+
+    def time_read_noise_levels(self, filesystem, n_poles, lut_length, n_beams):
+        read_noise_levels(self.mapper, "metadata/calibration", self.fnames)
+
+
+class ReadLookupTables:
+    number = 1
+    repeat = 5
+
+    @parameterized(
+        ["filesystem", "n_poles", "lut_length"],
+        [filesystems, [1, 4], [64, 4096]],
+    )
+    def setup(self, filesystem, n_poles, lut_length):
+        poles = ("HH", "HV", "VV", "VH")[:n_poles]
+        path = product_path(poles=poles, lut_length=lut_length)
+
+        self.mapper = product_mapper(filesystem, path)
+        self.fnames = xr.DataArray(
+            [[f"lut{name}_{pole}.xml" for pole in poles] for name in calibration_types],
+            dims=["sarCalibrationType", "pole"],
+            coords={
+                "sarCalibrationType": list(calibration_types.values()),
+                "pole": list(poles),
+            },
+        )
+        clear_caches()
+
+    def time_read_lookup_tables(self, filesystem, n_poles, lut_length):
+        read_lookup_tables(self.mapper, "metadata/calibration", self.fnames)
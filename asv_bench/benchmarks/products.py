@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+import fsspec
+
+from safe_rcm import xml
+from safe_rcm.tests.synthetic import generate_product
+
+# the generated products are reused between benchmark processes
+product_root = os.path.join(tempfile.gettempdir(), "safe-rcm-benchmarks")
+
+filesystems = ["local", "latency"]
+
+# latency of each request of the simulated remote filesystem, in seconds
+request_latency = 0.005
+
+
+def product_name(params):
+    def format_value(value):
+        if isinstance(value, tuple):
+            return "x".join(map(str, value))
+
+        return str(value)
+
+    return "RCM_" + "_".join(
+        f"{name}-{format_value(value)}" for name, value in sorted(params.items())
+    )
+
+
+def product_path(**params):
+    """generate a synthetic product, unless it already exists"""
+    path = os.path.join(product_root, product_name(params))
+    if not os.path.exists(os.path.join(path, "manifest.safe")):
+        generate_product(path, **params)
+
+    return path
+
+
+def product_url(filesystem, path):
+    if filesystem == "local":
+        return path, {}
+
+    return f"latency://{path}", {"delay": request_latency}
+
+
+def product_mapper(filesystem, path):
+    url, storage_options = product_url(filesystem, path)
+
+    return fsspec.get_mapper(url, **storage_options)
+
+
+def clear_caches():
+    """clear the caches, such that every run measures a cold read"""
+    xml.document_cache.clear()
+    with xml._schemas_lock:
+        xml._schemas.clear()
@@ -0,0 +1,113 @@
+import contextlib
+
+import numpy as np
+from tlz.dicttoolz import merge_with
+
+from benchmarks import parameterized
+from safe_rcm.product import predicates, transformers
+
+
+def nested_array(n_records):
+    # similar in structure to the lookup table and noise level entries
+    return [
+        {
+            "@beam": "S1",
+            "@pole": "HH",
+            "@index": index,
+            "$": float(index) * 0.5,
+        }
+        for index in range(n_records)
+    ]
+
+
+def nested_dataset(n_records):
+    return [
+        {
+            "@beam": "S1",
+            "@index": index,
+            "value": {"$": float(index), "@units": "dB"},
+            "count": {"$": index, "@units": "1"},
+        }
+        for index in range(n_records)
+    ]
+
+
+def reference_is_attr(column):
+    return np.unique(column).size == 1
+
+
+class Columns:
+    @parameterized(["n_records"], [[1_000, 10_000, 100_000]])
+    def setup(self, n_records):
+        self.records = nested_array(n_records)
+
+    def time_merge_with(self, n_records):
+        merge_with(list, *self.records)
+
+    def time_to_columns(self, n_records):
+        transformers.to_columns(self.records)
+
+
+class Squeeze:
+    @parameterized(["n_records"], [[1_000, 10_000, 100_000]])
+    def setup(self, n_records):
+        self.column = [[[value]] for value in range(n_records)]
+
+    def time_np_squeeze(self, n_records):
+        np.squeeze(self.column)
+
+    def time_squeeze_column(self, n_records):
+        transformers.squeeze_column(self.column)
+
+
+class IsAttr:
+    @parameterized(
+        ["n_records", "kind"], [[1_000, 10_000, 100_000], ["constant", "index"]]
+    )
+    def setup(self, n_records, kind):
+        if kind == "constant":
+            self.column = np.full(n_records, "S1")
+        else:
+            self.column = np.arange(n_records)[::-1]
+
+    def time_unique(self, n_records, kind):
+        reference_is_attr(self.column)
+
+    def time_is_attr(self, n_records, kind):
+        predicates.is_attr(self.column)
+
+
+class ExtractNested:
+    @parameterized(["n_records"], [[1_000, 10_000, 100_000]])
+    def setup(self, n_records):
+        self.array = nested_array(n_records)
+        self.dataset = nested_dataset(n_records)
+
+    def time_extract_nested_array(self, n_records):
+        transformers.extract_nested_array(self.array)
+
+    def time_extract_nested_dataset(self, n_records):
+        transformers.extract_nested_dataset(self.dataset)
+
+
+class Classify:
+    @parameterized(["cached"], [[False, True]])
+    def setup(self, cached):
+        self.obj = {
+            f"entry{index}": [
+                {"@beam": "S1", "value": [{"@units": "dB", "$": value}]}
+                for value in range(100)
+            ]
+            for index in range(100)
+        }
+        self.context = (
+            predicates.classification_cache if cached else contextlib.nullcontext
+        )
+
+    def time_predicates(self, cached):
+        with self.context():
+            for _ in range(5):
+                for value in self.obj.values():
+                    predicates.is_nested_array(value)
+                    predicates.is_nested_dataset(value)
+                    predicates.is_scalar_valued(value)
@@ -0,0 +1,59 @@
+from benchmarks import parameterized
+from benchmarks.products import (
+    clear_caches,
+    filesystems,
+    product_mapper,
+    product_path,
+)
+from safe_rcm.xml import open_schema, read_xml
+
+
+class ReadXml:
+    number = 1
+    repeat = 10
+
+    @parameterized(
+        ["filesystem", "path", "schema_cached"],
+        [
+            filesystems,
+            [
+                "metadata/product.xml",
+                "metadata/calibration/lutSigma_HH.xml",
+                "metadata/calibration/noiseLevels_HH.xml",
+            ],
+            [False, True],
+        ],
+    )
+    def setup(self, filesystem, path, schema_cached):
+        self.mapper = product_mapper(filesystem, product_path(poles=("HH",)))
+
+        clear_caches()
+        if schema_cached:
+            # only measure reading and decoding the document
+            read_xml(self.mapper, path)
+
+    def time_read_xml(self, filesystem, path, schema_cached):
+        read_xml(self.mapper, path)
+
+
+class OpenSchema:
+    number = 1
+    repeat = 10
+
+    @parameterized(
+        ["filesystem", "schema"],
+        [
+            filesystems,
+            [
+                "support/schemas/rcm_prod_product.xsd",
+                "support/schemas/rcm_prod_lut.xsd",
+                "support/schemas/xfdu.xsd",
+            ],
+        ],
+    )
+    def setup(self, filesystem, schema):
+        self.mapper = product_mapper(filesystem, product_path(poles=("HH",)))
+        clear_caches()
+
+    def time_open_schema(self, filesystem, schema):
+        open_schema(self.mapper, schema)
@@ -1,8 +1,37 @@
-from importlib.metadata import version
+import importlib
 
-from safe_rcm.api import open_rcm  # noqa: F401
+# the public functions, loaded on first access to keep the import cheap
+_lazy_attributes = {
+    "open_rcm": "safe_rcm.api",
+    "open_mfrcm": "safe_rcm.api",
+    "open_rcm_async": "safe_rcm.api",
+    "verify_checksums": "safe_rcm.checksums",
+}
 
-try:
-    __version__ = version("xarray-safe-rcm")
-except Exception:
-    __version__ = "9999"
+__all__ = list(_lazy_attributes)
+
+
+def _version():
+    from importlib.metadata import version
+
+    try:
+        return version("xarray-safe-rcm")
+    except Exception:
+        return "9999"
+
+
+def __getattr__(name):
+    if name == "__version__":
+        value = _version()
+    elif name in _lazy_attributes:
+        value = getattr(importlib.import_module(_lazy_attributes[name]), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | {"__version__"})
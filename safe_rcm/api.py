@@ -1,19 +1,41 @@
+import asyncio
+import contextvars
 import os
 import posixpath
-from fnmatch import fnmatchcase
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 
-import fsspec
+import numpy as np
 import xarray as xr
-from fsspec.implementations.dirfs import DirFileSystem
-from tlz.dicttoolz import valmap
-from tlz.functoolz import compose_left, curry, juxt
+from fsspec.implementations.asyn_wrapper import AsyncFileSystemWrapper
+from fsspec.mapping import FSMap
+from tlz.dicttoolz import itemmap, keyfilter, valmap
+from tlz.functoolz import compose_left, curry
 
-from safe_rcm.calibrations import read_noise_levels
-from safe_rcm.manifest import read_manifest
-from safe_rcm.product.reader import read_product
+from safe_rcm import profiling
+from safe_rcm.archive import is_zip_url, preload_members, product_filesystem
+from safe_rcm.bursts import burst_chunks, burst_map_path
+from safe_rcm.cache import MetadataCache
+from safe_rcm.calibrations import read_lookup_tables, read_noise_levels
+from safe_rcm.checksums import verify_files
+from safe_rcm.dtypes import apply_dtype_policy, dtype_policies
+from safe_rcm.imagery import ImageryBackendEntrypoint, ProductOpener, imagery_chunks
+from safe_rcm.manifest import (
+    default_manifest_ignores,
+    ignored_file,
+    read_checksums,
+    read_manifest,
+)
+from safe_rcm.product.reader import default_plan, read_product
 from safe_rcm.product.transformers import extract_dataset
-from safe_rcm.product.utils import starcall
-from safe_rcm.xml import read_xml
+from safe_rcm.profiling import (
+    RecordingFileSystem,
+    current_profile,
+    record_request,
+    stage,
+)
+from safe_rcm.xml import document_caching, file_listing, read_xml, schema_cache
 
 try:
     ExceptionGroup
@@ -28,74 +50,51 @@ def execute(tree, f, path):
     return f(node)
 
 
-def ignored_file(path, ignores):
-    ignored = [
-        fnmatchcase(path, ignore) or fnmatchcase(posixpath.basename(path), ignore)
-        for ignore in ignores
-    ]
-    return any(ignored)
+# files read by `read_metadata`
+metadata_suffixes = (".safe", ".xml", ".xsd")
 
 
-def open_rcm(
-    url,
-    *,
-    backend_kwargs=None,
-    manifest_ignores=[
-        "*.pdf",
-        "*.html",
-        "*.xslt",
-        "*.png",
-        "*.kml",
-        "*.txt",
-        "preview/*",
-    ],
-    **dataset_kwargs,
-):
-    """read SAFE files of the radarsat constellation mission (RCM)
+@schema_cache()
+def read_metadata(mapper, exists, manifest_ignores, nodes=None):
+    """read the metadata and calibration files of a product
 
     Parameters
     ----------
-    url : str
-    backend_kwargs : mapping
-    manifest_ignores : list of str, default: ["*.pdf", "*.html", "*.xslt", "*.png", \
-                                              "*.kml", "*.txt", "preview/*"]
+    mapper : mapping
+        Maps paths relative to the product root to the file contents. Only
+        needs to contain the manifest, metadata and schema files.
+    exists : callable
+        Checks whether a path relative to the product root exists.
+    manifest_ignores : list of str
         Globs that match files from the manifest that are allowed to be missing.
-    **dataset_kwargs
-        Keyword arguments forwarded to `xr.open_dataset`, used to open
-        the contained data files.
-    """
-    if not isinstance(url, (str, os.PathLike)):
-        raise ValueError(f"cannot deal with object of type {type(url)}: {url}")
+    nodes : iterable of str, optional
+        The nodes to read, as returned by `select_nodes`. Calibration files of
+        nodes that are not selected are not read. Defaults to all nodes.
 
-    if backend_kwargs is None:
-        backend_kwargs = {}
-
-    url = os.fspath(url)
-
-    storage_options = backend_kwargs.get("storage_options", {})
-    mapper = fsspec.get_mapper(url, **storage_options)
-    relative_fs = DirFileSystem(path=url, fs=mapper.fs)
-
-    try:
-        declared_files = read_manifest(mapper, "manifest.safe")
-    except (FileNotFoundError, KeyError):
-        raise ValueError(
-            "cannot find the `manifest.safe` file. Are you sure this is a SAFE dataset?"
-        )
+    Returns
+    -------
+    xarray.DataTree
+        The metadata, without the imagery.
+    """
+    with stage("manifest"):
+        try:
+            declared_files = read_manifest(mapper, "manifest.safe")
+        except (FileNotFoundError, KeyError):
+            raise ValueError(
+                "cannot find the `manifest.safe` file. Are you sure this is a SAFE dataset?"
+            )
 
-    missing_files = [
-        path
-        for path in declared_files
-        if not ignored_file(path, manifest_ignores) and not relative_fs.exists(path)
-    ]
+        missing_files = [
+            path
+            for path in declared_files
+            if not ignored_file(path, manifest_ignores) and not exists(path)
+        ]
     if missing_files:
         raise ExceptionGroup(
             "not all files declared in the manifest are available",
             [ValueError(f"{p} does not exist") for p in missing_files],
         )
 
-    tree = read_product(mapper, "metadata/product.xml")
-
     calibration_root = "metadata/calibration"
     lookup_table_structure = {
         "/incidenceAngles": {
@@ -109,58 +108,871 @@ def open_rcm(
         },
         "/lookupTables": {
             "path": "/imageReferenceAttributes/lookupTableFileName",
-            "f": compose_left(
-                lambda obj: obj.stack(stacked=["sarCalibrationType", "pole"]),
-                lambda obj: obj.reset_index("stacked"),
-                juxt(
-                    compose_left(
-                        lambda obj: obj.to_series().to_dict(),
-                        curry(valmap, curry(posixpath.join, calibration_root)),
-                        curry(valmap, curry(read_xml)(mapper)),
-                        curry(valmap, curry(extract_dataset, dims="coefficients")),
-                        curry(valmap, lambda ds: ds["gains"].assign_attrs(ds.attrs)),
-                        lambda d: xr.concat(list(d.values()), dim="stacked"),
-                    ),
-                    lambda obj: obj.coords,
-                ),
-                curry(starcall, lambda arr, coords: arr.assign_coords(coords)),
-                lambda arr: arr.set_index({"stacked": ["sarCalibrationType", "pole"]}),
-                lambda arr: arr.unstack("stacked"),
-                lambda arr: arr.rename("lookup_tables"),
-                lambda arr: arr.to_dataset(),
-            ),
+            "f": curry(read_lookup_tables, mapper, calibration_root),
         },
         "/noiseLevels": {
             "path": "/imageReferenceAttributes/noiseLevelFileName",
             "f": curry(read_noise_levels, mapper, calibration_root),
         },
     }
-    calibration = valmap(
-        lambda x: execute(**x)(tree),
-        lookup_table_structure,
-    )
+    plan = default_plan
+    if nodes is not None:
+        nodes = set(nodes)
+        lookup_table_structure = keyfilter(
+            lambda name: f"/lookupTables{name}" in nodes, lookup_table_structure
+        )
+        if lookup_table_structure:
+            # the calibration file names are stored in the product
+            nodes.add("/imageReferenceAttributes")
+        plan = default_plan.extend(drop=[node for node in plan if node not in nodes])
+
+    with stage("product"):
+        tree = read_product(mapper, "metadata/product.xml", plan=plan)
+    if not lookup_table_structure:
+        return tree
+
+    def read_calibration(item):
+        name, structure = item
+        with stage(f"/lookupTables{name}"):
+            return name, execute(**structure)(tree)
+
+    calibration = itemmap(read_calibration, lookup_table_structure)
+
+    return tree.assign({"lookupTables": xr.DataTree.from_dict(calibration)})
+
+
+def read_cached_metadata(url, mapper, exists, manifest_ignores, cache=None, nodes=None):
+    """read the metadata of a product, using a persistent cache
+
+    Parameters
+    ----------
+    url : str
+        The url of the product, used as part of the cache key.
+    mapper, exists, manifest_ignores
+        See `read_metadata`.
+    cache : MetadataCache or str or os.PathLike, optional
+        The cache, or the directory of the cache. If ``None``, don't cache.
+    nodes : iterable of str, optional
+        The nodes to read, see `read_metadata`. Ignored when caching, since
+        cache entries always contain the full metadata.
+
+    Returns
+    -------
+    xarray.DataTree
+        The metadata, without the imagery.
+    """
+    if cache is None:
+        return read_metadata(mapper, exists, manifest_ignores, nodes=nodes)
+    elif not isinstance(cache, MetadataCache):
+        cache = MetadataCache(cache)
+
+    try:
+        manifest = mapper["manifest.safe"]
+    except (FileNotFoundError, KeyError):
+        # let `read_metadata` raise a proper error
+        return read_metadata(mapper, exists, manifest_ignores)
+
+    key = cache.key(url, manifest)
+    tree = cache.get(key)
+    if tree is None:
+        tree = read_metadata(mapper, exists, manifest_ignores)
+        cache.put(key, tree)
+
+    return tree
+
+
+def _chunks_by_bursts(dataset_kwargs):
+    chunks = dataset_kwargs.get("chunks")
+
+    return isinstance(chunks, str) and chunks == "bursts"
+
+
+def open_imagery(tree, opener, **dataset_kwargs):
+    """lazily open the imagery of a product
+
+    Parameters
+    ----------
+    tree : xarray.DataTree
+        The metadata of the product.
+    opener : ProductOpener
+        The opener for the files of the product. Since it is cheap to pickle,
+        so is the opened imagery.
+    **dataset_kwargs
+        Keyword arguments forwarded to `xr.open_dataset`, using
+        `safe_rcm.imagery.ImageryBackendEntrypoint`. With ``chunks="bursts"``,
+        the imagery is chunked along the beam boundaries of ``/grdBurstMap``.
+
+    Returns
+    -------
+    xarray.Dataset
+        The imagery, concatenated along ``pole``.
+    """
+    by_bursts = _chunks_by_bursts(dataset_kwargs)
+    if by_bursts:
+        dataset_kwargs = dataset_kwargs | {"chunks": {}}
 
     imagery_paths = tree["/sceneAttributes/ipdf"].to_series().to_dict()
     resolved = valmap(
         compose_left(
             curry(posixpath.join, "metadata"),
             posixpath.normpath,
+            opener.path,
         ),
         imagery_paths,
     )
     imagery_dss = valmap(
-        compose_left(
-            curry(relative_fs.open),
-            curry(xr.open_dataset, engine="rasterio", **dataset_kwargs),
+        curry(
+            xr.open_dataset,
+            engine=ImageryBackendEntrypoint,
+            opener=opener,
+            **dataset_kwargs,
         ),
         resolved,
     )
     dss = [ds.assign_coords(pole=coord) for coord, ds in imagery_dss.items()]
     imagery = xr.concat(dss, dim="pole")
 
-    return tree.assign(
-        {
-            "lookupTables": xr.DataTree.from_dict(calibration),
-            "imagery": xr.DataTree(imagery),
-        }
+    if by_bursts and burst_map_path in tree.groups:
+        # products without a burst map (stripmap) keep the chunks of the files
+        burst_map = tree[burst_map_path].to_dataset(inherit=False)
+        imagery = imagery.chunk(
+            burst_chunks(burst_map, imagery.sizes, imagery_chunks(imagery))
+        )
+
+    return imagery
+
+
+# variables of the nodes that are not read from `metadata/product.xml`
+file_variables = {
+    "/lookupTables/incidenceAngles": {"angles"},
+    "/lookupTables/lookupTables": {"lookup_tables"},
+    "/lookupTables/noiseLevels": {"noiseLevelValues"},
+    "/imagery": {"band_data"},
+}
+
+
+def _ancestors(path):
+    while path != "/":
+        path = posixpath.dirname(path)
+        yield path
+
+
+# groups without data of their own, that only contain other nodes
+container_groups = {
+    ancestor
+    for node in [*default_plan, *file_variables]
+    for ancestor in _ancestors(node)
+} - set(default_plan)
+
+
+def normalize_group(group):
+    """normalize the path of a group to an absolute path"""
+    return "/" + (group or "").strip("/")
+
+
+def _contains(group, path):
+    # whether `path` is part of the subtree at `group`
+    return group == "/" or path == group or path.startswith(group + "/")
+
+
+def select_nodes(group="/", drop_variables=(), recursive=True):
+    """select the nodes required to open a group
+
+    Parameters
+    ----------
+    group : str, default: "/"
+        The path of the group.
+    drop_variables : iterable of str, optional
+        Variables that are not needed. Nodes that would only contain dropped
+        variables are not selected.
+    recursive : bool, default: True
+        Whether to select the entire subtree at ``group``, or just the group
+        itself.
+
+    Returns
+    -------
+    list of str
+        The paths of the nodes. Groups that only contain other nodes are
+        selected by their own path if not selecting recursively, and are read
+        as empty nodes.
+    """
+    group = normalize_group(group)
+    drop_variables = set(drop_variables)
+
+    if recursive:
+        metadata_nodes = [node for node in default_plan if _contains(group, node)]
+    elif group in container_groups:
+        metadata_nodes = [group]
+    else:
+        metadata_nodes = [node for node in default_plan if node == group]
+
+    # these nodes may be the root of a subtree
+    file_nodes = [
+        node
+        for node, variables in file_variables.items()
+        if (_contains(node, group) or recursive and _contains(group, node))
+        and not variables <= drop_variables
+    ]
+
+    return metadata_nodes + file_nodes
+
+
+def subset_tree(tree, group="/", drop_variables=()):
+    """extract the subtree at ``group`` and remove variables
+
+    Parameters
+    ----------
+    tree : xarray.DataTree
+        The tree to subset.
+    group : str, default: "/"
+        The path of the new root.
+    drop_variables : iterable of str, optional
+        The variables to remove from all nodes.
+
+    Returns
+    -------
+    xarray.DataTree
+    """
+    subtree = tree[normalize_group(group)]
+    drop_variables = list(drop_variables)
+
+    datasets = {
+        posixpath.join("/", node.relative_to(subtree))
+        .removesuffix("/."): node.to_dataset(inherit=False)
+        .drop_vars(drop_variables, errors="ignore")
+        for node in subtree.subtree
+    }
+
+    return xr.DataTree.from_dict(datasets)
+
+
+def _check_options(url, verify, dtype_policy):
+    if not isinstance(url, (str, os.PathLike)):
+        raise ValueError(f"cannot deal with object of type {type(url)}: {url}")
+
+    if verify not in (None, "checksum"):
+        raise ValueError(f"unknown verification mode: {verify!r}")
+
+    if dtype_policy not in dtype_policies:
+        raise ValueError(f"unknown dtype policy: {dtype_policy!r}")
+
+    return os.fspath(url)
+
+
+def _record_requests(url, mapper, relative_fs):
+    profile = current_profile()
+    if profile is None or is_zip_url(url):
+        # requests to archives are recorded by the archive itself
+        return mapper, relative_fs
+
+    return (
+        FSMap(mapper.root, RecordingFileSystem(mapper.fs, profile)),
+        RecordingFileSystem(relative_fs, profile),
     )
+
+
+def _verify_product(mapper, relative_fs, manifest_ignores):
+    with stage("verify"):
+        try:
+            checksums = read_checksums(mapper, "manifest.safe")
+        except (FileNotFoundError, KeyError):
+            raise ValueError(
+                "cannot find the `manifest.safe` file. Are you sure this is a SAFE dataset?"
+            )
+        verify_files(relative_fs, checksums, manifest_ignores=manifest_ignores)
+
+
+def _preload_product(relative_fs):
+    with stage("preload"):
+        return preload_members(relative_fs, metadata_suffixes)
+
+
+def _read_product(
+    url,
+    storage_options,
+    mapper,
+    exists,
+    relative_fs,
+    nodes=None,
+    *,
+    manifest_ignores,
+    cache,
+    document_cache,
+    dtype_policy,
+    tile_cache,
+    **dataset_kwargs,
+):
+    # read the metadata and open the imagery of a listed product
+    with_imagery = nodes is None or "/imagery" in nodes
+    if nodes is not None:
+        # the paths of the imagery files are stored in the product
+        nodes = set(nodes) - {"/imagery"} | (
+            {"/sceneAttributes"} if with_imagery else set()
+        )
+        if with_imagery and _chunks_by_bursts(dataset_kwargs):
+            nodes.add(burst_map_path)
+
+    with stage("metadata"), document_caching(document_cache):
+        tree = read_cached_metadata(
+            url, mapper, exists, manifest_ignores, cache=cache, nodes=nodes
+        )
+    tree = apply_dtype_policy(tree, dtype_policy)
+    for node in container_groups.intersection(nodes or []):
+        if node not in tree.groups:
+            tree[node] = xr.DataTree()
+    if not with_imagery:
+        return tree
+
+    if dtype_policy == "compact":
+        # keep the digital numbers until the imagery is calibrated
+        dataset_kwargs = {"mask_and_scale": False} | dataset_kwargs
+
+    opener = ProductOpener(url, storage_options, fs=relative_fs, tile_cache=tile_cache)
+    with stage("imagery"):
+        imagery = open_imagery(tree, opener, **dataset_kwargs)
+
+    return tree.assign({"imagery": xr.DataTree(imagery)})
+
+
+def read_tree(
+    url,
+    nodes=None,
+    *,
+    backend_kwargs=None,
+    manifest_ignores=default_manifest_ignores,
+    cache=None,
+    document_cache=False,
+    verify=None,
+    dtype_policy=None,
+    tile_cache=False,
+    **dataset_kwargs,
+):
+    """read the selected nodes of a product
+
+    Parameters
+    ----------
+    url : str
+        The url of the product.
+    nodes : iterable of str, optional
+        The nodes to read, as returned by `select_nodes`. Files that are only
+        needed by other nodes are not read. Defaults to all nodes.
+    backend_kwargs, manifest_ignores, cache, document_cache, verify, \
+    dtype_policy, tile_cache
+        See `open_rcm`.
+    **dataset_kwargs
+        See `open_rcm`.
+
+    Returns
+    -------
+    xarray.DataTree
+        The tree of the entire product. Depending on ``nodes``, it may
+        contain additional nodes.
+    """
+    url = _check_options(url, verify, dtype_policy)
+    storage_options = (backend_kwargs or {}).get("storage_options", {})
+
+    mapper, relative_fs = _record_requests(
+        url, *product_filesystem(url, storage_options)
+    )
+    if verify == "checksum":
+        _verify_product(mapper, relative_fs, manifest_ignores)
+
+    if is_zip_url(url):
+        mapper, exists = _preload_product(relative_fs)
+        listing = {}
+    else:
+        # a single listing instead of probing every file of the manifest, which
+        # also contains the versions of the documents for the document cache
+        with stage("list"):
+            listing = relative_fs.find("", detail=True)
+        exists = listing.__contains__
+
+    with file_listing(mapper, listing):
+        return _read_product(
+            url,
+            storage_options,
+            mapper,
+            exists,
+            relative_fs,
+            nodes,
+            manifest_ignores=manifest_ignores,
+            cache=cache,
+            document_cache=document_cache,
+            dtype_policy=dtype_policy,
+            tile_cache=tile_cache,
+            **dataset_kwargs,
+        )
+
+
+def open_rcm(
+    url,
+    *,
+    backend_kwargs=None,
+    manifest_ignores=default_manifest_ignores,
+    cache=None,
+    document_cache=False,
+    verify=None,
+    group=None,
+    drop_variables=None,
+    profile=False,
+    dtype_policy=None,
+    tile_cache=False,
+    **dataset_kwargs,
+):
+    """read SAFE files of the radarsat constellation mission (RCM)
+
+    Parameters
+    ----------
+    url : str
+        The url of the product. Zipped products are read without extracting
+        them, using either the url of the archive or a chained url like
+        ``zip::s3://bucket/product.zip``.
+    backend_kwargs : mapping
+    manifest_ignores : list of str, default: ["*.pdf", "*.html", "*.xslt", "*.png", \
+                                              "*.kml", "*.txt", "preview/*"]
+        Globs that match files from the manifest that are allowed to be missing.
+    cache : MetadataCache or str or os.PathLike, optional
+        Persistent cache for the decoded metadata, or the directory of the
+        cache. Entries are keyed by the url and the content of
+        ``manifest.safe``. On a cache hit, the manifest is not checked for
+        missing files.
+    document_cache : bool or DocumentCache, default: False
+        In-memory cache for the decoded xml documents, which avoids fetching
+        and decoding unchanged documents again when a product is reopened
+        within the same process. ``True`` uses the cache shared by all
+        products, `safe_rcm.xml.document_cache`, which holds up to 256 MiB.
+        Pass a `safe_rcm.xml.DocumentCache` to choose the memory budget.
+        Disabled by default.
+    verify : {None, "checksum"}, default: None
+        If ``"checksum"``, verify all files against the checksums declared in
+        the manifest before opening the product. See `verify_checksums`.
+    group : str, optional
+        Only open the subtree at this path. Calibration and imagery files
+        outside of the subtree are not read.
+    drop_variables : iterable of str, optional
+        Variables to remove from all nodes. Files that only contain dropped
+        variables, like the imagery for ``"band_data"``, are not read.
+    profile : bool, default: False
+        Whether to record the wall time and the filesystem requests of each
+        stage of opening the product. The `Profile` is stored in the
+        ``"profile"`` entry of the encoding of the root node. To profile
+        multiple calls, use `safe_rcm.profiling.profile` instead.
+    dtype_policy : {None, "compact"}, default: None
+        How to store the decoded values. With ``"compact"``, lookup tables,
+        noise levels, incidence angles and geolocation grids are stored as
+        ``float32``, string coordinates as fixed-width strings, and the
+        imagery keeps the integer dtype of the files until it is calibrated.
+    tile_cache : bool, default: False
+        Whether to read the imagery through a block cache with blocks the
+        size of the tiles of the files, instead of the cache of the
+        filesystem. Concurrent reads of the same blocks are merged. The
+        blocks of all products share the memory limit of
+        `safe_rcm.imagery.default_tile_cache`.
+    **dataset_kwargs
+        Keyword arguments forwarded to `xr.open_dataset`, used to open
+        the contained data files. ``chunks="bursts"`` chunks the imagery of
+        ScanSAR products such that no chunk crosses the boundary between two
+        beams of ``/grdBurstMap``, with chunks no larger than a few tiles.
+        Products without a burst map keep the chunks of the files.
+    """
+    if profile:
+        with profiling.profile() as report:
+            tree = open_rcm(
+                url,
+                backend_kwargs=backend_kwargs,
+                manifest_ignores=manifest_ignores,
+                cache=cache,
+                document_cache=document_cache,
+                verify=verify,
+                group=group,
+                drop_variables=drop_variables,
+                dtype_policy=dtype_policy,
+                tile_cache=tile_cache,
+                **dataset_kwargs,
+            )
+        tree.encoding["profile"] = report
+
+        return tree
+
+    options = {
+        "backend_kwargs": backend_kwargs,
+        "manifest_ignores": manifest_ignores,
+        "cache": cache,
+        "document_cache": document_cache,
+        "verify": verify,
+        "dtype_policy": dtype_policy,
+        "tile_cache": tile_cache,
+    }
+    with stage("open_rcm"):
+        if group is None and drop_variables is None:
+            return read_tree(url, **options, **dataset_kwargs)
+
+        group = normalize_group(group)
+        drop_variables = list(drop_variables or [])
+
+        nodes = select_nodes(group, drop_variables)
+        tree = read_tree(url, nodes, **options, **dataset_kwargs)
+
+        return subset_tree(tree, group, drop_variables)
+
+
+def _async_filesystem(fs, storage_options):
+    if not fs.async_impl:
+        return AsyncFileSystemWrapper(fs, asynchronous=True)
+
+    return type(fs)(asynchronous=True, **storage_options)
+
+
+async def _fetch_metadata(fs, root, storage_options):
+    # list the product once and fetch all metadata files concurrently
+    async_fs = _async_filesystem(fs, storage_options)
+
+    with stage("list"):
+        start = time.perf_counter()
+        paths = await async_fs._find(root)
+        record_request("find", root, duration=time.perf_counter() - start)
+    relative_paths = {posixpath.relpath(path, root): path for path in paths}
+
+    metadata_paths = [
+        path
+        for relative_path, path in relative_paths.items()
+        if relative_path.endswith(metadata_suffixes)
+    ]
+    with stage("fetch"):
+        start = time.perf_counter()
+        contents = await async_fs._cat(metadata_paths) if metadata_paths else {}
+        duration = time.perf_counter() - start
+    for path, content in contents.items():
+        record_request("cat_file", path, len(content), duration)
+
+    mapper = {
+        relative_path: contents[path]
+        for relative_path, path in relative_paths.items()
+        if path in contents
+    }
+
+    return mapper, relative_paths.__contains__
+
+
+async def open_rcm_async(
+    url,
+    *,
+    backend_kwargs=None,
+    manifest_ignores=default_manifest_ignores,
+    cache=None,
+    document_cache=False,
+    verify=None,
+    group=None,
+    drop_variables=None,
+    profile=False,
+    dtype_policy=None,
+    tile_cache=False,
+    executor=None,
+    **dataset_kwargs,
+):
+    """read SAFE files of the radarsat constellation mission (RCM) asynchronously
+
+    Accepts the same products and options as `open_rcm`. Directories are
+    listed once, and all manifest, metadata, calibration and schema files are
+    fetched concurrently using the async API of fsspec. Filesystems without
+    async support are wrapped. Zipped products, verifying, decoding the
+    metadata and opening the imagery are run in ``executor``.
+
+    Parameters
+    ----------
+    url : str
+    backend_kwargs, manifest_ignores, cache, document_cache, verify, group, \
+    drop_variables, profile, dtype_policy, tile_cache
+        See `open_rcm`.
+    executor : concurrent.futures.Executor, optional
+        The executor to run the blocking parts in. Defaults to the default
+        executor of the running event loop.
+    **dataset_kwargs
+        Keyword arguments forwarded to `xr.open_dataset`. See `open_rcm`.
+
+    Returns
+    -------
+    xarray.DataTree
+        The same tree as returned by `open_rcm`.
+    """
+    if profile:
+        with profiling.profile() as report:
+            tree = await open_rcm_async(
+                url,
+                backend_kwargs=backend_kwargs,
+                manifest_ignores=manifest_ignores,
+                cache=cache,
+                document_cache=document_cache,
+                verify=verify,
+                group=group,
+                drop_variables=drop_variables,
+                dtype_policy=dtype_policy,
+                tile_cache=tile_cache,
+                executor=executor,
+                **dataset_kwargs,
+            )
+        tree.encoding["profile"] = report
+
+        return tree
+
+    url = _check_options(url, verify, dtype_policy)
+    storage_options = (backend_kwargs or {}).get("storage_options", {})
+
+    nodes = None
+    if group is not None or drop_variables is not None:
+        group = normalize_group(group)
+        drop_variables = list(drop_variables or [])
+        nodes = select_nodes(group, drop_variables)
+
+    loop = asyncio.get_running_loop()
+
+    def run(func, *args, **kwargs):
+        # the profile is stored in the context
+        context = contextvars.copy_context()
+        return loop.run_in_executor(
+            executor, partial(context.run, func, *args, **kwargs)
+        )
+
+    with stage("open_rcm"):
+        product_mapper, product_fs = await run(product_filesystem, url, storage_options)
+        mapper, relative_fs = _record_requests(url, product_mapper, product_fs)
+        if verify == "checksum":
+            await run(_verify_product, mapper, relative_fs, manifest_ignores)
+
+        if is_zip_url(url):
+            mapper, exists = await run(_preload_product, relative_fs)
+        else:
+            mapper, exists = await _fetch_metadata(
+                product_mapper.fs, product_mapper.root, storage_options
+            )
+
+        tree = await run(
+            _read_product,
+            url,
+            storage_options,
+            mapper,
+            exists,
+            relative_fs,
+            nodes,
+            manifest_ignores=manifest_ignores,
+            cache=cache,
+            document_cache=document_cache,
+            dtype_policy=dtype_policy,
+            tile_cache=tile_cache,
+            **dataset_kwargs,
+        )
+
+    if nodes is None:
+        return tree
+
+    return subset_tree(tree, group, drop_variables)
+
+
+def _try_call(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs), None
+    except Exception as e:
+        return None, e
+
+
+def _parallel_map(func, items, executor):
+    wrapped = partial(_try_call, func)
+
+    if executor == "dask":
+        try:
+            import dask
+        except ImportError:
+            raise ImportError("opening products using dask requires `dask`")
+
+        return list(dask.compute(*map(dask.delayed(wrapped), items)))
+    elif executor in ("threads", "processes"):
+        pool_type = ThreadPoolExecutor if executor == "threads" else ProcessPoolExecutor
+        with pool_type() as pool:
+            return list(pool.map(wrapped, items))
+    elif isinstance(executor, Executor):
+        return list(executor.map(wrapped, items))
+    else:
+        raise ValueError(
+            "executor must be one of 'threads', 'processes', 'dask'"
+            f" or a `concurrent.futures.Executor`, got: {executor!r}"
+        )
+
+
+def stack_trees(trees, dim="product", *, exclude=("/imagery",)):
+    """stack the metadata of multiple products along a new dimension
+
+    Parameters
+    ----------
+    trees : list of xarray.DataTree
+        The products. All products must have the same structure, which means
+        they should be from the same beam mode and geometry.
+    dim : str or pandas.Index or xarray.DataArray, default: "product"
+        The new dimension. If an index or array, it will be used as the
+        dimension coordinate.
+    exclude : iterable of str, default: ("/imagery",)
+        Nodes to exclude from the result, including their children.
+
+    Returns
+    -------
+    xarray.DataTree
+        The stacked metadata. Indexes that differ between products are outer
+        joined, and conflicting attributes are dropped.
+    """
+    if not trees:
+        raise ValueError("need at least one product to stack")
+
+    def excluded(path):
+        return any(path == node or path.startswith(node + "/") for node in exclude)
+
+    node_paths = [
+        [node.path for node in tree.subtree if not excluded(node.path)]
+        for tree in trees
+    ]
+    if any(paths != node_paths[0] for paths in node_paths[1:]):
+        raise ValueError("cannot stack products with different structure")
+
+    stacked = {
+        path: xr.concat(
+            [tree[path].to_dataset(inherit=False) for tree in trees],
+            dim=dim,
+            join="outer",
+            combine_attrs="drop_conflicts",
+        )
+        for path in node_paths[0]
+    }
+
+    return xr.DataTree.from_dict(stacked)
+
+
+def scatter_metadata(tree, client, *, exclude=("/imagery",), broadcast=True):
+    """scatter the metadata arrays to the workers of a `distributed` cluster
+
+    The data variables of the metadata are replaced by dask arrays that
+    refer to the scattered data, such that task graphs using them only
+    contain references instead of copies of the data.
+
+    Parameters
+    ----------
+    tree : xarray.DataTree
+        The product.
+    client : distributed.Client
+        The client of the cluster.
+    exclude : iterable of str, default: ("/imagery",)
+        Nodes to leave untouched, including their children.
+    broadcast : bool, default: True
+        Whether to send the data to all workers at once.
+
+    Returns
+    -------
+    xarray.DataTree
+        The product, with metadata backed by the scattered data.
+    """
+    try:
+        import dask.array as da
+    except ImportError:
+        raise ImportError("scattering the metadata requires `dask`")
+
+    def excluded(path):
+        return any(path == node or path.startswith(node + "/") for node in exclude)
+
+    datasets = {node.path: node.to_dataset(inherit=False) for node in tree.subtree}
+    arrays = {
+        (path, name): var.data
+        for path, ds in datasets.items()
+        if not excluded(path)
+        for name, var in ds.data_vars.items()
+        if isinstance(var.data, np.ndarray)
+    }
+    futures = client.scatter(list(arrays.values()), broadcast=broadcast)
+
+    scattered = {}
+    for (path, name), array, future in zip(arrays, arrays.values(), futures):
+        scattered.setdefault(path, {})[name] = datasets[path][name].copy(
+            data=da.from_delayed(future, shape=array.shape, dtype=array.dtype)
+        )
+
+    replaced = {
+        path: ds.assign(scattered.get(path, {})) for path, ds in datasets.items()
+    }
+
+    return xr.DataTree.from_dict(replaced)
+
+
+def open_mfrcm(
+    urls,
+    *,
+    parallel=True,
+    executor="threads",
+    combine=None,
+    concat_dim="product",
+    **kwargs,
+):
+    """open multiple RCM products at once
+
+    Products are opened concurrently. Parsed schema files are shared between
+    products opened by the same process.
+
+    Parameters
+    ----------
+    urls : iterable of str or os.PathLike
+        The products to open.
+    parallel : bool, default: True
+        Whether to open the products concurrently.
+    executor : {"threads", "processes", "dask"} or concurrent.futures.Executor, \
+               default: "threads"
+        How to open the products in parallel. With ``"processes"``, the opened
+        products have to be picklable. Ignored if ``parallel=False``.
+    combine : {None, "stack"}, default: None
+        How to combine the products. If ``None``, return a list of trees. If
+        ``"stack"``, stack the metadata along ``concat_dim`` using
+        `stack_trees`. The imagery is not opened in that case.
+    concat_dim : str or pandas.Index or xarray.DataArray, default: "product"
+        The dimension to stack along. If a string, the urls are used as
+        dimension coordinate.
+    **kwargs
+        Additional keyword arguments for `open_rcm`.
+
+    Returns
+    -------
+    list of xarray.DataTree or xarray.DataTree
+        The opened products, in the order of ``urls``.
+
+    Raises
+    ------
+    ExceptionGroup
+        If any of the products failed to open. Contains one exception group
+        per failed url.
+    """
+    urls = [os.fspath(url) for url in urls]
+    if combine not in (None, "stack"):
+        raise ValueError(f"unknown combine mode: {combine!r}")
+
+    if combine == "stack":
+        # the imagery is not part of the stacked metadata, so don't open it
+        drop_variables = list(kwargs.get("drop_variables") or [])
+        kwargs = kwargs | {"drop_variables": drop_variables + ["band_data"]}
+
+    opener = partial(open_rcm, **kwargs)
+    if parallel:
+        results = _parallel_map(opener, urls, executor)
+    else:
+        results = [_try_call(opener, url) for url in urls]
+
+    errors = [
+        ExceptionGroup(url, [error])
+        for url, (_, error) in zip(urls, results)
+        if error is not None
+    ]
+    if errors:
+        raise ExceptionGroup(
+            f"failed to open {len(errors)} out of {len(urls)} products", errors
+        )
+
+    trees = [tree for tree, _ in results]
+    if combine is None:
+        return trees
+
+    if isinstance(concat_dim, str):
+        concat_dim = xr.DataArray(urls, dims=concat_dim, name=concat_dim)
+
+    return stack_trees(trees, dim=concat_dim)
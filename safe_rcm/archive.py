@@ -0,0 +1,576 @@
+import bisect
+import io
+import posixpath
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from collections import OrderedDict
+from functools import partial
+
+import fsspec
+from fsspec.implementations.dirfs import DirFileSystem
+from fsspec.implementations.zip import ZipFileSystem
+from fsspec.utils import tokenize
+
+from safe_rcm.profiling import record_request
+from safe_rcm.xml import version_fields
+
+# opened archives, such that the central directory is only read once
+max_cached_archives = 8
+_archives = OrderedDict()
+_archives_lock = threading.Lock()
+
+# local file header: signature, versions, flags, compression, time, date, crc,
+# sizes, and the lengths of the file name and the extra field
+local_header = struct.Struct("<4s5H3L2H")
+
+# default block size and number of cached blocks of opened members
+default_block_size = 2**20
+default_max_blocks = 32
+
+# the number of decompressed bytes between two checkpoints of a deflated member
+checkpoint_interval = 2**22
+
+
+def is_zip_url(url):
+    """whether the url points to a zipped product"""
+    if url.startswith(("zip::", "zip://")):
+        return True
+
+    target = url.split("::")[-1]
+    return target.rstrip("/").lower().endswith(".zip")
+
+
+def split_zip_url(url):
+    """split a zip url into the url of the archive and the path within
+
+    Parameters
+    ----------
+    url : str
+        Either the url of the archive, a chained url of the form
+        ``zip::<archive url>`` or ``zip://<path>::<archive url>``.
+
+    Returns
+    -------
+    archive_url : str
+    path : str
+        The path within the archive. Empty if not given.
+    """
+    if url.startswith("zip::"):
+        return url.removeprefix("zip::"), ""
+    elif url.startswith("zip://"):
+        path, _, archive_url = url.removeprefix("zip://").partition("::")
+        return archive_url, path.strip("/")
+
+    return url, ""
+
+
+class MemberBlocks:
+    """least recently used cache of the blocks of a file
+
+    Runs of adjacent missing blocks are fetched using a single request.
+
+    Parameters
+    ----------
+    fetcher : callable
+        Fetches the bytes between ``start`` and ``end``.
+    size : int
+        The size of the file, in bytes.
+    block_size : int
+        The size of the cached blocks.
+    max_blocks : int
+        The maximum number of cached blocks.
+    """
+
+    def __init__(self, fetcher, size, block_size, max_blocks):
+        self.fetcher = fetcher
+        self.size = size
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fetch_run(self, first, last):
+        start = first * self.block_size
+        data = self.fetcher(start, min(self.size, (last + 1) * self.block_size))
+
+        return {
+            index: data[offset : offset + self.block_size]
+            for index, offset in zip(
+                range(first, last + 1), range(0, len(data), self.block_size)
+            )
+        }
+
+    def fetch(self, start, end):
+        """the bytes between ``start`` and ``end``"""
+        if start >= end:
+            return b""
+
+        first = start // self.block_size
+        last = (end - 1) // self.block_size
+
+        with self._lock:
+            blocks = {
+                index: self._blocks[index]
+                for index in range(first, last + 1)
+                if index in self._blocks
+            }
+            for index in blocks:
+                self._blocks.move_to_end(index)
+
+        missing = [index for index in range(first, last + 1) if index not in blocks]
+        runs = []
+        for index in missing:
+            if runs and runs[-1][1] == index - 1:
+                runs[-1][1] = index
+            else:
+                runs.append([index, index])
+
+        for run_first, run_last in runs:
+            fetched = self._fetch_run(run_first, run_last)
+            blocks.update(fetched)
+            with self._lock:
+                self._blocks.update(fetched)
+                while len(self._blocks) > self.max_blocks:
+                    self._blocks.popitem(last=False)
+
+        data = b"".join(blocks[index] for index in range(first, last + 1))
+        offset = first * self.block_size
+
+        return data[start - offset : end - offset]
+
+
+class MemberFile(io.RawIOBase):
+    """seekable read-only file backed by a block cache
+
+    Parameters
+    ----------
+    name : str
+        The name of the member.
+    fetcher : callable
+        Fetches the bytes between ``start`` and ``end``.
+    size : int
+        The size of the member, in bytes.
+    block_size : int
+        The size of the cached blocks.
+    max_blocks : int
+        The maximum number of cached blocks.
+    """
+
+    def __init__(self, name, fetcher, size, block_size, max_blocks):
+        self.name = name
+        self.size = size
+        self.cache = MemberBlocks(fetcher, size, block_size, max_blocks)
+        self.loc = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.loc
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            loc = offset
+        elif whence == io.SEEK_CUR:
+            loc = self.loc + offset
+        elif whence == io.SEEK_END:
+            loc = self.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+
+        if loc < 0:
+            raise ValueError("negative seek position")
+
+        self.loc = loc
+        return loc
+
+    def read(self, size=-1):
+        end = self.size if size is None or size < 0 else min(self.size, self.loc + size)
+        data = self.cache.fetch(self.loc, end)
+        self.loc += len(data)
+
+        return data
+
+    def readall(self):
+        return self.read(-1)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+
+        return len(data)
+
+
+class _DeflatedMember:
+    # decompresses a deflated member from its compressed bytes. A copy of the
+    # decompressor is kept every `checkpoint_interval` bytes, such that seeking
+    # backwards resumes from the closest checkpoint instead of the start.
+    def __init__(self, fetcher, compress_size, chunk_size=default_block_size):
+        self.fetcher = fetcher
+        self.compress_size = compress_size
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+
+        # decompressed offset, compressed offset and decompressor
+        self.checkpoints = [(0, 0, zlib.decompressobj(-zlib.MAX_WBITS))]
+        # the current state, with the fetched input that was not consumed yet
+        self.state = None
+
+    def _resume(self, start):
+        index = bisect.bisect_right(self.checkpoints, start, key=lambda c: c[0]) - 1
+        out, in_, decompressor = self.checkpoints[index]
+        if self.state is not None and out <= self.state[0] <= start:
+            return self.state
+
+        return out, in_, decompressor.copy(), b""
+
+    def __call__(self, start, end):
+        with self.lock:
+            out, in_, decompressor, pending = self._resume(start)
+
+            parts = []
+            while out < end and not decompressor.eof:
+                if not pending:
+                    if in_ >= self.compress_size:
+                        break
+                    pending = self.fetcher(
+                        in_, min(self.compress_size, in_ + self.chunk_size)
+                    )
+                    in_ += len(pending)
+
+                data = decompressor.decompress(pending, self.chunk_size)
+                pending = decompressor.unconsumed_tail
+                if out + len(data) > start:
+                    parts.append(data[max(start - out, 0) : end - out])
+                out += len(data)
+
+                if out >= self.checkpoints[-1][0] + checkpoint_interval:
+                    self.checkpoints.append(
+                        (out, in_ - len(pending), decompressor.copy())
+                    )
+
+            self.state = out, in_, decompressor, pending
+
+        return b"".join(parts)
+
+
+class _StreamedMember:
+    # decompresses other members sequentially using `zipfile`. Seeking
+    # backwards restarts the decompression, so these members should be read
+    # sequentially. The reads are cached by `MemberFile`.
+    def __init__(self, archive, name):
+        self.archive = archive
+        self.name = name
+        self.lock = threading.Lock()
+        self.stream = None
+
+    def __call__(self, start, end):
+        with self.lock:
+            if self.stream is None:
+                self.stream = self.archive.open(self.name)
+
+            self.stream.seek(start)
+            return self.stream.read(end - start)
+
+
+class ZipArchiveFileSystem(ZipFileSystem):
+    """read-only zip filesystem optimized for reading remote archives
+
+    Compared to `fsspec.implementations.zip.ZipFileSystem`, members are opened
+    as seekable files with a block cache: stored members are read by byte
+    range from the archive, and deflated members are decompressed as a stream,
+    with checkpoints every `checkpoint_interval` bytes for seeking backwards.
+    Multiple small members can be read using a few range requests using
+    `cat_members`.
+
+    Parameters
+    ----------
+    fo : str
+        The url of the archive.
+    target_options : mapping, optional
+        Options for the filesystem containing the archive.
+    block_size : int, default: 1 MiB
+        The size of the cached blocks of opened members.
+    max_blocks : int, default: 32
+        The maximum number of cached blocks per opened member.
+    """
+
+    def __init__(
+        self,
+        fo,
+        target_options=None,
+        block_size=default_block_size,
+        max_blocks=default_max_blocks,
+        **kwargs,
+    ):
+        super().__init__(fo=fo, mode="r", target_options=target_options, **kwargs)
+
+        self.target_fs, self.target_path = fsspec.core.url_to_fs(
+            fo, **(target_options or {})
+        )
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self._data_offsets = {}
+
+    def _fetch_range(self, start, end):
+        request_start = time.perf_counter()
+        data = self.target_fs.cat_file(self.target_path, start=start, end=end)
+        duration = time.perf_counter() - request_start
+
+        record_request("range", self.target_path, len(data), duration)
+
+        return data
+
+    def _fetch_member_range(self, offset, start, end):
+        return self._fetch_range(offset + start, offset + end)
+
+    def _member_info(self, path):
+        try:
+            return self.zip.getinfo(self._strip_protocol(path))
+        except KeyError as e:
+            raise FileNotFoundError(path) from e
+
+    def _data_offset(self, info):
+        offset = self._data_offsets.get(info.filename)
+        if offset is None:
+            start = info.header_offset
+            header = self._fetch_range(start, start + local_header.size)
+            *_, name_length, extra_length = local_header.unpack(header)
+
+            offset = start + local_header.size + name_length + extra_length
+            self._data_offsets[info.filename] = offset
+
+        return offset
+
+    def _open(self, path, mode="rb", block_size=None, **kwargs):
+        if mode != "rb":
+            return super()._open(path, mode=mode, block_size=block_size, **kwargs)
+
+        info = self._member_info(path)
+        block_size = block_size or self.block_size
+        if info.flag_bits & 0x1 or info.compress_type not in (
+            zipfile.ZIP_STORED,
+            zipfile.ZIP_DEFLATED,
+        ):
+            fetcher = _StreamedMember(self.zip, info.filename)
+        else:
+            compressed = partial(self._fetch_member_range, self._data_offset(info))
+            if info.compress_type == zipfile.ZIP_STORED:
+                fetcher = compressed
+            else:
+                fetcher = _DeflatedMember(compressed, info.compress_size, block_size)
+
+        return MemberFile(
+            info.filename,
+            fetcher,
+            info.file_size,
+            block_size=block_size,
+            max_blocks=self.max_blocks,
+        )
+
+    def cat_file(self, path, start=None, end=None, **kwargs):
+        info = self._member_info(path)
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+            return super().cat_file(path, start=start, end=end, **kwargs)
+
+        # read stored members by byte range, without a block cache
+        start, end, _ = slice(start, end).indices(info.file_size)
+        if start >= end:
+            return b""
+
+        offset = self._data_offset(info)
+
+        return self._fetch_range(offset + start, offset + end)
+
+    def cat_members(self, paths, max_gap=default_block_size):
+        """read multiple members, merging close members into a single request
+
+        Parameters
+        ----------
+        paths : iterable of str
+            The paths of the members.
+        max_gap : int, default: 1 MiB
+            Members separated by less than this number of bytes are fetched
+            using a single range request.
+
+        Returns
+        -------
+        dict of str to bytes
+        """
+        infos = sorted(map(self._member_info, paths), key=lambda i: i.header_offset)
+
+        # the local header may be larger than its size in the central directory
+        spans = []
+        for info in infos:
+            start = info.header_offset
+            end = start + local_header.size + 0xFFFF * 2 + info.compress_size
+            if spans and start - spans[-1][1] <= max_gap:
+                spans[-1][1] = max(spans[-1][1], end)
+                spans[-1][2].append(info)
+            else:
+                spans.append([start, end, [info]])
+
+        archive_size = self.target_fs.size(self.target_path)
+        contents = {}
+        for start, end, members in spans:
+            data = self._fetch_range(start, min(end, archive_size))
+            for info in members:
+                contents[info.filename] = self._extract(info, data, start)
+
+        return contents
+
+    def _extract(self, info, data, offset):
+        if info.flag_bits & 0x1 or info.compress_type not in (
+            zipfile.ZIP_STORED,
+            zipfile.ZIP_DEFLATED,
+        ):
+            # encrypted or unusual compression: let `zipfile` deal with it
+            return self.zip.read(info.filename)
+
+        start = info.header_offset - offset
+        header = data[start : start + local_header.size]
+        *_, name_length, extra_length = local_header.unpack(header)
+
+        data_start = start + local_header.size + name_length + extra_length
+        raw = data[data_start : data_start + info.compress_size]
+
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            raw = zlib.decompress(raw, wbits=-zlib.MAX_WBITS)
+
+        if zlib.crc32(raw) != info.CRC:
+            raise zipfile.BadZipFile(f"bad CRC for member {info.filename}")
+
+        return raw
+
+
+def _archive_version(url, storage_options):
+    fs, path = fsspec.core.url_to_fs(url, **storage_options)
+    info = fs.info(path)
+
+    return tuple(str(info[name]) for name in version_fields + ("size",) if name in info)
+
+
+def open_archive(url, storage_options=None):
+    """open a zip archive, reusing previously opened archives
+
+    Archives are cached by url, options and version of the archive file, such
+    that the central directory is only read once.
+
+    Parameters
+    ----------
+    url : str
+        The url of the archive.
+    storage_options : mapping, optional
+        Options for the filesystem containing the archive.
+
+    Returns
+    -------
+    ZipArchiveFileSystem
+    """
+    storage_options = dict(storage_options or {})
+    key = (url, tokenize(storage_options), _archive_version(url, storage_options))
+
+    with _archives_lock:
+        cached = _archives.get(key)
+        if cached is not None:
+            _archives.move_to_end(key)
+            return cached
+
+    fs = ZipArchiveFileSystem(url, target_options=storage_options)
+
+    with _archives_lock:
+        _archives[key] = fs
+        while len(_archives) > max_cached_archives:
+            _archives.popitem(last=False)
+
+    return fs
+
+
+def find_product_root(fs, path=""):
+    """find the directory containing ``manifest.safe`` below ``path``
+
+    If there's multiple, the one closest to ``path`` is used. If there's none,
+    return ``path``.
+    """
+    manifests = [
+        name for name in fs.find(path) if posixpath.basename(name) == "manifest.safe"
+    ]
+    if not manifests:
+        return path
+
+    closest = min(manifests, key=lambda name: (name.count("/"), name))
+
+    return posixpath.dirname(closest)
+
+
+def product_filesystem(url, storage_options=None):
+    """open the filesystem of a product
+
+    Parameters
+    ----------
+    url : str
+        The url of the product. Either a directory or a zip archive, see
+        `split_zip_url` for the supported zip urls.
+    storage_options : mapping, optional
+        Additional options for the filesystem. For zipped products, these are
+        the options of the filesystem containing the archive.
+
+    Returns
+    -------
+    mapper : mapping
+        The mapper of the product root.
+    fs : fsspec.AbstractFileSystem
+        Filesystem with paths relative to the product root.
+    """
+    storage_options = storage_options or {}
+    if not is_zip_url(url):
+        mapper = fsspec.get_mapper(url, **storage_options)
+        return mapper, DirFileSystem(path=url, fs=mapper.fs)
+
+    archive_url, path = split_zip_url(url)
+    archive = open_archive(archive_url, storage_options)
+    root = find_product_root(archive, path)
+
+    if not root:
+        # the product is at the root of the archive
+        return archive.get_mapper(""), archive
+
+    return archive.get_mapper(root), DirFileSystem(path=root, fs=archive)
+
+
+def preload_members(fs, suffixes):
+    """read the small files of a zipped product into memory
+
+    Parameters
+    ----------
+    fs : ZipArchiveFileSystem or fsspec.implementations.dirfs.DirFileSystem
+        Filesystem with paths relative to the product root, as returned by
+        `product_filesystem`.
+    suffixes : tuple of str
+        The suffixes of the files to read.
+
+    Returns
+    -------
+    mapper : dict of str to bytes
+        The contents of the files.
+    exists : callable
+        Checks whether a path relative to the product root exists.
+    """
+    if isinstance(fs, DirFileSystem):
+        archive, join = fs.fs, fs._join
+    else:
+        archive, join = fs, str
+
+    paths = fs.find("")
+    selected = [path for path in paths if path.endswith(suffixes)]
+
+    contents = archive.cat_members([join(path) for path in selected])
+    mapper = {path: contents[join(path)] for path in selected}
+
+    return mapper, set(paths).__contains__
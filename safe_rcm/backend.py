@@ -0,0 +1,120 @@
+import os
+import zipfile
+
+from xarray.backends import BackendEntrypoint
+
+from safe_rcm.archive import is_zip_url
+from safe_rcm.manifest import default_manifest_ignores
+
+
+def _is_local_product(path):
+    if os.path.isdir(path):
+        return os.path.isfile(os.path.join(path, "manifest.safe"))
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as f:
+            return any(name.endswith("manifest.safe") for name in f.namelist())
+
+    return False
+
+
+class RcmBackendEntrypoint(BackendEntrypoint):
+    """open RCM products using ``engine="rcm"``
+
+    Nodes outside of ``group`` and variables in ``drop_variables`` are not
+    read, if possible. See `safe_rcm.open_rcm` for the other parameters.
+    """
+
+    description = "Open radarsat constellation mission (RCM) SAFE products"
+    url = "https://github.com/umr-lops/xarray-safe-rcm"
+
+    open_dataset_parameters = (
+        "filename_or_obj",
+        "drop_variables",
+        "group",
+        "storage_options",
+        "manifest_ignores",
+        "cache",
+        "document_cache",
+        "verify",
+        "dtype_policy",
+        "tile_cache",
+    )
+
+    def guess_can_open(self, filename_or_obj):
+        if not isinstance(filename_or_obj, (str, os.PathLike)):
+            return False
+
+        path = os.fspath(filename_or_obj)
+        if "://" in path or "::" in path:
+            # only check remote products by name, to avoid requests
+            return is_zip_url(path) and os.path.basename(path).upper().startswith("RCM")
+
+        return _is_local_product(path)
+
+    def open_dataset(
+        self,
+        filename_or_obj,
+        *,
+        drop_variables=None,
+        group=None,
+        storage_options=None,
+        manifest_ignores=default_manifest_ignores,
+        cache=None,
+        document_cache=False,
+        verify=None,
+        dtype_policy=None,
+        tile_cache=False,
+    ):
+        # xarray imports all backends, so only import the reader when needed
+        from safe_rcm.api import normalize_group, read_tree, select_nodes, subset_tree
+
+        group = normalize_group(group)
+        drop_variables = list(drop_variables or [])
+
+        tree = read_tree(
+            filename_or_obj,
+            select_nodes(group, drop_variables, recursive=False),
+            backend_kwargs={"storage_options": storage_options or {}},
+            manifest_ignores=manifest_ignores,
+            cache=cache,
+            document_cache=document_cache,
+            verify=verify,
+            dtype_policy=dtype_policy,
+            tile_cache=tile_cache,
+        )
+
+        return subset_tree(tree, group, drop_variables).to_dataset()
+
+    def open_datatree(
+        self,
+        filename_or_obj,
+        *,
+        drop_variables=None,
+        group=None,
+        storage_options=None,
+        manifest_ignores=default_manifest_ignores,
+        cache=None,
+        document_cache=False,
+        verify=None,
+        dtype_policy=None,
+        tile_cache=False,
+    ):
+        from safe_rcm.api import normalize_group, open_rcm
+
+        return open_rcm(
+            filename_or_obj,
+            backend_kwargs={"storage_options": storage_options or {}},
+            manifest_ignores=manifest_ignores,
+            cache=cache,
+            document_cache=document_cache,
+            verify=verify,
+            dtype_policy=dtype_policy,
+            tile_cache=tile_cache,
+            group=normalize_group(group),
+            drop_variables=list(drop_variables or []),
+        )
+
+    def open_groups_as_dict(self, filename_or_obj, **kwargs):
+        tree = self.open_datatree(filename_or_obj, **kwargs)
+
+        return {node.path: node.to_dataset(inherit=False) for node in tree.subtree}
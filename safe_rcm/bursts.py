@@ -0,0 +1,114 @@
+import numpy as np
+
+burst_map_path = "/grdBurstMap"
+
+
+def _burst_extents(burst_map):
+    # the extents of all bursts of all maps, with the end excluded
+    names = ["lineStart", "lineEnd", "pixelStart", "pixelEnd"]
+    extents = np.stack(
+        [
+            np.asarray(burst_map[name].transpose(..., "beam"), dtype="float64")
+            for name in names
+        ],
+        axis=-1,
+    )
+    beams = np.broadcast_to(np.arange(burst_map.sizes["beam"]), extents.shape[:-1])
+
+    extents = extents.reshape(-1, len(names))
+    beams = beams.reshape(-1)
+    valid = np.isfinite(extents).all(axis=-1)
+
+    line_start, line_end, pixel_start, pixel_end = extents[valid].astype("int64").T
+
+    return beams[valid], line_start, line_end + 1, pixel_start, pixel_end + 1
+
+
+def _edges(starts, ends, size):
+    edges = np.union1d(starts, ends)
+
+    return np.union1d(edges[(edges > 0) & (edges < size)], [0, size])
+
+
+def _merge_edges(edges, labels):
+    # remove the edges between intervals with the same beams
+    changes = np.flatnonzero((labels[1:] != labels[:-1]).any(axis=-1)) + 1
+
+    return edges[np.concatenate([[0], changes, [-1]])]
+
+
+def beam_edges(burst_map, shape):
+    """the edges of the blocks of the image that lie within a single beam
+
+    Parameters
+    ----------
+    burst_map : xarray.Dataset
+        The burst map, as read from ``/grdBurstMap``.
+    shape : tuple of int
+        The shape of the image, as (lines, pixels).
+
+    Returns
+    -------
+    line_edges, pixel_edges : numpy.ndarray
+        The edges of the blocks, including ``0`` and the size of the image.
+        Only edges at which the beam changes are included.
+    """
+    beams, line_start, line_end, pixel_start, pixel_end = _burst_extents(burst_map)
+
+    line_edges = _edges(line_start, line_end, shape[0])
+    pixel_edges = _edges(pixel_start, pixel_end, shape[1])
+
+    # the beam of each block of the grid. Blocks outside of all bursts are -1.
+    labels = np.full((line_edges.size - 1, pixel_edges.size - 1), -1)
+    for beam, line_slice, pixel_slice in zip(
+        beams,
+        map(slice, *np.searchsorted(line_edges, [line_start, line_end])),
+        map(slice, *np.searchsorted(pixel_edges, [pixel_start, pixel_end])),
+    ):
+        labels[line_slice, pixel_slice] = beam
+
+    return _merge_edges(line_edges, labels), _merge_edges(pixel_edges, labels.T)
+
+
+def split_edges(edges, max_size):
+    """split the intervals between edges into chunks of at most ``max_size``
+
+    Returns
+    -------
+    tuple of int
+        The chunk sizes.
+    """
+    chunks = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        size = int(end - start)
+        chunks.extend([max_size] * (size // max_size))
+        if size % max_size:
+            chunks.append(size % max_size)
+
+    return tuple(chunks)
+
+
+def burst_chunks(burst_map, sizes, max_chunks):
+    """chunks of the imagery that don't cross beam boundaries
+
+    Parameters
+    ----------
+    burst_map : xarray.Dataset
+        The burst map, as read from ``/grdBurstMap``.
+    sizes : mapping of str to int
+        The sizes of the imagery.
+    max_chunks : mapping of str to int
+        The maximum size of the chunks along ``y`` and ``x``. Other
+        dimensions are passed through.
+
+    Returns
+    -------
+    dict of str to int or tuple of int
+        The chunks.
+    """
+    line_edges, pixel_edges = beam_edges(burst_map, (sizes["y"], sizes["x"]))
+
+    return dict(max_chunks) | {
+        "y": split_edges(line_edges, max_chunks["y"]),
+        "x": split_edges(pixel_edges, max_chunks["x"]),
+    }
@@ -0,0 +1,310 @@
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import pandas as pd
+import xarray as xr
+from tlz.dicttoolz import valmap
+
+# attribute used to store the information necessary to restore the nodes
+metadata_attr = "_safe_rcm"
+nodes_attr = "_safe_rcm_nodes"
+
+
+def _encode_variable(var):
+    info = {}
+    if isinstance(var.dtype, pd.DatetimeTZDtype):
+        info["tz"] = str(var.dtype.tz)
+        values = pd.DatetimeIndex(var.data).tz_convert("UTC").tz_localize(None)
+        var = xr.Variable(var.dims, values.values, var.attrs)
+    elif var.dtype == object:
+        info["dtype"] = "object"
+        var = var.astype(str)
+
+    return var, info
+
+
+def _decode_variable(var, info):
+    if "tz" in info:
+        values = pd.DatetimeIndex(var.values).tz_localize("UTC").tz_convert(info["tz"])
+        return values
+    elif info.get("dtype") == "object":
+        return var.astype(object)
+
+    return var
+
+
+def encode_dataset(ds):
+    """prepare a dataset for writing to zarr"""
+    # multi-indexes can't be stored, so store the levels instead
+    multiindexes = {
+        dim: list(index.names)
+        for dim, index in ds.indexes.items()
+        if dim in ds.dims and isinstance(index, pd.MultiIndex)
+    }
+    ds = ds.reset_index(list(multiindexes))
+
+    variables = {}
+    infos = {}
+    for name, var in ds.variables.items():
+        encoded, info = _encode_variable(var)
+        variables[name] = encoded.copy()
+        variables[name].encoding = {}
+        if info:
+            infos[name] = info
+
+    metadata = {
+        "variables": infos,
+        "order": list(ds.variables),
+        "encoding": ds.encoding,
+        "multiindexes": multiindexes,
+    }
+    attrs = ds.attrs | {metadata_attr: json.dumps(metadata)}
+
+    coords = {name: variables.pop(name) for name in ds.coords}
+
+    return xr.Dataset(variables, coords=coords, attrs=attrs)
+
+
+def decode_dataset(ds):
+    """restore a dataset encoded with `encode_dataset`"""
+    attrs = dict(ds.attrs)
+    metadata = json.loads(attrs.pop(metadata_attr, "{}"))
+    infos = metadata.get("variables", {})
+    order = metadata.get("order", list(ds.variables))
+
+    variables = {name: ds.variables[name] for name in order}
+    coords = {name: variables.pop(name) for name in order if name in ds.coords}
+
+    # timezone-aware values are only preserved by pandas indexes
+    tz_coords = {
+        name: _decode_variable(var, infos[name])
+        for name, var in coords.items()
+        if "tz" in infos.get(name, {})
+    }
+    decoded = xr.Dataset(
+        {
+            name: _decode_variable(var, infos.get(name, {}))
+            for name, var in variables.items()
+        },
+        coords={
+            name: _decode_variable(var, infos.get(name, {}))
+            for name, var in coords.items()
+            if name not in tz_coords
+        },
+        attrs=attrs,
+    )
+    for name, index in tz_coords.items():
+        decoded = decoded.assign_coords({name: index.rename(name)})
+        decoded[name].attrs = coords[name].attrs
+
+    multiindexes = metadata.get("multiindexes", {})
+    if multiindexes:
+        decoded = decoded.set_index(multiindexes)
+
+    decoded.encoding = metadata.get("encoding", {})
+
+    return decoded
+
+
+def encode_tree(tree):
+    """prepare a tree for writing to zarr"""
+    nodes = {
+        node.path: encode_dataset(node.to_dataset(inherit=False))
+        for node in tree.subtree
+    }
+    nodes["/"].attrs[nodes_attr] = json.dumps(list(nodes))
+
+    return xr.DataTree.from_dict(nodes)
+
+
+def decode_tree(tree):
+    """restore a tree encoded with `encode_tree`"""
+    root_attrs = dict(tree.attrs)
+    paths = json.loads(root_attrs.pop(nodes_attr, "[]")) or [
+        node.path for node in tree.subtree
+    ]
+
+    nodes = {path: tree[path].to_dataset(inherit=False) for path in paths}
+    nodes["/"].attrs = root_attrs
+
+    return xr.DataTree.from_dict(valmap(decode_dataset, nodes))
+
+
+def _directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+class MetadataCache:
+    """persistent cache of decoded product metadata
+
+    The metadata of each product is stored as a zarr store in ``directory``.
+    Once the total size exceeds ``max_size``, the least recently used entries
+    are removed.
+
+    The total size is estimated from the entries stored through this
+    instance, such that storing an entry doesn't require scanning the cache.
+    The cache is only scanned again when the estimate exceeds the budget,
+    which also accounts for the entries stored by other instances and
+    processes.
+
+    Parameters
+    ----------
+    directory : str or os.PathLike
+        The local directory to store the entries in.
+    max_size : int, default: 1 GiB
+        The size budget, in bytes.
+    """
+
+    def __init__(self, directory, max_size=2**30):
+        if importlib.util.find_spec("zarr") is None:
+            raise ImportError("caching metadata requires `zarr`")
+
+        self.directory = os.fspath(directory)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # the estimated total size of the entries, see `_estimate_size`
+        self._estimated_size = None
+        self._size_lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.directory!r}, max_size={self.max_size!r})"
+
+    @staticmethod
+    def key(url, manifest):
+        """compute the cache key of a product
+
+        Parameters
+        ----------
+        url : str
+            The url of the product.
+        manifest : bytes
+            The content of the ``manifest.safe`` file.
+        """
+        manifest_hash = hashlib.sha256(manifest).digest()
+
+        return hashlib.sha256(url.encode() + b"\0" + manifest_hash).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.zarr")
+
+    def __contains__(self, key):
+        return os.path.isdir(self._path(key))
+
+    def get(self, key):
+        """load the metadata of a product
+
+        Returns
+        -------
+        xarray.DataTree or None
+            The cached metadata, or ``None`` if there's no such entry.
+        """
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None
+
+        try:
+            with xr.open_datatree(
+                path, engine="zarr", zarr_format=2, decode_timedelta=False
+            ) as stored:
+                tree = decode_tree(stored.load())
+        except Exception:
+            # incomplete or corrupted entry
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        # mark as recently used
+        now = time.time()
+        os.utime(path, (now, now))
+
+        return tree
+
+    def put(self, key, tree):
+        """store the metadata of a product, and evict old entries"""
+        path = self._path(key)
+        tmp_path = os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.tmp")
+        # measure the existing entries before adding to them
+        self._estimate_size()
+
+        encode_tree(tree).to_zarr(tmp_path, zarr_format=2, consolidated=True)
+        size = _directory_size(tmp_path)
+        with self._lock:
+            replaced = _directory_size(path) if os.path.isdir(path) else 0
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+
+        if self._estimate_size(size - replaced) > self.max_size:
+            self.evict()
+
+    def _estimate_size(self, change=0):
+        # the cache is scanned once, then only changes are tracked
+        with self._size_lock:
+            if self._estimated_size is None:
+                self._estimated_size = sum(size for _, _, size in self.entries())
+            self._estimated_size += change
+
+            return self._estimated_size
+
+    def _set_size(self, size):
+        with self._size_lock:
+            self._estimated_size = size
+
+    def entries(self):
+        """the cache entries, ordered from least to most recently used
+
+        Returns
+        -------
+        list of tuple of str, float and int
+            The key, time of last use, and size in bytes of each entry.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".zarr"):
+                continue
+
+            path = os.path.join(self.directory, name)
+            try:
+                entry = (
+                    name.removesuffix(".zarr"),
+                    os.stat(path).st_mtime,
+                    _directory_size(path),
+                )
+            except FileNotFoundError:
+                # evicted by another process
+                continue
+            entries.append(entry)
+
+        return sorted(entries, key=lambda entry: entry[1])
+
+    def evict(self):
+        """remove least recently used entries until the size budget is met"""
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _, _, size in entries)
+            for key, _, size in entries:
+                if total <= self.max_size:
+                    break
+
+                shutil.rmtree(self._path(key), ignore_errors=True)
+                total -= size
+
+            self._set_size(total)
+
+    def clear(self):
+        """remove all entries"""
+        with self._lock:
+            for key, _, _ in self.entries():
+                shutil.rmtree(self._path(key), ignore_errors=True)
+
+            self._set_size(0)
@@ -1,13 +1,15 @@
+import math
 import posixpath
 
 import numpy as np
 import xarray as xr
-from tlz.dicttoolz import itemmap, merge_with, valfilter, valmap
+from tlz.dicttoolz import itemmap, keyfilter, keymap, merge_with, valfilter, valmap
 from tlz.functoolz import compose_left, curry, flip
 from tlz.itertoolz import first
 
 from safe_rcm.product.dicttoolz import keysplit
-from safe_rcm.product.reader import execute
+from safe_rcm.product.plan import Plan
+from safe_rcm.product.predicates import classification_cache
 from safe_rcm.product.transformers import extract_dataset
 from safe_rcm.xml import read_xml
 
@@ -54,41 +56,183 @@ def _read_level(mapping):
     )
 
 
-def read_noise_level_file(mapper, path):
-    layout = {
-        "/referenceNoiseLevel": {
-            "path": "/referenceNoiseLevel",
-            "f": compose_left(
-                curry(map, _read_level),
-                curry(map, lambda ds: ds.expand_dims("sarCalibrationType")),
-                list,
-                curry(xr.combine_by_coords, combine_attrs="drop_conflicts"),
-            ),
-        },
-        "/perBeamReferenceNoiseLevel": {
-            "path": "/perBeamReferenceNoiseLevel",
-            "f": compose_left(
-                curry(map, _read_level),
-                curry(map, lambda ds: ds.expand_dims("sarCalibrationType")),
-                list,
-                pad_common,
-                curry(xr.combine_by_coords, combine_attrs="drop_conflicts"),
-            ),
-        },
-        "/azimuthNoiseLevelScaling": {
-            "path": "/azimuthNoiseLevelScaling",
-            "f": compose_left(
-                curry(map, _read_level),
-                list,
-                pad_common,
-                curry(xr.combine_by_coords, combine_attrs="drop_conflicts"),
-            ),
-        },
+# combine the datasets of the individual entries, for tables that don't have one
+# entry per combination of labels
+_combine_reference_levels = compose_left(
+    curry(map, _read_level),
+    curry(map, lambda ds: ds.expand_dims("sarCalibrationType")),
+    list,
+    curry(xr.combine_by_coords, combine_attrs="drop_conflicts"),
+)
+_combine_per_beam_levels = compose_left(
+    curry(map, _read_level),
+    curry(map, lambda ds: ds.expand_dims("sarCalibrationType")),
+    list,
+    pad_common,
+    curry(xr.combine_by_coords, combine_attrs="drop_conflicts"),
+)
+_combine_azimuth_scaling = compose_left(
+    curry(map, _read_level),
+    list,
+    pad_common,
+    curry(xr.combine_by_coords, combine_attrs="drop_conflicts"),
+)
+
+_level_coords = ["sarCalibrationType", "pixelFirstNoiseValue", "stepSize"]
+
+
+def _common_attrs(mappings):
+    # same as `combine_attrs="drop_conflicts"`
+    merged = merge_with(list, *mappings)
+
+    return {
+        key: values[0]
+        for key, values in merged.items()
+        if all(value == values[0] for value in values)
+    }
+
+
+def _split_values(entry):
+    values = entry["noiseLevelValues"]
+    if not isinstance(values, dict):
+        return values, {}
+
+    attrs, data = keysplit(lambda k: k.startswith("@"), values)
+
+    return data["$"], keymap(lambda k: k.lstrip("@"), attrs)
+
+
+def _reduce_constant(values, dims):
+    # only keep the dimensions the values vary along
+    varying = [
+        axis
+        for axis in range(values.ndim)
+        if not (values == values.take([0], axis=axis)).all()
+    ]
+    indexer = tuple(
+        slice(None) if axis in varying else 0 for axis in range(values.ndim)
+    )
+
+    return [dims[axis] for axis in varying], values[indexer]
+
+
+def assemble_levels(entries, dims, squeeze=(), fallback=None):
+    """assemble a noise level table by filling preallocated arrays
+
+    Equivalent to reading each entry into a dataset, padding and combining by
+    coordinates, without creating the intermediate datasets.
+
+    Parameters
+    ----------
+    entries : list of mapping
+        The decoded entries of the table.
+    dims : list of str
+        The entries used as dimensions. The labels are sorted.
+    squeeze : list of str, optional
+        Dimensions to store as attributes if they only have a single label.
+    fallback : callable, optional
+        Used to combine entries that don't form a table with exactly one entry
+        per combination of labels.
+
+    Returns
+    -------
+    xarray.Dataset
+        The table. Shorter entries are padded with ``NaN`` along
+        ``coefficients``.
+    """
+    entries = list(entries)
+    if not all(dim in entry for entry in entries for dim in dims):
+        return fallback(entries)
+
+    labels = {dim: np.unique([entry[dim] for entry in entries]) for dim in dims}
+    table_dims = [dim for dim in dims if dim not in squeeze or labels[dim].size > 1]
+    shape = tuple(labels[dim].size for dim in table_dims)
+
+    positions = [
+        tuple(int(np.searchsorted(labels[dim], entry[dim])) for dim in table_dims)
+        for entry in entries
+    ]
+    if len(set(positions)) != len(entries) or math.prod(shape) != len(entries):
+        return fallback(entries)
+
+    ordered = [entry for _, entry in sorted(zip(positions, entries), key=first)]
+    values, values_attrs = zip(*map(_split_values, ordered))
+
+    data = np.full(shape + (max(map(len, values)),), np.nan)
+    flat = data.reshape(-1, data.shape[-1])
+    for row, values_ in zip(flat, values):
+        row[: len(values_)] = values_
+
+    metadata = [
+        keyfilter(lambda k: k not in table_dims and k != "noiseLevelValues", entry)
+        for entry in ordered
+    ]
+    coord_names = {
+        name for entry in metadata for name in entry if name in _level_coords
     }
+    if not all(name in entry for entry in metadata for name in coord_names):
+        return fallback(entries)
+
+    coords = {dim: labels[dim] for dim in table_dims} | {
+        name: _reduce_constant(
+            np.array([entry[name] for entry in metadata]).reshape(shape), table_dims
+        )
+        for name in coord_names
+    }
+    attrs = _common_attrs(
+        [keyfilter(lambda k: k not in coord_names, entry) for entry in metadata]
+    )
+
+    return xr.Dataset(
+        {
+            "noiseLevelValues": (
+                table_dims + ["coefficients"],
+                data,
+                _common_attrs(values_attrs),
+            )
+        },
+        coords=coords,
+        attrs=attrs,
+    )
+
+
+noise_level_layout = {
+    "/referenceNoiseLevel": {
+        "path": "/referenceNoiseLevel",
+        "f": curry(
+            assemble_levels,
+            dims=["sarCalibrationType"],
+            fallback=_combine_reference_levels,
+        ),
+    },
+    "/perBeamReferenceNoiseLevel": {
+        "path": "/perBeamReferenceNoiseLevel",
+        "f": curry(
+            assemble_levels,
+            dims=["sarCalibrationType", "beam"],
+            squeeze=["beam"],
+            fallback=_combine_per_beam_levels,
+        ),
+    },
+    "/azimuthNoiseLevelScaling": {
+        "path": "/azimuthNoiseLevelScaling",
+        "f": curry(
+            assemble_levels,
+            dims=["beam"],
+            squeeze=["beam"],
+            fallback=_combine_azimuth_scaling,
+        ),
+    },
+}
+
+noise_level_plan = Plan(noise_level_layout)
+
 
+def read_noise_level_file(mapper, path):
     decoded = read_xml(mapper, path)
 
-    converted = valmap(lambda x: execute(**x)(decoded), layout)
+    with classification_cache():
+        converted = noise_level_plan(decoded)
 
     return converted
 
@@ -109,3 +253,145 @@ def read_noise_levels(mapper, root, fnames):
     )
 
     return xr.DataTree.from_dict(combined)
+
+
+def read_lookup_tables(mapper, root, fnames):
+    """read the calibration lookup tables
+
+    The gains of each file are written into a single preallocated array.
+
+    Parameters
+    ----------
+    mapper : fsspec.FSMap
+        The product.
+    root : str
+        The directory containing the lookup table files.
+    fnames : xarray.DataArray
+        The file names, along ``sarCalibrationType`` and ``pole``. For
+        products with a single polarization, ``pole`` may be an attribute.
+
+    Returns
+    -------
+    xarray.Dataset
+        The gains, as ``lookup_tables`` along ``coefficients``,
+        ``sarCalibrationType`` and ``pole``, with the attributes of the first
+        file.
+    """
+    if "pole" not in fnames.dims:
+        # the polarization of single-pole products is an attribute
+        fnames = fnames.expand_dims("pole", axis=-1).assign_coords(
+            pole=[fnames.attrs["pole"]]
+        )
+    fnames = fnames.transpose("sarCalibrationType", "pole")
+
+    ordered = fnames.sortby(["sarCalibrationType", "pole"])
+    names = ordered.data.ravel().tolist()
+
+    tables = [
+        extract_dataset(
+            read_xml(mapper, posixpath.join(root, name)), dims="coefficients"
+        )
+        for name in names
+    ]
+    gains = [table["gains"] for table in tables]
+
+    sizes = {arr.size for arr in gains}
+    if len(sizes) != 1:
+        raise ValueError(f"lookup tables have different numbers of gains: {sizes}")
+
+    data = np.empty(
+        (sizes.pop(), len(names)), dtype=np.result_type(*(arr.dtype for arr in gains))
+    )
+    for column, arr in enumerate(gains):
+        data[:, column] = arr.data
+
+    first_table = tables[names.index(fnames.data.flat[0])]
+    attrs = first_table["gains"].attrs | first_table.attrs
+
+    return xr.Dataset(
+        {
+            "lookup_tables": (
+                ["coefficients", "sarCalibrationType", "pole"],
+                data.reshape((-1,) + ordered.shape),
+                attrs,
+            )
+        },
+        coords=ordered.coords,
+    )
+
+
+# names of the calibrated variables
+calibrated_names = {
+    "Sigma Nought": "sigma0",
+    "Beta Nought": "beta0",
+    "Gamma": "gamma0",
+}
+
+
+def interpolate_gains(lookup_tables, pixels):
+    """interpolate the lookup table gains to image pixels
+
+    Parameters
+    ----------
+    lookup_tables : xarray.DataArray
+        The gains of a single calibration type, along ``coefficients``.
+    pixels : array-like
+        The indices of the pixels to interpolate to.
+
+    Returns
+    -------
+    xarray.DataArray
+        The gains along ``x``.
+    """
+    attrs = lookup_tables.attrs
+    lut_pixels = attrs["pixelFirstLutValue"] + attrs["stepSize"] * np.arange(
+        lookup_tables.sizes["coefficients"]
+    )
+    order = np.argsort(lut_pixels)
+
+    def interp(gains):
+        return np.interp(pixels, lut_pixels[order], gains[..., order])
+
+    return xr.apply_ufunc(
+        np.vectorize(interp, signature="(n)->(m)"),
+        lookup_tables,
+        input_core_dims=[["coefficients"]],
+        output_core_dims=[["x"]],
+    )
+
+
+def calibrate(tree, calibration_type="Sigma Nought"):
+    """radiometrically calibrate the imagery
+
+    The calibrated values are computed as ``(DN**2 + offset) / gain``, with the
+    gains linearly interpolated along range.
+
+    Parameters
+    ----------
+    tree : xarray.DataTree
+        The product, as returned by `open_rcm`.
+    calibration_type : {"Sigma Nought", "Beta Nought", "Gamma"}, default: "Sigma Nought"
+        The type of calibration.
+
+    Returns
+    -------
+    xarray.DataArray
+        The calibrated imagery, named after the calibration type.
+    """
+    imagery = tree["/imagery/band_data"]
+    if not np.issubdtype(imagery.dtype, np.floating):
+        # digital numbers, as opened with `dtype_policy="compact"`
+        imagery = imagery.astype("float32")
+    lookup_tables = tree["/lookupTables/lookupTables/lookup_tables"].sel(
+        sarCalibrationType=calibration_type
+    )
+
+    gains = interpolate_gains(lookup_tables, np.arange(imagery.sizes["x"]))
+    offset = lookup_tables.attrs.get("offset", 0.0)
+
+    calibrated = (imagery**2 + offset) / gains.assign_coords(x=imagery["x"])
+    calibrated.attrs = {"calibration_type": calibration_type}
+
+    return calibrated.astype(imagery.dtype).rename(
+        calibrated_names.get(calibration_type, calibration_type)
+    )
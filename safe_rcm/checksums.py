@@ -0,0 +1,168 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from safe_rcm.archive import product_filesystem
+from safe_rcm.manifest import default_manifest_ignores, ignored_file, read_checksums
+
+try:
+    ExceptionGroup
+except NameError:
+    from exceptiongroup import ExceptionGroup
+
+# size of the blocks read at once. Memory use is bounded by
+# ``max_workers * chunk_size``
+default_chunk_size = 4 * 2**20
+
+
+def hash_file(fs, path, algorithm, chunk_size=default_chunk_size):
+    """compute the checksum of a file without loading it into memory
+
+    Parameters
+    ----------
+    fs : fsspec.AbstractFileSystem
+        The filesystem containing the file.
+    path : str
+        The path of the file.
+    algorithm : str
+        The name of the checksum algorithm, as understood by `hashlib.new`.
+        Case and dashes are ignored, such that ``"SHA-256"`` is valid.
+    chunk_size : int, default: 4 MiB
+        The number of bytes to read at once.
+
+    Returns
+    -------
+    checksum : str
+        The hex digest.
+    size : int
+        The number of bytes read.
+    """
+    hasher = hashlib.new(algorithm.lower().replace("-", ""))
+
+    size = 0
+    with fs.open(path, mode="rb", block_size=chunk_size, cache_type="none") as f:
+        while chunk := f.read(chunk_size):
+            # hashlib releases the GIL for large buffers, so this scales across threads
+            hasher.update(chunk)
+            size += len(chunk)
+
+    return hasher.hexdigest(), size
+
+
+def _check_file(fs, chunk_size, path, declared):
+    algorithm, expected, expected_size = declared
+    try:
+        actual, size = hash_file(fs, path, algorithm, chunk_size=chunk_size)
+    except FileNotFoundError:
+        return ValueError(f"{path} does not exist")
+
+    if expected_size is not None and size != expected_size:
+        return ValueError(
+            f"{path}: size mismatch (expected {expected_size} bytes, got {size})"
+        )
+    elif actual != expected:
+        return ValueError(
+            f"{path}: {algorithm} checksum mismatch (expected {expected}, got {actual})"
+        )
+
+    return None
+
+
+def verify_files(
+    fs,
+    checksums,
+    *,
+    manifest_ignores=default_manifest_ignores,
+    max_workers=None,
+    chunk_size=default_chunk_size,
+):
+    """verify the checksums of files in parallel
+
+    Parameters
+    ----------
+    fs : fsspec.AbstractFileSystem
+        Filesystem with paths relative to the product root.
+    checksums : mapping of str to tuple
+        The declared checksums, as returned by `read_checksums`.
+    manifest_ignores : list of str
+        Globs that match files that are allowed to be missing. Files matching
+        these that do exist are still verified.
+    max_workers : int, optional
+        The number of threads. Defaults to the default of `ThreadPoolExecutor`.
+    chunk_size : int, default: 4 MiB
+        The number of bytes each thread reads at once.
+
+    Raises
+    ------
+    ExceptionGroup
+        If any of the files is missing or doesn't match its checksum.
+    """
+    to_check = {
+        path: declared
+        for path, declared in checksums.items()
+        if not ignored_file(path, manifest_ignores) or fs.exists(path)
+    }
+
+    check = partial(_check_file, fs, chunk_size)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(check, to_check, to_check.values()))
+
+    errors = [error for error in results if error is not None]
+    if errors:
+        raise ExceptionGroup(
+            "checksums of some files do not match the manifest", errors
+        )
+
+
+def verify_checksums(
+    url,
+    *,
+    storage_options=None,
+    manifest_ignores=default_manifest_ignores,
+    max_workers=None,
+    chunk_size=default_chunk_size,
+):
+    """verify the files of a product against the checksums in the manifest
+
+    Files are streamed in blocks of ``chunk_size`` bytes and hashed in
+    parallel, such that at most ``max_workers * chunk_size`` bytes are held in
+    memory at any time.
+
+    Parameters
+    ----------
+    url : str or os.PathLike
+        The url of the product, or of the zip archive containing it.
+    storage_options : mapping, optional
+        Additional options for the filesystem.
+    manifest_ignores : list of str, default: ["*.pdf", "*.html", "*.xslt", "*.png", \
+                                              "*.kml", "*.txt", "preview/*"]
+        Globs that match files from the manifest that are allowed to be missing.
+    max_workers : int, optional
+        The number of threads.
+    chunk_size : int, default: 4 MiB
+        The number of bytes each thread reads at once.
+
+    Raises
+    ------
+    ExceptionGroup
+        If any of the files is missing or doesn't match its checksum.
+    """
+    url = os.fspath(url)
+
+    mapper, relative_fs = product_filesystem(url, storage_options)
+
+    try:
+        checksums = read_checksums(mapper, "manifest.safe")
+    except (FileNotFoundError, KeyError):
+        raise ValueError(
+            "cannot find the `manifest.safe` file. Are you sure this is a SAFE dataset?"
+        )
+
+    verify_files(
+        relative_fs,
+        checksums,
+        manifest_ignores=manifest_ignores,
+        max_workers=max_workers,
+        chunk_size=chunk_size,
+    )
@@ -0,0 +1,109 @@
+import numpy as np
+import xarray as xr
+
+dtype_policies = (None, "compact")
+
+# nodes whose floating point values are stored as float32 by the compact policy.
+# Orbit, timing and polynomial coefficients need the full precision.
+compact_float_nodes = (
+    "/lookupTables",
+    "/imageReferenceAttributes/geographicInformation/geolocationGrid",
+)
+
+
+def _is_within(path, roots):
+    return any(path == root or path.startswith(root + "/") for root in roots)
+
+
+def _compact_strings(variable):
+    if variable.dtype != object:
+        return variable
+
+    values = variable.values
+    if not all(isinstance(value, str) for value in values.flat):
+        return variable
+
+    return variable.copy(data=values.astype(str))
+
+
+def _compact_floats(variable):
+    if variable.dtype != np.float64:
+        return variable
+
+    return variable.astype("float32")
+
+
+def compact_dataset(ds, floats=True):
+    """store the values of a dataset in smaller dtypes
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        The dataset to convert.
+    floats : bool, default: True
+        Whether to convert ``float64`` data variables and non-index
+        coordinates to ``float32``.
+
+    Returns
+    -------
+    xarray.Dataset
+        The converted dataset. String coordinates of ``object`` dtype are
+        converted to fixed-width strings.
+    """
+    variables = {name: _compact_strings(ds.variables[name]) for name in ds.coords}
+    if floats:
+        variables |= {
+            name: _compact_floats(variables.get(name, variable))
+            for name, variable in ds.variables.items()
+            if name not in ds.xindexes
+        }
+    changed = {
+        name: variable
+        for name, variable in variables.items()
+        if variable is not ds.variables[name]
+    }
+    if not changed:
+        return ds
+
+    converted = ds.assign_coords(
+        {name: var for name, var in changed.items() if name in ds.coords}
+    ).assign({name: var for name, var in changed.items() if name in ds.data_vars})
+    converted.encoding = ds.encoding
+
+    return converted
+
+
+def apply_dtype_policy(tree, policy):
+    """convert the metadata of a product according to a dtype policy
+
+    Parameters
+    ----------
+    tree : xarray.DataTree
+        The metadata of the product.
+    policy : {None, "compact"}
+        The policy. ``None`` keeps the decoded dtypes. ``"compact"`` stores
+        lookup tables, noise levels, incidence angles and geolocation grids
+        as ``float32`` and string coordinates as fixed-width strings.
+
+    Returns
+    -------
+    xarray.DataTree
+    """
+    if policy not in dtype_policies:
+        raise ValueError(f"unknown dtype policy: {policy!r}")
+    elif policy is None:
+        return tree
+
+    converted = xr.DataTree.from_dict(
+        {
+            node.path: compact_dataset(
+                node.to_dataset(inherit=False),
+                floats=_is_within(node.path, compact_float_nodes),
+            )
+            for node in tree.subtree
+        },
+        name=tree.name,
+    )
+    converted.encoding = tree.encoding
+
+    return converted
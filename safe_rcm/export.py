@@ -0,0 +1,254 @@
+import math
+import os
+
+import xarray as xr
+
+from safe_rcm.api import open_rcm
+from safe_rcm.cache import decode_tree, encode_tree
+from safe_rcm.calibrations import calibrate
+from safe_rcm.imagery import imagery_chunks
+
+try:
+    import zarr
+except ImportError:  # pragma: no cover
+    zarr = None
+
+try:
+    import dask
+except ImportError:  # pragma: no cover
+    dask = None
+
+# root attribute recording the progress of the export
+progress_attr = "_safe_rcm_export"
+
+
+def _open_progress(store, storage_options):
+    try:
+        group = zarr.open_group(
+            store,
+            mode="r+",
+            zarr_format=2,
+            use_consolidated=False,
+            storage_options=storage_options,
+        )
+    except (FileNotFoundError, zarr.errors.GroupNotFoundError):
+        return None, None
+
+    return group, group.attrs.get(progress_attr)
+
+
+def _export_options(tree, imagery, calibration):
+    # the options that determine the layout and the content of the store
+    return {
+        "product": tree.attrs.get("productId"),
+        "sizes": dict(imagery.sizes),
+        "chunks": {dim: sizes[0] for dim, sizes in imagery.chunksizes.items()},
+        "calibration": list(calibration or []),
+    }
+
+
+def _regions(size, chunk_size, chunks_per_region):
+    step = chunk_size * chunks_per_region
+    return [slice(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def to_zarr(
+    tree,
+    store,
+    *,
+    calibration=None,
+    chunks=None,
+    target_chunk_size=64 * 2**20,
+    rows_per_region=None,
+    storage_options=None,
+    resume=True,
+):
+    """write a product to a zarr store
+
+    The metadata and lookup tables are written first, followed by the imagery,
+    which is written in parallel using dask, one region of chunk rows at a
+    time. The completed regions are recorded in the store, such that an
+    interrupted export can be resumed.
+
+    Parameters
+    ----------
+    tree : xarray.DataTree
+        The product, as returned by `open_rcm`.
+    store : str or os.PathLike or zarr store
+        The store to write to.
+    calibration : str or list of str, optional
+        Calibration types to store alongside the imagery, see `calibrate`.
+    chunks : mapping of str to int, optional
+        The chunks of the imagery. Defaults to chunks aligned to the source
+        tiles, see `imagery_chunks`.
+    target_chunk_size : int, default: 64 MiB
+        The approximate size of the default chunks, in bytes.
+    rows_per_region : int, optional
+        The number of chunk rows to write at once. Defaults to enough rows to
+        occupy all workers.
+    storage_options : mapping, optional
+        Additional options for the filesystem of ``store``.
+    resume : bool, default: True
+        Whether to resume an interrupted export. The product, the chunks and
+        the calibration types have to match the existing store. If ``False``,
+        an existing store is overwritten.
+
+    Returns
+    -------
+    bool
+        Whether anything was written. ``False`` if the export was already
+        complete.
+
+    Raises
+    ------
+    ValueError
+        If resuming an export of another product or with different options.
+    """
+    if zarr is None or dask is None:
+        raise ImportError("exporting to zarr requires `zarr` and `dask`")
+
+    if isinstance(store, os.PathLike):
+        store = os.fspath(store)
+    storage_options = storage_options or None
+
+    imagery = tree["/imagery"].to_dataset(inherit=False)
+    if chunks is None:
+        chunks = imagery_chunks(imagery, target_size=target_chunk_size)
+    imagery = imagery.chunk(chunks)
+
+    if isinstance(calibration, str):
+        calibration = [calibration]
+    calibrated = [
+        calibrate(tree.assign({"imagery": xr.DataTree(imagery)}), calibration_type)
+        for calibration_type in calibration or []
+    ]
+    imagery = imagery.assign({arr.name: arr.chunk(chunks) for arr in calibrated})
+
+    options = _export_options(tree, imagery, calibration)
+    group, progress = _open_progress(store, storage_options) if resume else (None, None)
+    if progress is not None and progress.get("options") != options:
+        stored = progress.get("options") or {}
+        differing = sorted(
+            name for name in options if stored.get(name) != options[name]
+        )
+        raise ValueError(
+            f"cannot resume the export to {store!r}: the store was written with"
+            f" different {', '.join(differing)}. Pass `resume=False` to overwrite it."
+        )
+    if progress is not None and progress.get("complete"):
+        return False
+
+    if progress is None:
+        # writes the metadata and creates the imagery arrays without data
+        encoded = encode_tree(tree.assign({"imagery": xr.DataTree(imagery)}))
+        encoded.to_zarr(
+            store,
+            mode="w",
+            zarr_format=2,
+            consolidated=False,
+            compute=False,
+            storage_options=storage_options,
+        )
+        group, _ = _open_progress(store, storage_options)
+        progress = {"complete": False, "regions": [], "options": options}
+        group.attrs[progress_attr] = progress
+
+    size_y = imagery.sizes["y"]
+    chunk_y = imagery.chunksizes["y"][0]
+    if rows_per_region is None:
+        chunks_per_row = math.prod(
+            len(imagery.chunksizes[dim]) for dim in ("pole", "band", "x")
+        )
+        n_workers = os.cpu_count() or 1
+        rows_per_region = max(1, math.ceil(2 * n_workers / chunks_per_row))
+
+    to_write = imagery.drop_vars(
+        [name for name, var in imagery.variables.items() if "y" not in var.dims]
+    )
+    done = set(progress["regions"])
+    for region in _regions(size_y, chunk_y, rows_per_region):
+        if region.start in done:
+            continue
+
+        to_write.isel(y=region).to_zarr(
+            store,
+            group="imagery",
+            region={"y": region},
+            mode="r+",
+            zarr_format=2,
+            consolidated=False,
+            storage_options=storage_options,
+        )
+
+        progress["regions"].append(region.start)
+        group.attrs[progress_attr] = progress
+
+    progress["complete"] = True
+    group.attrs[progress_attr] = progress
+    zarr.consolidate_metadata(group.store)
+
+    return True
+
+
+def convert(url, store, *, open_kwargs=None, **kwargs):
+    """convert a product to zarr
+
+    Parameters
+    ----------
+    url : str
+        The url of the product.
+    store : str or os.PathLike or zarr store
+        The store to write to.
+    open_kwargs : mapping, optional
+        Additional keyword arguments for `open_rcm`.
+    **kwargs
+        Additional keyword arguments for `to_zarr`.
+
+    Returns
+    -------
+    bool
+        Whether anything was written.
+    """
+    tree = open_rcm(url, **(open_kwargs or {}))
+
+    return to_zarr(tree, store, **kwargs)
+
+
+def open_zarr(store, *, storage_options=None, chunks=None):
+    """open a product exported with `to_zarr`
+
+    Parameters
+    ----------
+    store : str or os.PathLike or zarr store
+        The exported product.
+    storage_options : mapping, optional
+        Additional options for the filesystem of ``store``.
+    chunks : mapping or {"auto"}, optional
+        The chunks of the imagery. Defaults to the stored chunks.
+
+    Returns
+    -------
+    xarray.DataTree
+        The product. The imagery is lazily loaded.
+    """
+    if isinstance(store, os.PathLike):
+        store = os.fspath(store)
+    storage_options = storage_options or None
+
+    stored = xr.open_datatree(
+        store,
+        engine="zarr",
+        zarr_format=2,
+        chunks={} if chunks is None else chunks,
+        decode_timedelta=False,
+        storage_options=storage_options,
+    )
+
+    progress = stored.attrs.get(progress_attr, {})
+    if not progress.get("complete"):
+        raise ValueError(f"the export to {store!r} is incomplete")
+
+    tree = decode_tree(stored)
+    tree.attrs.pop(progress_attr, None)
+
+    return tree
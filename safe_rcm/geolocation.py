@@ -0,0 +1,210 @@
+import weakref
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # pragma: no cover
+    cKDTree = None
+
+geolocation_grid_path = (
+    "/imageReferenceAttributes/geographicInformation/geolocationGrid"
+)
+
+_indexes = {}
+
+
+def to_cartesian(lat, lon):
+    """convert geodetic coordinates to unit vectors"""
+    lat_ = np.deg2rad(lat)
+    lon_ = np.deg2rad(lon)
+
+    return np.stack(
+        [np.cos(lat_) * np.cos(lon_), np.cos(lat_) * np.sin(lon_), np.sin(lat_)],
+        axis=-1,
+    )
+
+
+class GeolocationIndex:
+    """spatial index over the tie points of a geolocation grid
+
+    Parameters
+    ----------
+    grid : xarray.Dataset
+        The geolocation grid. Must contain the ``latitude`` and ``longitude``
+        variables on the ``line`` and ``pixel`` dimensions.
+    """
+
+    def __init__(self, grid):
+        if cKDTree is None:
+            raise ImportError("building a geolocation index requires `scipy`")
+
+        # the grid may be stored as float32, see `dtype_policy`
+        latitude = np.asarray(
+            grid["latitude"].transpose("line", "pixel"), dtype="float64"
+        )
+        longitude = np.asarray(
+            grid["longitude"].transpose("line", "pixel"), dtype="float64"
+        )
+        if any(size < 2 for size in latitude.shape):
+            raise ValueError(
+                f"need at least 2x2 tie points to build an index, got {latitude.shape}"
+            )
+
+        self.lines = np.asarray(grid["line"].values, dtype="float64")
+        self.pixels = np.asarray(grid["pixel"].values, dtype="float64")
+        self.latitude = latitude
+        self.longitude = longitude
+        # search in cartesian space to avoid issues at the poles and the antimeridian
+        self.tree = cKDTree(to_cartesian(latitude, longitude).reshape(-1, 3))
+
+    @property
+    def shape(self):
+        return self.latitude.shape
+
+    def _refine(self, lat, lon, fi, fj, max_iterations, tolerance):
+        n_lines, n_pixels = self.shape
+
+        for _ in range(max_iterations):
+            i0 = np.clip(np.floor(fi).astype(int), 0, n_lines - 2)
+            j0 = np.clip(np.floor(fj).astype(int), 0, n_pixels - 2)
+            u = fi - i0
+            v = fj - j0
+
+            corners = [(i0, j0), (i0 + 1, j0), (i0, j0 + 1), (i0 + 1, j0 + 1)]
+            # residuals relative to the target, with longitude differences wrapped
+            # to [-180, 180) to support grids crossing the antimeridian
+            dlat = [self.latitude[i, j] - lat for i, j in corners]
+            dlon = [(self.longitude[i, j] - lon + 180) % 360 - 180 for i, j in corners]
+
+            def bilinear(c00, c10, c01, c11):
+                value = (
+                    (1 - u) * (1 - v) * c00
+                    + u * (1 - v) * c10
+                    + (1 - u) * v * c01
+                    + u * v * c11
+                )
+                du = (1 - v) * (c10 - c00) + v * (c11 - c01)
+                dv = (1 - u) * (c01 - c00) + u * (c11 - c10)
+
+                return value, du, dv
+
+            f, f_u, f_v = bilinear(*dlat)
+            g, g_u, g_v = bilinear(*dlon)
+
+            # newton step: solve J Δ = -r
+            determinant = f_u * g_v - f_v * g_u
+            step_i = (f_v * g - g_v * f) / determinant
+            step_j = (g_u * f - f_u * g) / determinant
+            fi = fi + step_i
+            fj = fj + step_j
+
+            if np.all(np.abs(step_i) < tolerance) and np.all(
+                np.abs(step_j) < tolerance
+            ):
+                break
+
+        return fi, fj
+
+    def locate(self, lat, lon, *, max_iterations=10, tolerance=1e-9):
+        """find image coordinates of geodetic coordinates
+
+        Parameters
+        ----------
+        lat, lon : array-like
+            The coordinates to look up, in degrees.
+        max_iterations : int, default: 10
+            The maximum number of refinement steps.
+        tolerance : float, default: 1e-9
+            Stop refining once all steps are smaller than this, in units of
+            tie point cells.
+
+        Returns
+        -------
+        line, pixel : numpy.ndarray
+            The image coordinates, with the shape of the broadcast inputs. Points
+            outside of the geolocation grid are set to ``nan``.
+        """
+        lat, lon = np.broadcast_arrays(
+            np.asarray(lat, dtype="float64"), np.asarray(lon, dtype="float64")
+        )
+        shape = lat.shape
+
+        target = to_cartesian(lat.ravel(), lon.ravel())
+        _, nearest = self.tree.query(target)
+        fi, fj = np.unravel_index(nearest, self.shape)
+
+        fi, fj = self._refine(
+            lat.ravel(),
+            lon.ravel(),
+            fi.astype("float64"),
+            fj.astype("float64"),
+            max_iterations=max_iterations,
+            tolerance=tolerance,
+        )
+
+        n_lines, n_pixels = self.shape
+        margin = 1e-6
+        outside = (
+            (fi < -margin)
+            | (fi > n_lines - 1 + margin)
+            | (fj < -margin)
+            | (fj > n_pixels - 1 + margin)
+        )
+
+        line = np.interp(fi, np.arange(n_lines), self.lines)
+        pixel = np.interp(fj, np.arange(n_pixels), self.pixels)
+        line[outside] = np.nan
+        pixel[outside] = np.nan
+
+        return line.reshape(shape), pixel.reshape(shape)
+
+
+def geolocation_index(tree):
+    """spatial index of the geolocation grid of an opened product
+
+    The index is built once and cached for as long as the geolocation grid
+    node of the tree is alive.
+
+    Parameters
+    ----------
+    tree : xarray.DataTree
+        The product, as returned by `safe_rcm.open_rcm`.
+
+    Returns
+    -------
+    GeolocationIndex
+    """
+    node = tree[geolocation_grid_path]
+
+    key = id(node)
+    cached = _indexes.get(key)
+    if cached is not None and cached[0]() is node:
+        return cached[1]
+
+    index = GeolocationIndex(node.to_dataset())
+    _indexes[key] = (weakref.ref(node), index)
+    weakref.finalize(node, _indexes.pop, key, None)
+
+    return index
+
+
+def locate(tree, lat, lon, **kwargs):
+    """find image coordinates of geodetic coordinates
+
+    Parameters
+    ----------
+    tree : xarray.DataTree
+        The product, as returned by `safe_rcm.open_rcm`.
+    lat, lon : array-like
+        The coordinates to look up, in degrees.
+    **kwargs
+        Additional parameters for `GeolocationIndex.locate`.
+
+    Returns
+    -------
+    line, pixel : numpy.ndarray
+        The image coordinates. Points outside of the geolocation grid are set to
+        ``nan``.
+    """
+    return geolocation_index(tree).locate(lat, lon, **kwargs)
@@ -0,0 +1,572 @@
+import contextvars
+import math
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import xarray as xr
+from fsspec.utils import tokenize
+from xarray.backends import BackendArray, BackendEntrypoint
+from xarray.core import indexing
+
+from safe_rcm.archive import MemberFile, product_filesystem
+
+# the TIFF header and the first image file directory are usually within the
+# first bytes of the file
+header_size = 2**16
+
+# limits of the block size derived from the tile sizes
+min_block_size = 2**16
+max_block_size = 2**24
+
+# the maximum number of bytes read ahead of the requested blocks. GDAL reads
+# tiles one at a time, so this merges the reads of neighbouring tiles.
+readahead_size = 2**22
+
+# tags containing the sizes of the tiles or strips, in order of preference
+byte_count_tags = (325, 279)
+
+# formats of the SHORT, LONG and LONG8 field types
+field_formats = {3: "H", 4: "L", 16: "Q"}
+
+
+def tiff_byte_counts(header, fetch):
+    """the sizes of the tiles or strips of the first image of a TIFF file
+
+    Parameters
+    ----------
+    header : bytes
+        The first bytes of the file.
+    fetch : callable
+        Fetches the bytes between ``start`` and ``end``, for structures
+        outside of ``header``.
+
+    Returns
+    -------
+    tuple of int
+        The number of bytes of each tile or strip.
+    """
+    order = {b"II": "<", b"MM": ">"}.get(header[:2])
+    if order is None or len(header) < 8:
+        raise ValueError("not a TIFF file")
+
+    def read(start, size):
+        if start + size <= len(header):
+            return header[start : start + size]
+
+        return fetch(start, start + size)
+
+    (version,) = struct.unpack_from(f"{order}H", header, 2)
+    if version == 42:
+        count_format, offset_format = "H", "L"
+        (ifd_offset,) = struct.unpack_from(f"{order}L", header, 4)
+    elif version == 43:
+        count_format, offset_format = "Q", "Q"
+        (ifd_offset,) = struct.unpack_from(f"{order}Q", read(8, 8), 0)
+    else:
+        raise ValueError(f"unknown TIFF version: {version}")
+
+    count_size = struct.calcsize(order + count_format)
+    offset_size = struct.calcsize(order + offset_format)
+    entry_format = f"{order}HH{offset_format}"
+    entry_size = 4 + 2 * offset_size
+
+    (n_entries,) = struct.unpack(f"{order}{count_format}", read(ifd_offset, count_size))
+    entries = read(ifd_offset + count_size, n_entries * entry_size)
+
+    fields = {}
+    for index in range(n_entries):
+        start = index * entry_size
+        tag, type_, count = struct.unpack_from(entry_format, entries, start)
+        if tag in byte_count_tags and type_ in field_formats:
+            fields[tag] = (type_, count, start + 4 + offset_size)
+
+    tag = next((tag for tag in byte_count_tags if tag in fields), None)
+    if tag is None:
+        raise ValueError("the TIFF file has neither tiles nor strips")
+
+    type_, count, value_start = fields[tag]
+    value_format = f"{order}{count}{field_formats[type_]}"
+    size = struct.calcsize(value_format)
+    if size <= offset_size:
+        data = entries[value_start : value_start + size]
+    else:
+        (offset,) = struct.unpack_from(f"{order}{offset_format}", entries, value_start)
+        data = read(offset, size)
+
+    return struct.unpack(value_format, data)
+
+
+def tile_block_size(header, fetch):
+    """choose a block size such that a tile spans at most two blocks
+
+    Falls back to `max_block_size` if the sizes of the tiles can't be
+    determined.
+    """
+    try:
+        byte_counts = tiff_byte_counts(header, fetch)
+    except (ValueError, struct.error):
+        return max_block_size
+
+    return min(max(max(byte_counts, default=0), min_block_size), max_block_size)
+
+
+class TileCache:
+    """least recently used cache of file blocks, with a shared memory limit
+
+    Blocks requested by multiple threads at the same time are only fetched
+    once, and runs of adjacent missing blocks are fetched using a single
+    request.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The maximum size of all cached blocks, in bytes.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._blocks = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            f"<{type(self).__name__}: {len(self._blocks)} blocks,"
+            f" {self.nbytes} / {self.max_bytes} bytes>"
+        )
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self.nbytes = 0
+
+    def _insert(self, key, block):
+        self._blocks[key] = block
+        self.nbytes += len(block)
+        while self.nbytes > self.max_bytes and self._blocks:
+            _, evicted = self._blocks.popitem(last=False)
+            self.nbytes -= len(evicted)
+
+    def get(self, file_key, indices, fetch, readahead=0, n_blocks=0):
+        """get blocks of a file, fetching missing blocks
+
+        Parameters
+        ----------
+        file_key : hashable
+            Identifies the file.
+        indices : sequence of int
+            The indices of the blocks, in increasing order.
+        fetch : callable
+            Fetches the blocks from ``first`` to ``last``, inclusive, and
+            returns them as a list of bytes.
+        readahead : int, default: 0
+            The maximum number of blocks following each run of missing blocks
+            to fetch with the same request, if they are neither cached nor
+            being fetched. Neighbouring reads then wait for that request
+            instead of issuing their own.
+        n_blocks : int, default: 0
+            The number of blocks of the file. Limits the read-ahead.
+
+        Returns
+        -------
+        dict of int to bytes
+        """
+        blocks = {}
+        waiting = {}
+        runs = []
+        with self._lock:
+            for index in indices:
+                key = (file_key, index)
+                if key in self._blocks:
+                    self._blocks.move_to_end(key)
+                    blocks[index] = self._blocks[key]
+                elif key in self._pending:
+                    waiting[index] = self._pending[key]
+                elif runs and runs[-1][-1] == index - 1:
+                    runs[-1].append(index)
+                else:
+                    runs.append([index])
+
+            for run in runs:
+                following = range(run[-1] + 1, min(run[-1] + 1 + readahead, n_blocks))
+                for index in following:
+                    key = (file_key, index)
+                    if index in indices or key in self._blocks or key in self._pending:
+                        break
+                    run.append(index)
+
+            missing = [index for run in runs for index in run]
+            for index in missing:
+                self._pending[(file_key, index)] = Future()
+
+        try:
+            for run in runs:
+                fetched = fetch(run[0], run[-1])
+                if len(fetched) != len(run):
+                    raise ValueError(
+                        f"expected {len(run)} blocks, got {len(fetched)} blocks"
+                    )
+                with self._lock:
+                    for index, block in zip(run, fetched):
+                        self._insert((file_key, index), block)
+                        self._pending.pop((file_key, index)).set_result(block)
+                        blocks[index] = block
+        except BaseException as e:
+            # let the waiting threads fail as well
+            with self._lock:
+                for index in missing:
+                    future = self._pending.pop((file_key, index), None)
+                    if future is not None:
+                        future.set_exception(e)
+            raise
+
+        blocks.update((index, future.result()) for index, future in waiting.items())
+
+        return blocks
+
+
+# shared by all products opened with `tile_cache=True`
+default_tile_cache = TileCache(max_bytes=2**28)
+
+
+class FileBlocks:
+    """the blocks of a single file in a `TileCache`
+
+    Implements the interface of the `MemberBlocks` used by `MemberFile`.
+    """
+
+    def __init__(self, cache, key, fetcher, size, block_size, header=b""):
+        self.cache = cache
+        self.key = key
+        self.fetcher = fetcher
+        self.size = size
+        self.block_size = block_size
+        self.header = header
+
+        self.n_blocks = -(-size // block_size)
+        self.readahead = readahead_size // block_size
+
+    @classmethod
+    def from_fetcher(cls, cache, key, fetcher, size):
+        """choose the block size from the header of the file"""
+        header = fetcher(0, min(size, header_size))
+        block_size = tile_block_size(header, fetcher)
+
+        return cls(cache, key, fetcher, size, block_size, header)
+
+    def _fetch_blocks(self, first, last):
+        start = first * self.block_size
+        end = min(self.size, (last + 1) * self.block_size)
+        data = self.fetcher(start, end)
+
+        return [
+            data[offset : offset + self.block_size]
+            for offset in range(0, len(data), self.block_size)
+        ]
+
+    def fetch(self, start, end):
+        """the bytes between ``start`` and ``end``"""
+        if end <= len(self.header):
+            return self.header[start:end]
+        elif start >= end:
+            return b""
+
+        first = start // self.block_size
+        last = (end - 1) // self.block_size
+        indices = range(first, last + 1)
+
+        blocks = self.cache.get(
+            self.key,
+            indices,
+            self._fetch_blocks,
+            readahead=self.readahead,
+            n_blocks=self.n_blocks,
+        )
+        data = b"".join(blocks[index] for index in indices)
+        offset = first * self.block_size
+
+        return data[start - offset : end - offset]
+
+
+class CachedFile(MemberFile):
+    """seekable read-only file backed by a shared `TileCache`
+
+    Parameters
+    ----------
+    name : str
+        The name of the file.
+    blocks : FileBlocks
+        The blocks of the file.
+    """
+
+    def __init__(self, name, blocks):
+        self.name = name
+        self.size = blocks.size
+        self.loc = 0
+        self.cache = blocks
+
+
+class ProductOpener:
+    """picklable rasterio opener for the files of a product
+
+    Implements the filesystem interface expected by the ``opener`` parameter
+    of `rasterio.open`, such that GDAL reads the files through fsspec. The
+    opener pickles as the url and storage options: the filesystem is
+    recreated on first use after unpickling, which keeps dask graphs small.
+
+    Parameters
+    ----------
+    url : str
+        The url of the product.
+    storage_options : mapping, optional
+        Additional options for the filesystem.
+    fs : fsspec.AbstractFileSystem, optional
+        Already opened filesystem with paths relative to the product root. Not
+        pickled.
+    tile_cache : bool, default: False
+        Whether to read the files through `default_tile_cache`, using blocks
+        the size of the tiles of the files.
+    """
+
+    def __init__(self, url, storage_options=None, fs=None, tile_cache=False):
+        self.url = url
+        self.storage_options = dict(storage_options or {})
+        self.prefix = url.rstrip("/")
+        self.tile_cache = tile_cache
+        self._fs = fs
+        self._listings = {}
+        self._blocks = {}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.url!r})"
+
+    def __reduce__(self):
+        return type(self), (self.url, self.storage_options, None, self.tile_cache)
+
+    def __eq__(self, other):
+        if not isinstance(other, ProductOpener):
+            return NotImplemented
+
+        return (self.url, self.storage_options, self.tile_cache) == (
+            other.url,
+            other.storage_options,
+            other.tile_cache,
+        )
+
+    def __hash__(self):
+        return hash((self.url, tokenize(self.storage_options), self.tile_cache))
+
+    @property
+    def fs(self):
+        if self._fs is None:
+            _, self._fs = product_filesystem(self.url, self.storage_options)
+
+        return self._fs
+
+    def path(self, relative_path):
+        """the path to pass to `rasterio.open` for a file of the product"""
+        return f"{self.prefix}/{relative_path}"
+
+    def _relative(self, path):
+        if path == self.prefix:
+            return ""
+
+        return path.removeprefix(self.prefix + "/")
+
+    def open(self, path, mode="rb"):
+        relative_path = self._relative(path)
+        if not self.tile_cache or mode != "rb":
+            return self.fs.open(relative_path, mode)
+
+        # the imagery is reopened for each read, so keep the header
+        blocks = self._blocks.get(relative_path)
+        if blocks is None:
+            size = self.fs.size(relative_path)
+            key = (self.url, tokenize(self.storage_options), relative_path, size)
+
+            def fetcher(start, end):
+                return self.fs.cat_file(relative_path, start=start, end=end)
+
+            blocks = self._blocks[relative_path] = FileBlocks.from_fetcher(
+                default_tile_cache, key, fetcher, size
+            )
+
+        return CachedFile(path, blocks)
+
+    def isfile(self, path):
+        return self.fs.isfile(self._relative(path))
+
+    def isdir(self, path):
+        return self.fs.isdir(self._relative(path))
+
+    def ls(self, path, detail=False):
+        # listing the directory once avoids probing for each sidecar file, and
+        # the listing is shared by all files in the directory
+        relative_path = self._relative(path)
+        listing = self._listings.get(relative_path)
+        if listing is None:
+            listing = self._listings[relative_path] = [
+                self.path(name) for name in self.fs.ls(relative_path, detail=False)
+            ]
+
+        return list(listing)
+
+    def mtime(self, path):
+        # not used by the GeoTIFF driver
+        return 0
+
+    def size(self, path):
+        return self.fs.size(self._relative(path))
+
+
+def _open_file(path, opener, kwargs):
+    # per-thread file handles, which are not shared through xarray's file cache
+    open_kwargs = {"opener": opener} | kwargs.get("open_kwargs", {})
+
+    return xr.open_dataset(
+        path,
+        engine="rasterio",
+        lock=False,
+        chunks=None,
+        cache=False,
+        **(kwargs | {"open_kwargs": open_kwargs}),
+    )
+
+
+class ImageryArray(BackendArray):
+    """lazily read variable of an imagery file
+
+    Each read opens, reads and closes the file in a context of its own.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file, as passed to `rasterio.open`.
+    opener : ProductOpener
+        The opener for the files of the product.
+    name : str
+        The name of the variable.
+    shape : tuple of int
+        The shape of the variable.
+    dtype : numpy.dtype
+        The decoded data type of the variable.
+    kwargs : mapping
+        Keyword arguments forwarded to `xr.open_dataset`.
+    """
+
+    def __init__(self, path, opener, name, shape, dtype, kwargs):
+        self.path = path
+        self.opener = opener
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.kwargs = kwargs
+
+    def __getitem__(self, key):
+        return indexing.explicit_indexing_adapter(
+            key, self.shape, indexing.IndexingSupport.OUTER, self._getitem
+        )
+
+    def _read(self, key):
+        with _open_file(self.path, self.opener, self.kwargs) as ds:
+            return ds[self.name].variable[key].values
+
+    def _getitem(self, key):
+        # rasterio keeps the files opened through an opener in context variables,
+        # so a file has to be closed in the context it was opened in. Threads
+        # start with an empty context that is discarded when they exit, so files
+        # kept open across reads would be released while still in use, or closed
+        # in the wrong context.
+        return contextvars.Context().run(self._read, key)
+
+
+class ImageryBackendEntrypoint(BackendEntrypoint):
+    """open imagery files through a `ProductOpener`
+
+    Only the metadata is read when opening: the data variables are read using
+    `ImageryArray`. Takes the parameters of the ``"rasterio"`` engine, except
+    for ``lock``.
+    """
+
+    description = "Open the imagery files of RCM products"
+
+    open_dataset_parameters = (
+        "filename_or_obj",
+        "drop_variables",
+        "opener",
+        "parse_coordinates",
+        "masked",
+        "mask_and_scale",
+        "variable",
+        "group",
+        "default_name",
+        "decode_coords",
+        "decode_times",
+        "decode_timedelta",
+        "band_as_variable",
+        "open_kwargs",
+    )
+
+    def guess_can_open(self, filename_or_obj):
+        return False
+
+    def open_dataset(self, filename_or_obj, *, drop_variables=None, opener, **kwargs):
+        kwargs = kwargs | {"drop_variables": drop_variables}
+
+        context = contextvars.Context()
+        ds = context.run(_open_file, filename_or_obj, opener, kwargs)
+        context.run(ds.close)
+
+        variables = {
+            name: xr.Variable(
+                var.dims,
+                indexing.LazilyIndexedArray(
+                    ImageryArray(
+                        filename_or_obj, opener, name, var.shape, var.dtype, kwargs
+                    )
+                ),
+                var.attrs,
+                var.encoding,
+            )
+            for name, var in ds.data_vars.items()
+        }
+        imagery = ds.assign(variables)
+        imagery.set_close(None)
+
+        return imagery
+
+
+def imagery_chunks(imagery, target_size=64 * 2**20):
+    """choose chunks that are aligned to the tiles of the source files
+
+    Parameters
+    ----------
+    imagery : xarray.Dataset
+        The imagery, as opened by `open_rcm`.
+    target_size : int, default: 64 MiB
+        The approximate size of each chunk, in bytes.
+
+    Returns
+    -------
+    dict of str to int
+        The chunks. Each chunk contains a single polarization and an integer
+        number of tiles.
+    """
+    variable = imagery["band_data"]
+    preferred = variable.encoding.get("preferred_chunks", {})
+
+    tile_y = preferred.get("y", variable.sizes["y"])
+    tile_x = preferred.get("x", variable.sizes["x"])
+    tile_size = tile_y * tile_x * variable.dtype.itemsize
+
+    n_tiles = max(1, math.isqrt(max(1, target_size // tile_size)))
+
+    return {
+        "pole": 1,
+        "band": 1,
+        "y": min(variable.sizes["y"], n_tiles * tile_y),
+        "x": min(variable.sizes["x"], n_tiles * tile_x),
+    }
@@ -0,0 +1,318 @@
+"""build a catalog of RCM products
+
+Usage::
+
+    python -m safe_rcm.index <root> -o catalog.parquet
+
+Options for the filesystem, like credentials or endpoints, are passed as a
+JSON object, e.g. ``--storage-options '{"anon": true}'``.
+
+The catalog is a directory of parquet files, which can be read using
+``pandas.read_parquet("catalog.parquet")``. Each part file is written
+atomically, so an interrupted run can be resumed by running the same command
+again: products already contained in the catalog are skipped.
+"""
+
+import argparse
+import json
+import os
+import posixpath
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import fsspec
+import numpy as np
+import pandas as pd
+from lxml import etree
+from tlz.itertoolz import partition_all
+
+manifest_name = "manifest.safe"
+product_path = "metadata/product.xml"
+
+text_fields = {
+    "product_id": "productId",
+    "satellite": "sourceAttributes/satellite",
+    "beam_mode": "sourceAttributes/beamModeMnemonic",
+    "acquisition_type": "sourceAttributes/radarParameters/acquisitionType",
+    "polarizations": "sourceAttributes/radarParameters/polarizations",
+    "pass_direction": "sourceAttributes/orbitAndAttitude/orbitInformation/passDirection",
+    "product_type": "imageGenerationParameters/generalProcessingInformation/productType",
+}
+time_fields = {
+    "start_time": "imageGenerationParameters/sarProcessingInformation/zeroDopplerTimeFirstLine",
+    "stop_time": "imageGenerationParameters/sarProcessingInformation/zeroDopplerTimeLastLine",
+}
+tie_point_path = (
+    "imageReferenceAttributes/geographicInformation/geolocationGrid/imageTiePoint"
+)
+
+
+def _any_namespace(path):
+    return "/".join(f"{{*}}{part}" for part in path.split("/"))
+
+
+def find_products(root, storage_options=None):
+    """find all products below a root directory
+
+    Parameters
+    ----------
+    root : str
+        The url of the root directory.
+    storage_options : mapping, optional
+        Additional options for the filesystem.
+
+    Returns
+    -------
+    list of str
+        The urls of the products, sorted.
+    """
+    fs, path = fsspec.core.url_to_fs(root, **(storage_options or {}))
+
+    manifests = fs.glob(posixpath.join(path, "**", manifest_name))
+
+    return sorted(fs.unstrip_protocol(posixpath.dirname(p)) for p in manifests)
+
+
+def extract_footprint(root):
+    """extract the footprint from the boundary of the geolocation grid
+
+    Returns
+    -------
+    str
+        The footprint as a WKT polygon.
+    """
+    tie_points = [
+        [
+            float(point.findtext(_any_namespace(path)))
+            for path in [
+                "imageCoordinate/line",
+                "imageCoordinate/pixel",
+                "geodeticCoordinate/latitude",
+                "geodeticCoordinate/longitude",
+            ]
+        ]
+        for point in root.iterfind(_any_namespace(tie_point_path))
+    ]
+    if not tie_points:
+        return None
+
+    line, pixel, latitude, longitude = np.array(tie_points).T
+    lines, line_index = np.unique(line, return_inverse=True)
+    pixels, pixel_index = np.unique(pixel, return_inverse=True)
+
+    grid = np.full((lines.size, pixels.size, 2), np.nan)
+    grid[line_index, pixel_index] = np.stack([longitude, latitude], axis=-1)
+
+    # walk the boundary clockwise in image coordinates
+    boundary = np.concatenate(
+        [
+            grid[0, :-1],
+            grid[:-1, -1],
+            grid[-1, :0:-1],
+            grid[:0:-1, 0],
+            grid[:1, 0],
+        ]
+    )
+    coordinates = ", ".join(f"{lon} {lat}" for lon, lat in boundary)
+
+    return f"POLYGON (({coordinates}))"
+
+
+def extract_record(url, storage_options=None):
+    """extract the catalog fields of a single product
+
+    Only ``manifest.safe`` and ``metadata/product.xml`` are read, and the xml
+    is parsed without decoding it using the schema.
+
+    Parameters
+    ----------
+    url : str
+        The url of the product.
+    storage_options : mapping, optional
+        Additional options for the filesystem.
+
+    Returns
+    -------
+    dict
+        The catalog record.
+    """
+    mapper = fsspec.get_mapper(url, **(storage_options or {}))
+
+    manifest = etree.fromstring(mapper[manifest_name])
+    sizes = [
+        int(stream.get("size", 0))
+        for stream in manifest.iterfind(".//{*}dataObject/{*}byteStream")
+    ]
+
+    root = etree.fromstring(mapper[product_path])
+    texts = {
+        name: root.findtext(_any_namespace(path)) for name, path in text_fields.items()
+    }
+    times = {
+        name: pd.Timestamp(root.findtext(_any_namespace(path)))
+        for name, path in time_fields.items()
+    }
+
+    return (
+        {"url": url}
+        | texts
+        | times
+        | {
+            "footprint": extract_footprint(root),
+            "n_files": len(sizes),
+            "size": sum(sizes),
+        }
+    )
+
+
+def _try_extract_record(url, storage_options=None):
+    try:
+        return extract_record(url, storage_options=storage_options), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def indexed_urls(output):
+    """the urls of the products already contained in the catalog"""
+    if not os.path.isdir(output) or not any(
+        name.endswith(".parquet") for name in os.listdir(output)
+    ):
+        return set()
+
+    return set(pd.read_parquet(output, columns=["url"])["url"])
+
+
+def write_part(records, output):
+    """atomically write a new part file to the catalog"""
+    os.makedirs(output, exist_ok=True)
+
+    existing = [name for name in os.listdir(output) if name.endswith(".parquet")]
+    path = os.path.join(output, f"part-{len(existing):05d}.parquet")
+    tmp_path = os.path.join(output, f".{os.path.basename(path)}.tmp")
+
+    pd.DataFrame.from_records(records).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def index_products(
+    root,
+    output,
+    *,
+    storage_options=None,
+    max_workers=None,
+    batch_size=1000,
+    log=None,
+):
+    """index all products below a root directory
+
+    Parameters
+    ----------
+    root : str
+        The url of the root directory.
+    output : str
+        The local path of the catalog directory.
+    storage_options : mapping, optional
+        Additional options for the filesystem.
+    max_workers : int, optional
+        The number of worker processes. Defaults to the number of cpus.
+    batch_size : int, default: 1000
+        The number of products per part file.
+    log : file-like, optional
+        Where to report progress and failed products.
+
+    Returns
+    -------
+    n_indexed, n_failed : int
+        The number of new records and of products that could not be indexed.
+        Failed products are not written to the catalog, and will be retried on
+        resume.
+    """
+    done = indexed_urls(output)
+    urls = [url for url in find_products(root, storage_options) if url not in done]
+
+    extract = partial(_try_extract_record, storage_options=storage_options)
+    n_workers = max_workers or os.cpu_count() or 1
+
+    n_indexed = 0
+    n_failed = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for batch in partition_all(batch_size, urls):
+            chunksize = max(1, len(batch) // (4 * n_workers))
+            results = list(executor.map(extract, batch, chunksize=chunksize))
+
+            records = [record for record, _ in results if record is not None]
+            failed = [(url, error) for url, (_, error) in zip(batch, results) if error]
+
+            if records:
+                path = write_part(records, output)
+                if log is not None:
+                    print(f"wrote {len(records)} records to {path}", file=log)
+            if log is not None:
+                for url, error in failed:
+                    print(f"failed to index {url}: {error}", file=log)
+
+            n_indexed += len(records)
+            n_failed += len(failed)
+
+    return n_indexed, n_failed
+
+
+def _json_object(text):
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise argparse.ArgumentTypeError(f"invalid JSON: {e}") from e
+
+    if not isinstance(value, dict):
+        raise argparse.ArgumentTypeError("expected a JSON object")
+
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m safe_rcm.index",
+        description="build a parquet catalog of RCM products",
+    )
+    parser.add_argument("root", help="url of the directory containing the products")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="catalog.parquet",
+        help="path of the catalog directory (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="number of products per part file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--storage-options",
+        type=_json_object,
+        default=None,
+        help="options for the filesystem of the products, as a JSON object",
+    )
+    args = parser.parse_args(argv)
+
+    n_indexed, n_failed = index_products(
+        args.root,
+        args.output,
+        storage_options=args.storage_options,
+        max_workers=args.jobs,
+        batch_size=args.batch_size,
+        log=sys.stderr,
+    )
+    print(f"indexed {n_indexed} products, {n_failed} failed", file=sys.stderr)
+
+    return 1 if n_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
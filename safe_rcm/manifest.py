@@ -1,3 +1,6 @@
+import posixpath
+from fnmatch import fnmatchcase
+
 from tlz import filter
 from tlz.functoolz import compose_left, curry
 from tlz.itertoolz import concat, get
@@ -6,6 +9,25 @@ from safe_rcm.product.dicttoolz import query
 from safe_rcm.xml import read_xml
 
 
+def ignored_file(path, ignores):
+    ignored = [
+        fnmatchcase(path, ignore) or fnmatchcase(posixpath.basename(path), ignore)
+        for ignore in ignores
+    ]
+    return any(ignored)
+
+
+default_manifest_ignores = [
+    "*.pdf",
+    "*.html",
+    "*.xslt",
+    "*.png",
+    "*.kml",
+    "*.txt",
+    "preview/*",
+]
+
+
 def merge_location(loc):
     locator = loc["@locator"]
     href = loc["@href"]
@@ -43,3 +65,36 @@ def read_manifest(mapper, path):
     manifest = read_xml(mapper, path)
 
     return list(concat(func(query(path, manifest)) for path, func in structure.items()))
+
+
+def read_checksums(mapper, path):
+    """read the checksums declared in the manifest
+
+    Parameters
+    ----------
+    mapper : mapping
+        The mapper of the product.
+    path : str
+        The path of the manifest, relative to the mapper root.
+
+    Returns
+    -------
+    dict of str to tuple of str, str and int
+        Maps the path of each file to the name of the checksum algorithm, the
+        checksum, and the declared size. Files without declared checksum are
+        omitted.
+    """
+    manifest = read_xml(mapper, path)
+    data_objects = query("/dataObjectSection/dataObject", manifest)
+
+    return {
+        merge_location(location): (
+            stream["checksum"]["@checksumName"],
+            stream["checksum"]["$"].lower(),
+            stream.get("@size"),
+        )
+        for data_object in data_objects
+        for stream in data_object["byteStream"]
+        if "checksum" in stream
+        for location in stream["fileLocation"]
+    }
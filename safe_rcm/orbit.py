@@ -0,0 +1,276 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+positions = ["xPosition", "yPosition", "zPosition"]
+velocities = ["xVelocity", "yVelocity", "zVelocity"]
+
+
+def as_datetime64(times):
+    """convert times to timezone-naive UTC datetime64[ns] values"""
+    values = times.values if isinstance(times, (xr.DataArray, xr.Variable)) else times
+    shape = np.shape(values)
+
+    index = pd.to_datetime(np.ravel(values), utc=True).tz_localize(None)
+
+    return index.values.astype("datetime64[ns]").reshape(shape)
+
+
+class PolynomialInterpolator:
+    """piecewise polynomial interpolation with precomputed coefficients
+
+    For every interval between two nodes, the polynomial through the ``window``
+    surrounding nodes is computed once. If derivatives are given, the polynomial
+    also matches the derivatives at the nodes (Hermite interpolation), otherwise
+    it only matches the values (Lagrange interpolation).
+
+    Parameters
+    ----------
+    times : array-like of datetime64
+        The times of the nodes. Must be strictly increasing.
+    values : array-like
+        The values at the nodes, with shape ``(n_nodes, n_components)``.
+    derivatives : array-like, optional
+        The time derivatives at the nodes, in units per second. Must have the
+        same shape as ``values``.
+    window : int, default: 4
+        The number of nodes per local polynomial.
+    """
+
+    def __init__(self, times, values, derivatives=None, *, window=4):
+        times = as_datetime64(times)
+        values = np.asarray(values, dtype="float64")
+        if values.ndim == 1:
+            values = values[:, None]
+
+        n_nodes = times.size
+        if n_nodes < 2:
+            raise ValueError(f"need at least 2 nodes to interpolate, got {n_nodes}")
+        if np.any(np.diff(times) <= np.timedelta64(0, "ns")):
+            raise ValueError("node times have to be strictly increasing")
+
+        window = min(window, n_nodes)
+
+        self.reference = times[0]
+        self.nodes = (times - self.reference) / np.timedelta64(1, "s")
+        self.scale = float(np.median(np.diff(self.nodes)))
+
+        n_intervals = n_nodes - 1
+        starts = np.clip(
+            np.arange(n_intervals) - (window // 2 - 1), 0, n_nodes - window
+        )
+        indices = starts[:, None] + np.arange(window)
+
+        # local, normalized time: zero at the start of the interval, one node
+        # spacing per unit
+        tau = (self.nodes[indices] - self.nodes[:n_intervals, None]) / self.scale
+
+        if derivatives is None:
+            n_coefficients = window
+            powers = np.arange(n_coefficients)
+            matrix = tau[..., None] ** powers
+            rhs = values[indices]
+        else:
+            derivatives = np.asarray(derivatives, dtype="float64").reshape(values.shape)
+
+            n_coefficients = 2 * window
+            powers = np.arange(n_coefficients)
+            value_rows = tau[..., None] ** powers
+            derivative_rows = (
+                powers * tau[..., None] ** np.maximum(powers - 1, 0) / self.scale
+            )
+            matrix = np.concatenate([value_rows, derivative_rows], axis=1)
+            rhs = np.concatenate([values[indices], derivatives[indices]], axis=1)
+
+        # shape: (n_intervals, n_coefficients, n_components)
+        self.coefficients = np.linalg.solve(matrix, rhs)
+
+    def __call__(self, times, *, extrapolate=False):
+        """evaluate the interpolation
+
+        Parameters
+        ----------
+        times : array-like of datetime64
+            The times to evaluate at.
+        extrapolate : bool, default: False
+            Whether to extrapolate beyond the range of the nodes. If ``False``,
+            times outside the range are set to ``nan``.
+
+        Returns
+        -------
+        values, derivatives : numpy.ndarray
+            The interpolated values and their time derivatives, with shape
+            ``times.shape + (n_components,)``.
+        """
+        times = as_datetime64(times)
+        shape = times.shape
+
+        t = (times.ravel() - self.reference) / np.timedelta64(1, "s")
+        interval = np.clip(
+            np.searchsorted(self.nodes, t, side="right") - 1,
+            0,
+            self.coefficients.shape[0] - 1,
+        )
+        tau = ((t - self.nodes[interval]) / self.scale)[:, None]
+
+        coefficients = self.coefficients[interval]
+        n_coefficients = coefficients.shape[1]
+
+        # horner's scheme, for the polynomial and its derivative
+        values = coefficients[:, -1]
+        derivatives = np.zeros_like(values)
+        for k in range(n_coefficients - 2, -1, -1):
+            derivatives = derivatives * tau + values
+            values = values * tau + coefficients[:, k]
+        derivatives = derivatives / self.scale
+
+        if not extrapolate:
+            outside = (t < self.nodes[0]) | (t > self.nodes[-1])
+            values[outside] = np.nan
+            derivatives[outside] = np.nan
+
+        n_components = coefficients.shape[-1]
+        return (
+            values.reshape(shape + (n_components,)),
+            derivatives.reshape(shape + (n_components,)),
+        )
+
+
+class TimeSeriesInterpolator:
+    """interpolate the variables of a time series dataset
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        The dataset containing the time series.
+    variables : list of str
+        The variables to interpolate.
+    derivatives : mapping of str to str, optional
+        Variables containing the time derivatives of the interpolated variables.
+        If given, use hermite interpolation, and compute the derivatives from the
+        interpolating polynomial.
+    dim : str, default: "timeStamp"
+        The time dimension.
+    window : int, default: 4
+        The number of nodes per local polynomial.
+    """
+
+    def __init__(self, ds, variables, derivatives=None, *, dim="timeStamp", window=4):
+        self.variables = list(variables)
+        self.derivatives = dict(derivatives) if derivatives is not None else {}
+        self.dim = dim
+        self.attrs = {name: ds[name].attrs for name in self.variables}
+        self.derivative_attrs = {
+            name: ds[derivative].attrs for name, derivative in self.derivatives.items()
+        }
+
+        values = np.stack([ds[name].values for name in self.variables], axis=-1)
+        if self.derivatives:
+            derivative_values = np.stack(
+                [ds[self.derivatives[name]].values for name in self.variables], axis=-1
+            )
+        else:
+            derivative_values = None
+
+        self.interpolator = PolynomialInterpolator(
+            ds[dim], values, derivative_values, window=window
+        )
+
+    def __call__(self, times, *, dim=None, extrapolate=False):
+        """interpolate at the given times
+
+        Parameters
+        ----------
+        times : array-like or xarray.DataArray
+            The times to interpolate at.
+        dim : str, optional
+            The name of the new dimension, for unlabeled 1D times. Defaults to
+            the time dimension of the source dataset.
+        extrapolate : bool, default: False
+            Whether to extrapolate beyond the time range of the dataset.
+
+        Returns
+        -------
+        xarray.Dataset
+            The interpolated variables. If derivatives were given, the
+            interpolated derivatives are also included.
+        """
+        if isinstance(times, xr.DataArray):
+            dims = times.dims
+            coords = times.coords
+        else:
+            times = np.asarray(times)
+            if times.ndim > 1:
+                raise ValueError("unlabeled times have to be 0D or 1D")
+            dims = (dim or self.dim,) * times.ndim
+            coords = {dims[0]: as_datetime64(times)} if dims else {}
+
+        values, derivatives = self.interpolator(times, extrapolate=extrapolate)
+
+        data_vars = {
+            name: (dims, values[..., index], self.attrs[name])
+            for index, name in enumerate(self.variables)
+        }
+        if self.derivatives:
+            data_vars |= {
+                self.derivatives[name]: (
+                    dims,
+                    derivatives[..., index],
+                    self.derivative_attrs[name],
+                )
+                for index, name in enumerate(self.variables)
+            }
+
+        return xr.Dataset(data_vars, coords=coords)
+
+
+def orbit_interpolator(orbit, *, window=4):
+    """hermite interpolation of orbit state vectors
+
+    Parameters
+    ----------
+    orbit : xarray.Dataset or xarray.DataTree
+        The orbit information, as found in
+        ``/sourceAttributes/orbitAndAttitude/orbitInformation``.
+    window : int, default: 4
+        The number of state vectors per local polynomial.
+
+    Returns
+    -------
+    TimeSeriesInterpolator
+        Interpolates positions and velocities.
+    """
+    if isinstance(orbit, xr.DataTree):
+        orbit = orbit.to_dataset()
+
+    return TimeSeriesInterpolator(
+        orbit, positions, dict(zip(positions, velocities)), window=window
+    )
+
+
+def attitude_interpolator(attitude, *, window=4):
+    """lagrange interpolation of attitude angles
+
+    Parameters
+    ----------
+    attitude : xarray.Dataset or xarray.DataTree
+        The attitude information, as found in
+        ``/sourceAttributes/orbitAndAttitude/attitudeInformation``.
+    window : int, default: 4
+        The number of nodes per local polynomial.
+
+    Returns
+    -------
+    TimeSeriesInterpolator
+        Interpolates all numeric variables along ``timeStamp``.
+    """
+    if isinstance(attitude, xr.DataTree):
+        attitude = attitude.to_dataset()
+
+    variables = [
+        name
+        for name, var in attitude.data_vars.items()
+        if var.dims == ("timeStamp",) and np.issubdtype(var.dtype, np.number)
+    ]
+
+    return TimeSeriesInterpolator(attitude, variables, window=window)
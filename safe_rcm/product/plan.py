@@ -0,0 +1,159 @@
+from functools import partial
+
+from tlz.dicttoolz import keyfilter
+from tlz.functoolz import Compose, curry, juxt
+
+from safe_rcm.profiling import stage
+
+
+@curry
+def attach_path(obj, path):
+    if not hasattr(obj, "encoding"):
+        raise ValueError(
+            "cannot attach source path: `obj` does not have a `encoding` attribute."
+        )
+
+    new = obj.copy()
+    new.encoding["xpath"] = path
+
+    return new
+
+
+def _pipeline(funcs, *args, **kwargs):
+    first, *rest = funcs
+
+    result = first(*args, **kwargs)
+    for func in rest:
+        result = func(result)
+
+    return result
+
+
+def _juxt(funcs, *args, **kwargs):
+    return tuple(func(*args, **kwargs) for func in funcs)
+
+
+def compile_function(f):
+    """replace toolz function wrappers with plain callables
+
+    Compositions are flattened into a single pipeline, and the outermost
+    curried functions are converted to `functools.partial` objects. Functions
+    passed as arguments are left untouched.
+
+    Parameters
+    ----------
+    f : callable
+        The function to compile.
+
+    Returns
+    -------
+    callable
+        The compiled function. Has to be called with all remaining arguments.
+    """
+    if isinstance(f, Compose):
+        funcs = tuple(map(compile_function, (f.first,) + tuple(f.funcs)))
+        return partial(_pipeline, funcs)
+    elif isinstance(f, juxt):
+        funcs = tuple(map(compile_function, f.funcs))
+        return partial(_juxt, funcs)
+    elif isinstance(f, curry):
+        return partial(compile_function(f.func), *f.args, **f.keywords)
+    else:
+        return f
+
+
+class Step:
+    """a single compiled entry of a layout
+
+    Parameters
+    ----------
+    path : str
+        The path of the subset of the decoded xml, with ``/`` separated keys.
+    f : callable
+        The function to transform the subset with.
+    """
+
+    __slots__ = ("path", "keys", "f")
+
+    def __init__(self, path, f):
+        self.path = path
+        self.keys = tuple(key for key in path.split("/") if key)
+        self.f = compile_function(f)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(path={self.path!r})"
+
+    def __call__(self, mapping):
+        subset = mapping
+        for key in self.keys:
+            subset = subset[key]
+
+        return attach_path(self.f(subset), path=self.path)
+
+
+class Plan:
+    """a layout compiled into reusable steps
+
+    Parameters
+    ----------
+    layout : mapping of str to mapping
+        The declarative spec: maps the path of each node of the resulting
+        tree to a mapping with the entries ``path``, the path of the subset of
+        the decoded xml, and ``f``, the function to transform the subset with.
+    """
+
+    def __init__(self, layout):
+        self.layout = dict(layout)
+        self.steps = {node: Step(**spec) for node, spec in self.layout.items()}
+
+    def __repr__(self):
+        lines = [f"{node!r}: {step.path!r}" for node, step in self.steps.items()]
+        return "\n    ".join([f"<{type(self).__name__}>"] + lines)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __getitem__(self, node):
+        return self.steps[node]
+
+    def extend(self, layout=None, *, drop=()):
+        """create a new plan with additional or replaced nodes
+
+        Parameters
+        ----------
+        layout : mapping of str to mapping, optional
+            Nodes to add. Existing nodes with the same path are overridden.
+        drop : iterable of str, optional
+            Nodes to remove.
+
+        Returns
+        -------
+        Plan
+        """
+        drop = set(drop)
+        kept = keyfilter(lambda node: node not in drop, self.layout)
+
+        return type(self)(kept | dict(layout or {}))
+
+    def __call__(self, mapping):
+        """execute the plan
+
+        Parameters
+        ----------
+        mapping : mapping
+            The decoded xml.
+
+        Returns
+        -------
+        dict of str to xarray.Dataset
+            The transformed nodes.
+        """
+        converted = {}
+        for node, step in self.steps.items():
+            with stage(node):
+                converted[node] = step(mapping)
+
+        return converted
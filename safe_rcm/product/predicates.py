@@ -1,3 +1,7 @@
+import contextlib
+import contextvars
+import enum
+
 import numpy as np
 from tlz.functoolz import compose, juxt
 from tlz.itertoolz import isiterable
@@ -15,48 +19,73 @@ def is_scalar(x):
     return not isiterable(x) or isinstance(x, (str, bytes))
 
 
-def is_composite_value(obj):
-    if not isinstance(obj, list) or len(obj) not in [1, 2]:
-        return False
+class Kind(enum.Flag):
+    """structural kind of a decoded xml object"""
 
-    if any(not isinstance(el, dict) or list(el) != ["@dataStream", "$"] for el in obj):
-        return False
+    SCALAR = enum.auto()
+    COMPOSITE = enum.auto()
+    COMPLEX = enum.auto()
+    MAGNITUDE = enum.auto()
+    ARRAY = enum.auto()
+    SCALAR_VARIABLE = enum.auto()
+    SCALAR_VALUED = enum.auto()
+    NESTED = enum.auto()
+    NESTED_ARRAY = enum.auto()
+    NESTED_DATASET = enum.auto()
 
-    data_stream_values = [el["@dataStream"].lower() for el in obj]
-    return data_stream_values in (["real", "imaginary"], ["magnitude"])
 
+_classifications = contextvars.ContextVar("classifications", default=None)
 
-def is_complex(obj):
-    return is_composite_value(obj) and len(obj) == 2
 
+@contextlib.contextmanager
+def classification_cache():
+    """memoize `classify` by object identity while the context is active
 
-def is_magnitude(obj):
-    return is_composite_value(obj) and len(obj) == 1
+    The decoded objects must not be mutated while the cache is active.
+    """
+    token = _classifications.set({})
+    try:
+        yield
+    finally:
+        _classifications.reset(token)
 
 
-def is_array(obj):
+def _classify_composite(obj):
+    if len(obj) not in [1, 2]:
+        return Kind(0)
+
+    if any(not isinstance(el, dict) or list(el) != ["@dataStream", "$"] for el in obj):
+        return Kind(0)
+
+    data_stream_values = [el["@dataStream"].lower() for el in obj]
+    if data_stream_values == ["real", "imaginary"]:
+        return Kind.COMPOSITE | Kind.COMPLEX
+    elif data_stream_values == ["magnitude"]:
+        return Kind.COMPOSITE | Kind.MAGNITUDE
+    else:
+        return Kind(0)
+
+
+def _classify_array(obj, kind):
     # definition of a array:
     # - list of scalars
     # - list of 1d lists
     # - complex array:
     #   - complex parts
     #   - list of complex values
-    if not isinstance(obj, list):
-        return False
-
     if len(obj) == 0:
         # zero-sized list, not sure what to do here
         return False
 
     elem = obj[0]
-    if is_complex(obj):
+    if Kind.COMPLEX in kind:
         return not is_scalar(elem["$"])
     elif is_scalar(elem):
         return True
     elif isinstance(elem, list):
         if len(elem) == 1 and is_scalar(elem[0]):
             return True
-        elif is_complex(elem):
+        elif Kind.COMPLEX in classify(elem):
             # array of imaginary values
             return True
         elif all(map(is_scalar, elem)):
@@ -65,44 +94,126 @@ def is_array(obj):
     return False
 
 
-def is_scalar_variable(obj):
-    if not isinstance(obj, dict):
-        return False
+def _classify_nested(obj):
+    """nested means: list of dict, but all dict values are scalar or 1-valued"""
+    if len(obj) == 0:
+        return Kind(0)
 
-    if not all(is_scalar(v) for v in obj.values()):
-        return False
+    elem = obj[0]
+    if not isinstance(elem, dict):
+        return Kind(0)
 
-    return all(k == "$" or k.startswith("@") for k in obj)
+    if not all(Kind.SCALAR_VALUED in classify(value) for value in elem.values()):
+        return Kind(0)
 
+    if "$" in elem:
+        return Kind.NESTED | Kind.NESTED_ARRAY
+    else:
+        return Kind.NESTED | Kind.NESTED_DATASET
 
-is_scalar_valued = disjunction(
-    is_scalar, lambda x: is_array(x) and len(x) == 1, is_scalar_variable
-)
 
+def _classify(obj):
+    if is_scalar(obj):
+        return Kind.SCALAR | Kind.SCALAR_VALUED
 
-def is_nested(obj):
-    """nested means: list of dict, but all dict values are scalar or 1-valued"""
-    if not isinstance(obj, list) or len(obj) == 0:
-        return False
+    kind = Kind(0)
+    if isinstance(obj, list):
+        kind |= _classify_composite(obj)
+        if _classify_array(obj, kind):
+            kind |= Kind.ARRAY
+            if len(obj) == 1:
+                kind |= Kind.SCALAR_VALUED
+        kind |= _classify_nested(obj)
+    elif isinstance(obj, dict):
+        if all(is_scalar(v) for v in obj.values()) and all(
+            k == "$" or k.startswith("@") for k in obj
+        ):
+            kind |= Kind.SCALAR_VARIABLE | Kind.SCALAR_VALUED
 
-    elem = obj[0]
-    if not isinstance(elem, dict):
-        return False
+    return kind
 
-    if all(map(is_scalar_valued, elem.values())):
-        return True
 
-    return False
+def classify(obj):
+    """determine the structural kind of a decoded xml object
+
+    All kinds are determined in a single pass. Within `classification_cache`,
+    results for lists and dicts are memoized by object identity, such that
+    nested objects are only inspected once.
+
+    Parameters
+    ----------
+    obj : any
+        The decoded object.
+
+    Returns
+    -------
+    Kind
+        The combination of all kinds that apply to the object.
+    """
+    cache = _classifications.get()
+    if cache is None or not isinstance(obj, (list, dict)):
+        return _classify(obj)
+
+    cached = cache.get(id(obj))
+    if cached is not None:
+        return cached[1]
+
+    kind = _classify(obj)
+    # keep a reference to the object to make sure the id is not reused
+    cache[id(obj)] = (obj, kind)
+
+    return kind
+
+
+def is_composite_value(obj):
+    return Kind.COMPOSITE in classify(obj)
+
+
+def is_complex(obj):
+    return Kind.COMPLEX in classify(obj)
+
+
+def is_magnitude(obj):
+    return Kind.MAGNITUDE in classify(obj)
+
+
+def is_array(obj):
+    return Kind.ARRAY in classify(obj)
+
+
+def is_scalar_variable(obj):
+    return Kind.SCALAR_VARIABLE in classify(obj)
+
+
+def is_scalar_valued(obj):
+    return Kind.SCALAR_VALUED in classify(obj)
+
+
+def is_nested(obj):
+    """nested means: list of dict, but all dict values are scalar or 1-valued"""
+    return Kind.NESTED in classify(obj)
 
 
 def is_nested_array(obj):
-    return is_nested(obj) and "$" in obj[0]
+    return Kind.NESTED_ARRAY in classify(obj)
 
 
 def is_nested_dataset(obj):
-    return is_nested(obj) and "$" not in obj[0]
+    return Kind.NESTED_DATASET in classify(obj)
 
 
 def is_attr(column):
     """an attribute is a index if it has multiple unique values"""
-    return np.unique(column).size == 1
+    # compare to the first element instead of computing the unique values: O(n)
+    # instead of O(n log n)
+    values = np.asarray(column)
+    if values.size == 0:
+        return False
+
+    first = values.flat[0]
+    equal = values == first
+    if values.dtype.kind in "fc":
+        # like `np.unique`, consider all `nan` values to be equal
+        equal |= np.isnan(values) & np.isnan(first)
+
+    return bool(np.all(equal))
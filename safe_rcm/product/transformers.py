@@ -1,3 +1,5 @@
+from operator import itemgetter
+
 import numpy as np
 import xarray as xr
 from tlz.dicttoolz import (
@@ -14,10 +16,11 @@ from tlz.itertoolz import concat, first, second
 
 from safe_rcm.product.dicttoolz import first_values, keysplit, valsplit
 from safe_rcm.product.predicates import (
+    Kind,
+    classify,
     is_array,
     is_attr,
     is_composite_value,
-    is_nested_array,
     is_nested_dataset,
     is_scalar,
 )
@@ -25,6 +28,32 @@ from safe_rcm.product.predicates import (
 ignore = ("@xmlns", "@xmlns:xsi", "@xsi:schemaLocation")
 
 
+def to_columns(records):
+    """transpose a list of mappings into a mapping of columns
+
+    Equivalent to ``merge_with(list, *records)``, with a fast path for the
+    common case where all records have the same keys.
+    """
+    if not records:
+        return {}
+
+    keys = records[0].keys()
+    if any(record.keys() != keys for record in records):
+        return merge_with(list, *records)
+
+    return {key: list(map(itemgetter(key), records)) for key in keys}
+
+
+def squeeze_column(column):
+    """convert a column to an array, squeezing all but the first dimension"""
+    values = np.asarray(column)
+    if values.ndim <= 1:
+        return values
+
+    axes = tuple(axis for axis, size in enumerate(values.shape) if size == 1 and axis)
+    return np.squeeze(values, axis=axes)
+
+
 def convert_composite(value):
     if not is_composite_value(value):
         raise ValueError(f"not a composite: {value}")
@@ -104,14 +133,15 @@ def extract_entry(name, obj, dims=None, default_dims=None):
     elif dims is None:
         dims = default_dims
 
-    if is_array(obj):
+    kind = classify(obj)
+    if Kind.ARRAY in kind:
         # dimension coordinate
         return extract_array(obj, dims=dims)
-    elif is_composite_value(obj):
+    elif Kind.COMPOSITE in kind:
         return extract_composite(obj, dims=dims)
     elif isinstance(obj, dict):
         return extract_variable(obj, dims=dims)
-    elif is_nested_array(obj):
+    elif Kind.NESTED_ARRAY in kind:
         return extract_nested_array(obj, dims=dims).pipe(rename, name)
     else:
         raise ValueError(f"unknown datastructure:\n{obj}")
@@ -143,12 +173,17 @@ def extract_nested_variable(obj, dims=None):
     if is_array(obj):
         return xr.Variable(dims, obj)
 
-    columns = merge_with(list, *obj)
+    columns = to_columns(obj)
     attributes, data = keysplit(lambda k: k.startswith("@"), columns)
     renamed = keymap(lambda k: k.lstrip("@"), attributes)
     attrs = valmap(first, renamed)
 
-    return xr.Variable(dims, data["$"], attrs)
+    values = data["$"]
+    if not dims and len(values) == 1:
+        # a single entry without index, like the parameters of a single beam
+        values = values[0]
+
+    return xr.Variable(dims, values, attrs)
 
 
 def unstack(obj, dim="stacked"):
@@ -181,13 +216,13 @@ def to_variable_tuple(name, value, dims):
 
 
 def extract_nested_array(obj, dims=None):
-    columns = merge_with(list, *obj)
+    columns = to_columns(obj)
 
     attributes, data = keysplit(flip(str.startswith, "@"), columns)
     renamed = keymap(flip(str.lstrip, "@"), attributes)
-    preprocessed_attrs = valmap(np.squeeze, renamed)
+    preprocessed_attrs = valmap(squeeze_column, renamed)
     attrs_, indexes = valsplit(is_attr, preprocessed_attrs)
-    preprocessed_data = valmap(np.squeeze, data)
+    preprocessed_data = valmap(squeeze_column, data)
 
     originally_stacked = isinstance(dims, (tuple, list)) and "stacked" in dims
 
@@ -218,11 +253,11 @@ def extract_nested_dataset(obj, dims=None):
     if not isinstance(obj, list):
         raise ValueError(f"unknown type: {type(obj)}")
 
-    columns = merge_with(list, *obj)
+    columns = to_columns(obj)
 
     attributes, data = keysplit(flip(str.startswith, "@"), columns)
     renamed = keymap(flip(str.lstrip, "@"), attributes)
-    preprocessed = valmap(np.squeeze, renamed)
+    preprocessed = valmap(squeeze_column, renamed)
     attrs_, indexes = valsplit(is_attr, preprocessed)
 
     attrs = valmap(first, attrs_)
@@ -248,7 +283,7 @@ def extract_nested_datatree(obj, dims=None):
     if not isinstance(obj, list):
         raise ValueError(f"unknown type: {type(obj)}")
 
-    datasets = merge_with(list, *obj)
+    datasets = to_columns(obj)
     tree = valmap(curry(extract_nested_dataset)(dims=dims), datasets)
 
     return xr.DataTree.from_dict(tree)
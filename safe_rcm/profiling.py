@@ -0,0 +1,261 @@
+import contextlib
+import contextvars
+import threading
+import time
+from collections import namedtuple
+
+_profile = contextvars.ContextVar("profile", default=None)
+_stages = contextvars.ContextVar("stages", default=())
+
+# returned by `stage` if profiling is disabled
+_disabled = contextlib.nullcontext()
+
+Request = namedtuple("Request", ["method", "path", "nbytes", "duration"])
+
+
+class Profile:
+    """wall time and I/O of the stages of opening a product
+
+    Stages are nested: the time and the requests of a stage include those of
+    its substages. Requests and bytes are counted while the stage is active,
+    including those issued by other threads.
+
+    Attributes
+    ----------
+    stages : dict of tuple of str to dict
+        The calls, time, requests and bytes of each stage.
+    log : list of Request
+        Every recorded request, with its method, path, size and duration.
+    requests, bytes : int
+        The total number of requests and bytes read.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.log = []
+        self.requests = 0
+        self.bytes = 0
+        self.active = True
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        header = (
+            f"<{type(self).__name__}: {self.requests} requests, {self.bytes} bytes>"
+        )
+        if not self.stages:
+            return header
+
+        return "\n".join([header, self.report().to_string()])
+
+    def record_request(self, method, path, nbytes=0, duration=0.0):
+        """record a request to the filesystem
+
+        Parameters
+        ----------
+        method : str
+            The name of the filesystem method.
+        path : str
+            The requested path.
+        nbytes : int, default: 0
+            The number of bytes read.
+        duration : float, default: 0.0
+            The duration of the request, in seconds.
+        """
+        if not self.active:
+            return
+
+        with self._lock:
+            self.log.append(Request(method, path, nbytes, duration))
+            self.requests += 1
+            self.bytes += nbytes
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """measure a stage
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage. Nested within the currently active stage.
+        """
+        path = _stages.get() + (name,)
+        token = _stages.set(path)
+
+        with self._lock:
+            # create the record on entry, such that stages are ordered by start
+            record = self.stages.setdefault(
+                path, {"calls": 0, "time": 0.0, "requests": 0, "bytes": 0}
+            )
+
+        requests, nbytes = self.requests, self.bytes
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            _stages.reset(token)
+
+            with self._lock:
+                record["calls"] += 1
+                record["time"] += duration
+                record["requests"] += self.requests - requests
+                record["bytes"] += self.bytes - nbytes
+
+    def report(self):
+        """summarize the stages
+
+        Returns
+        -------
+        pandas.DataFrame
+            The number of calls, the wall time in seconds, the number of
+            requests and the number of bytes read, for each stage. Nested
+            stages are separated by ``" > "``.
+        """
+        import pandas as pd
+
+        with self._lock:
+            records = {" > ".join(path): dict(r) for path, r in self.stages.items()}
+
+        return pd.DataFrame.from_dict(
+            records, orient="index", columns=["calls", "time", "requests", "bytes"]
+        ).rename_axis(index="stage")
+
+
+@contextlib.contextmanager
+def profile():
+    """profile all products opened while the context is active
+
+    Yields
+    ------
+    Profile
+        The profile. Stops recording once the context exits.
+    """
+    profile = Profile()
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+        profile.active = False
+
+
+def current_profile():
+    """the active profile, or ``None`` if profiling is disabled"""
+    return _profile.get()
+
+
+def stage(name):
+    """measure a stage, if profiling is enabled
+
+    Parameters
+    ----------
+    name : str
+        The name of the stage.
+
+    Returns
+    -------
+    context manager
+    """
+    profile = _profile.get()
+    if profile is None:
+        return _disabled
+
+    return profile.stage(name)
+
+
+def record_request(method, path, nbytes=0, duration=0.0):
+    """record a request to the filesystem, if profiling is enabled
+
+    See `Profile.record_request` for the parameters.
+    """
+    profile = _profile.get()
+    if profile is not None:
+        profile.record_request(method, path, nbytes, duration)
+
+
+class RecordingFile:
+    """file wrapper that records reads to a profile"""
+
+    def __init__(self, f, path, profile):
+        self._f = f
+        self._path = path
+        self._profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._f.close()
+
+    def read(self, *args):
+        start = time.perf_counter()
+        data = self._f.read(*args)
+        duration = time.perf_counter() - start
+
+        self._profile.record_request("read", self._path, len(data), duration)
+
+        return data
+
+
+def _recorded(name, nbytes=None):
+    # wrap a filesystem method taking a path as the first argument
+    def method(self, path, *args, **kwargs):
+        start = time.perf_counter()
+        result = getattr(self.fs, name)(path, *args, **kwargs)
+        duration = time.perf_counter() - start
+
+        size = 0 if nbytes is None else nbytes(result)
+        self.profile.record_request(name, path, size, duration)
+
+        return result
+
+    method.__name__ = name
+    return method
+
+
+class RecordingFileSystem:
+    """filesystem wrapper that records requests to a profile
+
+    Only wraps the methods used to open products. Everything else is
+    forwarded to the wrapped filesystem.
+
+    Parameters
+    ----------
+    fs : fsspec.AbstractFileSystem
+        The filesystem to wrap.
+    profile : Profile
+        The profile to record the requests to.
+    """
+
+    def __init__(self, fs, profile):
+        self.fs = fs
+        self.profile = profile
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.fs!r})"
+
+    def __getattr__(self, name):
+        return getattr(self.fs, name)
+
+    def cat(self, path, *args, **kwargs):
+        if isinstance(path, str):
+            return self.cat_file(path, *args, **kwargs)
+
+        return {p: self.cat_file(p, *args, **kwargs) for p in path}
+
+    cat_file = _recorded("cat_file", nbytes=len)
+    info = _recorded("info")
+    exists = _recorded("exists")
+    isfile = _recorded("isfile")
+    isdir = _recorded("isdir")
+    ls = _recorded("ls")
+    find = _recorded("find")
+    size = _recorded("size")
+
+    def open(self, path, *args, **kwargs):
+        f = _recorded("open")(self, path, *args, **kwargs)
+
+        return RecordingFile(f, path, self.profile)
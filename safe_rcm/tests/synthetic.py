@@ -0,0 +1,1115 @@
+"""synthetic RCM SAFE products for the tests and benchmarks
+
+This module is not part of the public API and is not imported by the reader.
+"""
+
+import datetime
+import hashlib
+import posixpath
+import time
+from dataclasses import dataclass, field
+
+import fsspec
+import numpy as np
+import rasterio
+from fsspec.spec import AbstractBufferedFile, AbstractFileSystem
+from fsspec.utils import stringify_path
+from rasterio.io import MemoryFile
+
+xsi = "http://www.w3.org/2001/XMLSchema-instance"
+product_namespace = "rcmGsProductSchema"
+xfdu_namespace = "urn:ccsds:schema:xfdu:1"
+
+calibration_types = {"Beta": "Beta Nought", "Sigma": "Sigma Nought", "Gamma": "Gamma"}
+
+# elements that may occur more than once in the real schema, even if the
+# synthetic product only contains a single instance
+repeated_elements = {
+    "stateVector",
+    "attitudeAngles",
+    "prfInformation",
+    "pulseLength",
+    "pulseBandwidth",
+    "rawDataAnalysis",
+    "chirp",
+    "slantRangeToGroundRange",
+    "lookupTableFileName",
+    "noiseLevelFileName",
+    "bitsPerSample",
+    "imageTiePoint",
+    "imageAttributes",
+    "ipdf",
+    "grdBurstMap",
+    "burstAttributes",
+    "dopplerCentroid",
+    "dopplerCentroidEstimate",
+    "dopplerRate",
+    "dopplerRateEstimate",
+    "referenceNoiseLevel",
+    "perBeamReferenceNoiseLevel",
+    "azimuthNoiseLevelScaling",
+    "metadataObject",
+    "dataObject",
+    "byteStream",
+    "fileLocation",
+}
+
+
+@dataclass
+class Element:
+    name: str
+    value: object = None
+    attrs: dict = field(default_factory=dict)
+    children: list = field(default_factory=list)
+
+
+def element(name, value=None, /, **attrs):
+    return Element(name, value=value, attrs=attrs)
+
+
+def group(name, *children, **attrs):
+    return Element(name, attrs=attrs, children=list(children))
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        return " ".join(format_value(v) for v in value)
+    elif isinstance(value, (float, np.floating)):
+        return repr(float(value))
+
+    return str(value)
+
+
+def to_xml(root, *, namespace=None, prefix=None, schema_location):
+    def render(el, indent, qualified):
+        tag = f"{prefix}:{el.name}" if qualified and prefix else el.name
+        attrs = "".join(f' {k}="{format_value(v)}"' for k, v in el.attrs.items())
+        pad = "  " * indent
+        if el.children:
+            inner = "\n".join(render(c, indent + 1, False) for c in el.children)
+            return f"{pad}<{tag}{attrs}>\n{inner}\n{pad}</{tag}>"
+        elif el.value is None:
+            return f"{pad}<{tag}{attrs}/>"
+        else:
+            return f"{pad}<{tag}{attrs}>{format_value(el.value)}</{tag}>"
+
+    if prefix is None:
+        ns_decl = f' xmlns="{namespace}"'
+    else:
+        ns_decl = f' xmlns:{prefix}="{namespace}"'
+    header = (
+        f'<{prefix + ":" if prefix else ""}{root.name}{ns_decl} xmlns:xsi="{xsi}"'
+        f' xsi:schemaLocation="{namespace} {schema_location}"'
+    )
+    attrs = "".join(f' {k}="{format_value(v)}"' for k, v in root.attrs.items())
+    children = "\n".join(render(c, 1, False) for c in root.children)
+    closing = f"</{prefix + ':' if prefix else ''}{root.name}>"
+
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n{header}{attrs}>\n{children}\n{closing}\n'.encode()
+
+
+def scalar_type(values):
+    values = list(values)
+    if all(isinstance(v, (bool, np.bool_)) for v in values):
+        return "xsd:boolean"
+    elif all(isinstance(v, (int, np.integer)) for v in values):
+        return "xsd:long"
+    elif all(isinstance(v, (int, float, np.integer, np.floating)) for v in values):
+        return "xsd:double"
+    else:
+        return "xsd:string"
+
+
+def value_type(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    if all(isinstance(v, (list, tuple, np.ndarray)) for v in values):
+        item_type = scalar_type(item for v in values for item in v)
+        return f"list:{item_type}"
+
+    return scalar_type(values)
+
+
+def infer_schema(root, *, namespace, qualified):
+    """infer a XML schema from a tree of elements"""
+    # collect: path -> list of instances
+    instances = {}
+
+    def collect(el, path):
+        instances.setdefault(path, []).append(el)
+        for child in el.children:
+            collect(child, path + (child.name,))
+
+    collect(root, (root.name,))
+
+    def type_name(vtype):
+        if vtype is None or not vtype.startswith("list:"):
+            return vtype
+        return vtype.removeprefix("list:").removeprefix("xsd:") + "List"
+
+    def render(path, indent, top_level=False):
+        els = instances[path]
+        name = path[-1]
+        pad = "  " * indent
+
+        child_names = list(dict.fromkeys(c.name for el in els for c in el.children))
+        attr_names = list(dict.fromkeys(k for el in els for k in el.attrs))
+        attr_decls = [
+            f'{pad}    <xsd:attribute name="{a}" type="{scalar_type(el.attrs[a] for el in els if a in el.attrs)}"/>'
+            for a in attr_names
+        ]
+
+        occurs = ""
+        if not top_level:
+            max_count = max(
+                sum(1 for c in parent.children if c.name == name)
+                for parent in instances[path[:-1]]
+            )
+            if max_count > 1 or name in repeated_elements:
+                occurs = ' minOccurs="0" maxOccurs="unbounded"'
+            else:
+                occurs = ' minOccurs="0"'
+
+        if child_names:
+            children = "\n".join(render(path + (c,), indent + 3) for c in child_names)
+            lines = [
+                f'{pad}<xsd:element name="{name}"{occurs}>',
+                f"{pad}  <xsd:complexType>",
+                f"{pad}    <xsd:sequence>",
+                children,
+                f"{pad}    </xsd:sequence>",
+                *attr_decls,
+                f"{pad}  </xsd:complexType>",
+                f"{pad}</xsd:element>",
+            ]
+            return "\n".join(lines)
+
+        vtype = type_name(value_type(el.value for el in els))
+        if not attr_names:
+            return f'{pad}<xsd:element name="{name}" type="{vtype}"{occurs}/>'
+
+        if vtype is None:
+            lines = [
+                f'{pad}<xsd:element name="{name}"{occurs}>',
+                f"{pad}  <xsd:complexType>",
+                *[line[2:] for line in attr_decls],
+                f"{pad}  </xsd:complexType>",
+                f"{pad}</xsd:element>",
+            ]
+        else:
+            lines = [
+                f'{pad}<xsd:element name="{name}"{occurs}>',
+                f"{pad}  <xsd:complexType>",
+                f"{pad}    <xsd:simpleContent>",
+                f'{pad}      <xsd:extension base="{vtype}">',
+                *["    " + line for line in attr_decls],
+                f"{pad}      </xsd:extension>",
+                f"{pad}    </xsd:simpleContent>",
+                f"{pad}  </xsd:complexType>",
+                f"{pad}</xsd:element>",
+            ]
+        return "\n".join(lines)
+
+    return render((root.name,), 1, top_level=True)
+
+
+def render_schema(body, *, namespace, qualified, includes=(), simple_types=None):
+    form = "qualified" if qualified else "unqualified"
+    include_lines = "".join(
+        f'  <xsd:include schemaLocation="{name}"/>\n' for name in includes
+    )
+    types = "".join(
+        dedent_type(name, item_type) for name, item_type in (simple_types or {}).items()
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns="{namespace}"'
+        f' targetNamespace="{namespace}" elementFormDefault="{form}">\n'
+        f"{include_lines}{types}{body}\n"
+        "</xsd:schema>\n"
+    )
+
+
+def dedent_type(name, item_type):
+    return (
+        f'  <xsd:simpleType name="{name}">\n'
+        f'    <xsd:list itemType="{item_type}"/>\n'
+        "  </xsd:simpleType>\n"
+    )
+
+
+list_types = {
+    "doubleList": "xsd:double",
+    "longList": "xsd:long",
+    "stringList": "xsd:string",
+}
+
+types_schema = "rcm_prod_types.xsd"
+
+
+def format_time(time):
+    return np.datetime_as_string(time, unit="us") + "Z"
+
+
+def orbit_state(times, *, start):
+    """state vectors of a circular orbit at the given times"""
+    gm = 3.986004418e14
+    radius = 7.07e6
+    inclination = np.deg2rad(97.74)
+    angular_rate = np.sqrt(gm / radius**3)
+
+    seconds = (times - start) / np.timedelta64(1, "s")
+    phase = angular_rate * seconds + 0.3
+
+    position = radius * np.stack(
+        [
+            np.cos(phase),
+            np.sin(phase) * np.cos(inclination),
+            np.sin(phase) * np.sin(inclination),
+        ],
+        axis=-1,
+    )
+    velocity = (
+        radius
+        * angular_rate
+        * np.stack(
+            [
+                -np.sin(phase),
+                np.cos(phase) * np.cos(inclination),
+                np.cos(phase) * np.sin(inclination),
+            ],
+            axis=-1,
+        )
+    )
+
+    return position, velocity
+
+
+def attitude_angles(times, *, start):
+    seconds = (times - start) / np.timedelta64(1, "s")
+
+    yaw = 0.5 * np.sin(seconds / 300)
+    roll = -29.0 + 0.01 * np.cos(seconds / 200)
+    pitch = 0.1 * np.sin(seconds / 500)
+
+    return yaw, roll, pitch
+
+
+def geolocation(lines, pixels, *, shape):
+    """smooth, slightly curved mapping of image coordinates to lat / lon"""
+    u = lines / shape[0]
+    v = pixels / shape[1]
+
+    latitude = 45.0 - 3.0 * u + 0.4 * v + 0.05 * u * v
+    longitude = -60.0 - 0.8 * u - 4.5 * v - 0.1 * v**2
+    height = np.zeros_like(latitude) + 10.0 * u
+
+    return latitude, longitude, height
+
+
+def beam_names(n_beams):
+    return [f"S{index + 1}" for index in range(n_beams)]
+
+
+def burst_extents(n_bursts, n_beams, shape):
+    line_edges = np.linspace(0, shape[0], n_bursts + 1).astype(int)
+    pixel_edges = np.linspace(0, shape[1], n_beams + 1).astype(int)
+
+    for burst in range(n_bursts):
+        for beam_index, beam in enumerate(beam_names(n_beams)):
+            yield (
+                burst,
+                beam,
+                int(line_edges[burst]),
+                int(line_edges[burst + 1] - 1),
+                int(pixel_edges[beam_index]),
+                int(pixel_edges[beam_index + 1] - 1),
+            )
+
+
+def product_tree(
+    *,
+    product_id,
+    poles,
+    shape,
+    n_beams,
+    n_bursts,
+    tie_points,
+    n_state_vectors,
+    start,
+    imagery_names,
+):
+    duration = np.timedelta64(int(shape[0] * 2e3), "us")
+    stop = start + duration
+    beams = beam_names(n_beams)
+
+    orbit_times = (
+        start
+        - np.timedelta64(120, "s")
+        + np.arange(n_state_vectors) * np.timedelta64(30, "s")
+    )
+    position, velocity = orbit_state(orbit_times, start=start)
+    attitude_times = start + np.arange(n_state_vectors) * np.timedelta64(10, "s")
+    yaw, roll, pitch = attitude_angles(attitude_times, start=start)
+
+    tie_lines = np.linspace(0, shape[0] - 1, tie_points[0])
+    tie_pixels = np.linspace(0, shape[1] - 1, tie_points[1])
+    grid_lines, grid_pixels = np.meshgrid(tie_lines, tie_pixels, indexing="ij")
+    latitude, longitude, height = geolocation(grid_lines, grid_pixels, shape=shape)
+
+    rng = np.random.default_rng(0)
+
+    source_attributes = group(
+        "sourceAttributes",
+        element("satellite", "RCM-1"),
+        element("sensor", "SAR"),
+        element("polarizationDataMode", "Dual Co/Cross"),
+        element("downlinkSegmentId", "RCM1_DK0000000_PK0000000_1"),
+        element("inputDatasetFacilityId", "GSS"),
+        element("beamMode", "Low Noise"),
+        element("beamModeDefinitionId", 3170),
+        element("beamModeVersion", 7),
+        element("beamModeMnemonic", "SC50MB"),
+        element("rawDataStartTime", format_time(start)),
+        group(
+            "radarParameters",
+            element("acquisitionType", "ScanSAR"),
+            element("beams", " ".join(beams)),
+            element("polarizations", " ".join(poles)),
+            *[
+                element("pulseLength", 4.0e-5, pulse=pulse, beam=beam, units="s")
+                for beam in beams
+                for pulse in range(2)
+            ],
+            *[
+                element("pulseBandwidth", 1.0e8, pulse=pulse, beam=beam, units="Hz")
+                for beam in beams
+                for pulse in range(2)
+            ],
+            element("radarCenterFrequency", 5.405e9, units="Hz"),
+            element("antennaPointing", "Right"),
+            element("yawSteeringFlag", True),
+            *[
+                group(
+                    "prfInformation",
+                    element("pulseRepetitionFrequency", 2600.0 + index, units="Hz"),
+                    beam=beam,
+                )
+                for index, beam in enumerate(beams)
+            ],
+        ),
+        group(
+            "rawDataAttributes",
+            element("numberOfInputDataGaps", 0),
+            element("gapSize", 0),
+            element("numberOfMissingLines", 0),
+            *[
+                group(
+                    "rawDataAnalysis",
+                    element(
+                        "rawDataHistogram",
+                        rng.integers(0, 1000, size=16).tolist(),
+                    ),
+                    pole=pole,
+                    beam=beam,
+                )
+                for pole in poles
+                for beam in beams
+            ],
+        ),
+        group(
+            "orbitAndAttitude",
+            group(
+                "orbitInformation",
+                element("passDirection", "Descending"),
+                element("orbitDataSource", "Downlinked"),
+                element("orbitDataFileName", f"{product_id}.orb"),
+                *[
+                    group(
+                        "stateVector",
+                        element("timeStamp", format_time(time)),
+                        element("xPosition", float(pos[0]), units="m"),
+                        element("yPosition", float(pos[1]), units="m"),
+                        element("zPosition", float(pos[2]), units="m"),
+                        element("xVelocity", float(vel[0]), units="m/s"),
+                        element("yVelocity", float(vel[1]), units="m/s"),
+                        element("zVelocity", float(vel[2]), units="m/s"),
+                    )
+                    for time, pos, vel in zip(orbit_times, position, velocity)
+                ],
+            ),
+            group(
+                "attitudeInformation",
+                element("attitudeDataSource", "Downlink"),
+                element("attitudeOffsetsApplied", True),
+                *[
+                    group(
+                        "attitudeAngles",
+                        element("timeStamp", format_time(time)),
+                        element("yaw", float(y), units="deg"),
+                        element("roll", float(r), units="deg"),
+                        element("pitch", float(p), units="deg"),
+                    )
+                    for time, y, r, p in zip(attitude_times, yaw, roll, pitch)
+                ],
+            ),
+        ),
+    )
+
+    image_generation_parameters = group(
+        "imageGenerationParameters",
+        group(
+            "generalProcessingInformation",
+            element("productType", "GRD"),
+            element("processingFacility", "GSS"),
+            element("processingTime", format_time(stop + np.timedelta64(3600, "s"))),
+            element("softwareVersion", "v2.0"),
+        ),
+        group(
+            "sarProcessingInformation",
+            element("lutApplied", "Mixed"),
+            element("numberOfLinesProcessed", shape[0]),
+            element("perPolarizationScaling", True),
+            element("zeroDopplerTimeFirstLine", format_time(start)),
+            element("zeroDopplerTimeLastLine", format_time(stop)),
+            element("satelliteHeight", 693000.0, units="m"),
+            element("incidenceAngleNearRange", 19.5, units="deg"),
+            element("incidenceAngleFarRange", 46.8, units="deg"),
+            group(
+                "azimuthWindow",
+                element("windowName", "KAISER"),
+                element("windowCoefficient", 2.5),
+            ),
+            group(
+                "rangeWindow",
+                element("windowName", "KAISER"),
+                element("windowCoefficient", 2.5),
+            ),
+        ),
+        *[
+            group(
+                "chirp",
+                element("replicaQualityValid", True),
+                element("amplitudeCoefficients", rng.normal(size=4).tolist()),
+                element("phaseCoefficients", rng.normal(size=4).tolist()),
+                group(
+                    "chirpQuality",
+                    element("replicaQualityValid", True),
+                    element("crossCorrelationWidth", 1.1),
+                    element("sideLobeLevel", -20.0, units="dB"),
+                ),
+                pole=pole,
+                pulse=pulse,
+            )
+            for pole in poles
+            for pulse in range(2)
+        ],
+        *[
+            group(
+                "slantRangeToGroundRange",
+                element("zeroDopplerAzimuthTime", format_time(time)),
+                element("slantRangeTimeToFirstRangeSample", 0.0045, units="s"),
+                element("groundRangeOrigin", 0.0, units="m"),
+                element(
+                    "groundToSlantRangeCoefficients",
+                    [8.0e5, 0.35, 1.5e-7, -2.0e-14],
+                ),
+            )
+            for time in [start, start + duration // 2, stop]
+        ],
+    )
+
+    image_reference_attributes = group(
+        "imageReferenceAttributes",
+        element("productFormat", "GeoTIFF"),
+        element("outputMediaInterleaving", "BSQ"),
+        group(
+            "rasterAttributes",
+            element("dataType", "Magnitude Detected"),
+            element("bitsPerSample", 16, dataStream="Magnitude"),
+            element("sampledPixelSpacing", 50.0, units="m"),
+            element("sampledLineSpacing", 50.0, units="m"),
+            element("lineTimeOrdering", "Increasing"),
+            element("pixelTimeOrdering", "Increasing"),
+        ),
+        group(
+            "geographicInformation",
+            group(
+                "ellipsoidParameters",
+                element("ellipsoidName", "WGS 1984"),
+                element("semiMajorAxis", 6378137.0, units="m"),
+                element("semiMinorAxis", 6356752.314245, units="m"),
+                element("geodeticTerrainHeight", 12.5, units="m"),
+            ),
+            group(
+                "geolocationGrid",
+                *[
+                    group(
+                        "imageTiePoint",
+                        group(
+                            "imageCoordinate",
+                            element("line", float(line)),
+                            element("pixel", float(pixel)),
+                        ),
+                        group(
+                            "geodeticCoordinate",
+                            element("latitude", float(lat), units="deg"),
+                            element("longitude", float(lon), units="deg"),
+                            element("height", float(h), units="m"),
+                        ),
+                    )
+                    for line, pixel, lat, lon, h in zip(
+                        grid_lines.ravel(),
+                        grid_pixels.ravel(),
+                        latitude.ravel(),
+                        longitude.ravel(),
+                        height.ravel(),
+                    )
+                ],
+            ),
+            group(
+                "rationalFunctions",
+                element("biasError", 1.0, units="m"),
+                element("randomError", 0.5, units="m"),
+                element("lineFitQuality", 0.01),
+                element("pixelFitQuality", 0.01),
+                element("lineOffset", shape[0] / 2),
+                element("pixelOffset", shape[1] / 2),
+                element("latitudeOffset", 43.5),
+                element("longitudeOffset", -62.0),
+                element("heightOffset", 0.0),
+                element("lineScale", shape[0] / 2),
+                element("pixelScale", shape[1] / 2),
+                element("latitudeScale", 1.5),
+                element("longitudeScale", 2.5),
+                element("heightScale", 500.0),
+                element("lineNumeratorCoefficients", rng.normal(size=20).tolist()),
+                element("lineDenominatorCoefficients", rng.normal(size=20).tolist()),
+                element("pixelNumeratorCoefficients", rng.normal(size=20).tolist()),
+                element("pixelDenominatorCoefficients", rng.normal(size=20).tolist()),
+            ),
+        ),
+        element("incidenceAngleFileName", "incidenceAngles.xml"),
+        *[
+            element(
+                "lookupTableFileName",
+                f"lut{name}_{pole}.xml",
+                sarCalibrationType=type_,
+                pole=pole,
+            )
+            for pole in poles
+            for name, type_ in calibration_types.items()
+        ],
+        *[
+            element("noiseLevelFileName", f"noiseLevels_{pole}.xml", pole=pole)
+            for pole in poles
+        ],
+    )
+
+    scene_attributes = group(
+        "sceneAttributes",
+        group(
+            "imageAttributes",
+            *[
+                element("ipdf", f"../imagery/{name}", pole=pole)
+                for pole, name in imagery_names.items()
+            ],
+            element("numLines", shape[0]),
+            element("samplesPerLine", shape[1]),
+            element("lineOffset", 0),
+            element("pixelOffset", 0),
+            element("incAngNearRng", 19.5, units="deg"),
+            element("incAngFarRng", 46.8, units="deg"),
+            burst="0",
+        ),
+    )
+
+    burst_map = [
+        group(
+            "grdBurstMap",
+            *[
+                group(
+                    "burstAttributes",
+                    element("burst", burst),
+                    element("beam", beam),
+                    element("lineStart", line_start),
+                    element("lineEnd", line_end),
+                    element("pixelStart", pixel_start),
+                    element("pixelEnd", pixel_end),
+                )
+                for burst, beam, line_start, line_end, pixel_start, pixel_end in (
+                    burst_extents(n_bursts, n_beams, shape)
+                )
+            ],
+        )
+    ]
+
+    estimate_times = [
+        start + index * duration // max(n_bursts - 1, 1) for index in range(n_bursts)
+    ]
+    doppler_centroid = [
+        group(
+            "dopplerCentroid",
+            *[
+                group(
+                    "dopplerCentroidEstimate",
+                    element("timeOfDopplerCentroidEstimate", format_time(time)),
+                    element("dopplerAmbiguity", 0),
+                    element("dopplerAmbiguityConfidence", 0.9),
+                    element("dopplerCentroidReferenceTime", 0.0045, units="s"),
+                    element("dopplerCentroidPolynomialPeriod", 0.1, units="s"),
+                    element("dopplerCentroidCoefficients", [12.0, -1500.0, 2.0e5]),
+                    element("dopplerCentroidConfidence", 0.8),
+                )
+                for time in estimate_times
+            ],
+        )
+        for _ in beams
+    ]
+    doppler_rate = [
+        group(
+            "dopplerRate",
+            *[
+                group(
+                    "dopplerRateEstimate",
+                    element("timeOfDopplerRateEstimate", format_time(time)),
+                    element("dopplerRateReferenceTime", 0.0045, units="s"),
+                    element("dopplerRateCoefficients", [-2200.0, 3.0e5]),
+                )
+                for time in estimate_times
+            ],
+        )
+        for _ in beams
+    ]
+
+    return group(
+        "product",
+        element("productId", product_id),
+        element("documentIdentifier", "RCM-SP-53-0419"),
+        group(
+            "securityAttributes",
+            element("securityClassification", "Non classifié / Unclassified"),
+        ),
+        source_attributes,
+        image_generation_parameters,
+        image_reference_attributes,
+        scene_attributes,
+        *burst_map,
+        *doppler_centroid,
+        *doppler_rate,
+    )
+
+
+def lookup_table_tree(*, product_id, pole, calibration_type, lut_length, shape):
+    step = max(shape[1] // lut_length, 1)
+    pixels = np.arange(lut_length) * step
+    scale = {"Beta": 1.0, "Sigma": 1.2, "Gamma": 1.5}[calibration_type]
+    offset = 0.0 if pole.startswith("H") else 0.0
+
+    gains = scale * (1.0e5 + 10.0 * pixels) * (1.1 if pole == "HV" else 1.0)
+
+    return group(
+        "lut",
+        element("productId", product_id),
+        element("pixelFirstLutValue", 0),
+        element("stepSize", int(step)),
+        element("numberOfValues", lut_length),
+        element("offset", offset),
+        element("gains", gains.tolist()),
+    )
+
+
+def incidence_angle_tree(*, product_id, lut_length, shape):
+    step = max(shape[1] // lut_length, 1)
+    angles = np.linspace(19.5, 46.8, lut_length)
+
+    return group(
+        "incidenceAngles",
+        element("productId", product_id),
+        element("pixelFirstAnglesValue", 0),
+        element("stepSize", int(step)),
+        element("numberOfValues", lut_length),
+        element("angles", angles.tolist(), units="deg"),
+    )
+
+
+def noise_level_tree(*, product_id, pole, lut_length, n_beams, shape):
+    step = max(shape[1] // lut_length, 1)
+    beams = beam_names(n_beams)
+
+    def levels(n, offset):
+        return (-25.0 + offset + 2.0 * np.sin(np.linspace(0, 3, n))).tolist()
+
+    beam_length = max(lut_length // n_beams, 2)
+
+    return group(
+        "noiseLevels",
+        element("productId", product_id),
+        *[
+            group(
+                "referenceNoiseLevel",
+                element("sarCalibrationType", type_),
+                element("pixelFirstNoiseValue", 0),
+                element("stepSize", int(step)),
+                element("numberOfValues", lut_length),
+                element("noiseLevelValues", levels(lut_length, index), units="dB"),
+            )
+            for index, type_ in enumerate(calibration_types.values())
+        ],
+        *[
+            group(
+                "perBeamReferenceNoiseLevel",
+                element("sarCalibrationType", type_),
+                element("beam", beam),
+                element("pixelFirstNoiseValue", beam_index * beam_length * step),
+                element("stepSize", int(step)),
+                element("numberOfValues", beam_length - beam_index % 2),
+                element(
+                    "noiseLevelValues",
+                    levels(beam_length - beam_index % 2, index + beam_index),
+                    units="dB",
+                ),
+            )
+            for index, type_ in enumerate(calibration_types.values())
+            for beam_index, beam in enumerate(beams)
+        ],
+        *[
+            group(
+                "azimuthNoiseLevelScaling",
+                element("beam", beam),
+                element("stepSize", 100),
+                element("numberOfValues", 4 + beam_index % 2),
+                element(
+                    "noiseLevelValues",
+                    levels(4 + beam_index % 2, beam_index),
+                    units="dB",
+                ),
+            )
+            for beam_index, beam in enumerate(beams)
+        ],
+    )
+
+
+def manifest_tree(files, schemas):
+    def file_location(path):
+        locator, href = posixpath.split(path)
+        return element(
+            "fileLocation", locatorType="URL", locator=f"/{locator}", href=href
+        )
+
+    return group(
+        "XFDU",
+        group(
+            "metadataSection",
+            *[
+                group(
+                    "metadataObject",
+                    element(
+                        "metadataReference",
+                        mimeType="text/xml",
+                        locatorType="URL",
+                        locator=f"/{posixpath.dirname(path)}",
+                        href=posixpath.basename(path),
+                    ),
+                    ID=f"schema{index}",
+                    classification="SYNTAX",
+                    category="REP",
+                )
+                for index, path in enumerate(schemas)
+            ],
+        ),
+        group(
+            "dataObjectSection",
+            *[
+                group(
+                    "dataObject",
+                    group(
+                        "byteStream",
+                        file_location(path),
+                        element(
+                            "checksum",
+                            hashlib.md5(data).hexdigest(),
+                            checksumName="MD5",
+                        ),
+                        mimeType="application/octet-stream",
+                        size=len(data),
+                    ),
+                    ID=f"dataObject{index}",
+                )
+                for index, (path, data) in enumerate(files.items())
+            ],
+        ),
+        version="esa/safe/1.2",
+    )
+
+
+def encode_imagery(shape, *, tile_size, seed):
+    rng = np.random.default_rng(seed)
+    lines = np.arange(shape[0])[:, None]
+    pixels = np.arange(shape[1])[None, :]
+    data = (
+        200
+        + 50 * np.sin(lines / 97)
+        + 30 * np.cos(pixels / 61)
+        + rng.integers(0, 20, size=shape)
+    ).astype("uint16")
+
+    profile = {
+        "driver": "GTiff",
+        "width": shape[1],
+        "height": shape[0],
+        "count": 1,
+        "dtype": "uint16",
+    }
+    if tile_size is not None:
+        profile |= {"tiled": True, "blockxsize": tile_size, "blockysize": tile_size}
+
+    with rasterio.Env(), MemoryFile() as memfile:
+        with memfile.open(**profile) as dst:
+            dst.write(data, 1)
+        return memfile.read()
+
+
+def product_name(index, start):
+    date = start.astype("datetime64[s]").astype(datetime.datetime)
+    return (
+        f"RCM1_OK{1050603 + index}_PK{1050605 + index}_1_SC50MB_"
+        f"{date:%Y%m%d_%H%M%S}_HH_HV_GRD"
+    )
+
+
+def generate_product(
+    url,
+    *,
+    poles=("HH", "HV"),
+    shape=(512, 512),
+    tile_size=256,
+    lut_length=64,
+    tie_points=(8, 8),
+    n_beams=4,
+    n_bursts=4,
+    n_state_vectors=16,
+    start="2020-02-14T11:59:05",
+    storage_options=None,
+):
+    """write a synthetic, schema-valid RCM SAFE product
+
+    Parameters
+    ----------
+    url : str
+        The root directory of the product to create.
+    poles : sequence of str, default: ("HH", "HV")
+        The polarizations. Each pole produces one imagery file and its own set
+        of calibration files.
+    shape : tuple of int, default: (512, 512)
+        The shape of the image, as (lines, pixels).
+    tile_size : int or None, default: 256
+        The tile size of the GeoTIFF files. If ``None``, write striped files.
+    lut_length : int, default: 64
+        The number of values in the lookup, incidence angle and noise tables.
+    tie_points : tuple of int, default: (8, 8)
+        The shape of the geolocation grid, as (lines, pixels).
+    n_beams : int, default: 4
+        The number of ScanSAR beams.
+    n_bursts : int, default: 4
+        The number of bursts per beam.
+    n_state_vectors : int, default: 16
+        The number of orbit state vectors and attitude angles.
+    start : str, default: "2020-02-14T11:59:05"
+        The start time of the acquisition.
+    storage_options : mapping, optional
+        Additional parameters for the ``fsspec`` filesystem.
+
+    Returns
+    -------
+    url : str
+        The url of the created product.
+    """
+    if storage_options is None:
+        storage_options = {}
+
+    mapper = fsspec.get_mapper(url, **storage_options)
+    start = np.datetime64(start, "us")
+    product_id = posixpath.basename(url.rstrip("/")) or "synthetic"
+
+    imagery_names = {pole: f"{product_id}_{pole}.tif" for pole in poles}
+
+    files = {}
+    schemas = {}
+
+    def add_document(path, tree, schema_name, *, namespace, prefix=None):
+        depth = path.count("/")
+        schema_location = "../" * depth + f"support/schemas/{schema_name}"
+        qualified = prefix is None
+        files[path] = to_xml(
+            tree, namespace=namespace, prefix=prefix, schema_location=schema_location
+        )
+
+        body = infer_schema(tree, namespace=namespace, qualified=qualified)
+        if qualified:
+            schemas[schema_name] = render_schema(
+                body, namespace=namespace, qualified=True, includes=[types_schema]
+            ).encode()
+        else:
+            schemas[schema_name] = render_schema(
+                body, namespace=namespace, qualified=False
+            ).encode()
+
+    add_document(
+        "metadata/product.xml",
+        product_tree(
+            product_id=product_id,
+            poles=list(poles),
+            shape=shape,
+            n_beams=n_beams,
+            n_bursts=n_bursts,
+            tie_points=tie_points,
+            n_state_vectors=n_state_vectors,
+            start=start,
+            imagery_names=imagery_names,
+        ),
+        "rcm_prod_product.xsd",
+        namespace=product_namespace,
+    )
+    add_document(
+        "metadata/calibration/incidenceAngles.xml",
+        incidence_angle_tree(product_id=product_id, lut_length=lut_length, shape=shape),
+        "rcm_prod_incidenceAngles.xsd",
+        namespace=product_namespace,
+    )
+    for pole in poles:
+        for name in calibration_types:
+            add_document(
+                f"metadata/calibration/lut{name}_{pole}.xml",
+                lookup_table_tree(
+                    product_id=product_id,
+                    pole=pole,
+                    calibration_type=name,
+                    lut_length=lut_length,
+                    shape=shape,
+                ),
+                "rcm_prod_lut.xsd",
+                namespace=product_namespace,
+            )
+        add_document(
+            f"metadata/calibration/noiseLevels_{pole}.xml",
+            noise_level_tree(
+                product_id=product_id,
+                pole=pole,
+                lut_length=lut_length,
+                n_beams=n_beams,
+                shape=shape,
+            ),
+            "rcm_prod_noiseLevels.xsd",
+            namespace=product_namespace,
+        )
+
+    schemas[types_schema] = render_schema(
+        "", namespace=product_namespace, qualified=True, simple_types=list_types
+    ).encode()
+
+    for index, (pole, name) in enumerate(imagery_names.items()):
+        files[f"imagery/{name}"] = encode_imagery(
+            shape, tile_size=tile_size, seed=index
+        )
+
+    schema_files = {f"support/schemas/{name}": data for name, data in schemas.items()}
+    declared = files | schema_files
+
+    manifest = manifest_tree(declared, list(schema_files))
+    manifest_body = infer_schema(manifest, namespace=xfdu_namespace, qualified=False)
+    schema_files["support/schemas/xfdu.xsd"] = render_schema(
+        manifest_body, namespace=xfdu_namespace, qualified=False
+    ).encode()
+    files["manifest.safe"] = to_xml(
+        manifest,
+        namespace=xfdu_namespace,
+        prefix="xfdu",
+        schema_location="support/schemas/xfdu.xsd",
+    )
+
+    for path, data in (files | schema_files).items():
+        mapper[path] = data
+
+    return url
+
+
+class LatencyFile(AbstractBufferedFile):
+    def _fetch_range(self, start, end):
+        return self.fs.cat_file(self.path, start=start, end=end)
+
+
+class LatencyFileSystem(AbstractFileSystem):
+    """read-only filesystem that simulates the latency of remote storage
+
+    Every request to the wrapped filesystem is delayed by ``delay``, and
+    files are read in blocks of ranged requests, like object stores. Use with
+    urls of the form ``latency:///path/to/product``.
+
+    Parameters
+    ----------
+    delay : float, default: 0.01
+        The latency of each request, in seconds.
+    target_protocol : str, default: "file"
+        The protocol of the wrapped filesystem.
+    target_options : mapping, optional
+        Additional options for the wrapped filesystem.
+    fs : fsspec.AbstractFileSystem, optional
+        Already opened filesystem to wrap. Takes precedence over
+        ``target_protocol`` and ``target_options``.
+    """
+
+    protocol = "latency"
+
+    def __init__(
+        self,
+        delay=0.01,
+        target_protocol="file",
+        target_options=None,
+        fs=None,
+        **storage_options,
+    ):
+        super().__init__(**storage_options)
+
+        if fs is None:
+            fs = fsspec.filesystem(target_protocol, **(target_options or {}))
+
+        self.delay = delay
+        self.fs = fs
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        path = stringify_path(path).removeprefix(f"{cls.protocol}://")
+
+        return path.rstrip("/") or "/"
+
+    def _request(self):
+        time.sleep(self.delay)
+
+    def ls(self, path, detail=True, **kwargs):
+        self._request()
+        return self.fs.ls(self._strip_protocol(path), detail=detail, **kwargs)
+
+    def info(self, path, **kwargs):
+        self._request()
+        return self.fs.info(self._strip_protocol(path), **kwargs)
+
+    def cat_file(self, path, start=None, end=None, **kwargs):
+        self._request()
+        return self.fs.cat_file(
+            self._strip_protocol(path), start=start, end=end, **kwargs
+        )
+
+    def _open(self, path, mode="rb", block_size=None, cache_options=None, **kwargs):
+        if mode != "rb":
+            raise NotImplementedError("the latency filesystem is read-only")
+
+        return LatencyFile(
+            self, path, mode=mode, block_size=block_size, cache_options=cache_options
+        )
+
+
+fsspec.register_implementation("latency", LatencyFileSystem, clobber=True)
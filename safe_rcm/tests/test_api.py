@@ -0,0 +1,350 @@
+import asyncio
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import fsspec
+import numpy as np
+import pytest
+import xarray as xr
+
+from safe_rcm import api
+from safe_rcm.tests import synthetic
+
+try:
+    ExceptionGroup
+except NameError:
+    from exceptiongroup import ExceptionGroup
+
+
+def fake_tree(url):
+    index = int(url.removeprefix("product"))
+    return xr.DataTree.from_dict(
+        {
+            "/": xr.Dataset(attrs={"product": url, "mode": "SC50MB"}),
+            "/sourceAttributes/orbit": xr.Dataset(
+                {"x": ("timeStamp", np.arange(3.0) + index)},
+                coords={"timeStamp": np.arange(3) + index},
+            ),
+            "/imagery": xr.Dataset({"band_data": (("y", "x"), np.zeros((2, 2)))}),
+        }
+    )
+
+
+def fake_open_rcm(url, drop_variables=None, **kwargs):
+    if url == "missing":
+        raise ValueError("cannot find the `manifest.safe` file")
+
+    tree = fake_tree(url)
+    if "band_data" in (drop_variables or []):
+        tree = tree.drop_nodes("imagery")
+
+    return tree
+
+
+@pytest.fixture
+def patched(monkeypatch):
+    monkeypatch.setattr(api, "open_rcm", fake_open_rcm)
+
+
+@pytest.fixture
+def executor(request):
+    if request.param == "dask":
+        pytest.importorskip("dask")
+
+    if request.param != "pool":
+        yield request.param
+        return
+
+    with ThreadPoolExecutor(2) as pool:
+        yield pool
+
+
+@pytest.fixture(scope="module")
+def products(tmp_path_factory):
+    root = tmp_path_factory.mktemp("products")
+
+    return [
+        synthetic.generate_product(
+            str(root / f"RCM_{index}"), shape=(32, 32), tile_size=None, lut_length=8
+        )
+        for index in range(2)
+    ]
+
+
+@pytest.mark.parametrize("executor", ["threads", "dask", "pool"], indirect=True)
+def test_open_mfrcm(patched, executor):
+    urls = ["product0", "product1", "product2"]
+    actual = api.open_mfrcm(urls, executor=executor)
+
+    assert [tree.attrs["product"] for tree in actual] == urls
+
+
+def test_open_mfrcm_serial(patched):
+    actual = api.open_mfrcm(["product0", "product1"], parallel=False)
+
+    assert [tree.attrs["product"] for tree in actual] == ["product0", "product1"]
+
+
+def test_open_mfrcm_errors(patched):
+    with pytest.raises(ExceptionGroup, match="1 out of 3") as e:
+        api.open_mfrcm(["product0", "missing", "product2"])
+
+    [group] = e.value.exceptions
+    assert group.message == "missing"
+    assert isinstance(group.exceptions[0], ValueError)
+
+
+def test_open_mfrcm_invalid(patched):
+    with pytest.raises(ValueError, match="executor must be"):
+        api.open_mfrcm(["product0"], executor="gpu")
+
+    with pytest.raises(ValueError, match="unknown combine mode"):
+        api.open_mfrcm(["product0"], combine="merge")
+
+
+def test_open_mfrcm_stack(patched):
+    urls = ["product0", "product1"]
+    actual = api.open_mfrcm(urls, combine="stack")
+
+    assert "imagery" not in actual.children
+    assert actual.attrs == {"mode": "SC50MB"}
+    np.testing.assert_equal(actual["product"].values, urls)
+
+    orbit = actual["/sourceAttributes/orbit"]
+    assert orbit.sizes == {"product": 2, "timeStamp": 4}
+    np.testing.assert_equal(orbit["x"].values[0], [0.0, 1.0, 2.0, np.nan])
+
+
+@pytest.mark.parametrize(
+    "executor", ["threads", "processes", "dask", "pool"], indirect=True
+)
+def test_open_mfrcm_products(products, executor):
+    actual = api.open_mfrcm(products, executor=executor)
+
+    for tree, url in zip(actual, products):
+        xr.testing.assert_identical(tree, api.open_rcm(url))
+
+
+def test_open_mfrcm_stack_products(products, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("the imagery should not be opened")
+
+    monkeypatch.setattr(api, "open_imagery", fail)
+
+    actual = api.open_mfrcm(products, combine="stack")
+
+    assert "imagery" not in actual.children
+    np.testing.assert_equal(actual["product"].values, products)
+    lookup_tables = actual["lookupTables/lookupTables/lookup_tables"]
+    assert lookup_tables.sizes["product"] == 2
+    # conflicting attributes like the product id are dropped
+    xr.testing.assert_equal(
+        lookup_tables.isel(product=0, drop=True),
+        api.open_rcm(products[0], group="/lookupTables/lookupTables")["lookup_tables"],
+    )
+
+
+def test_stack_trees_different_structure():
+    trees = [
+        fake_tree("product0"),
+        fake_tree("product1").drop_nodes("sourceAttributes"),
+    ]
+
+    with pytest.raises(ValueError, match="different structure"):
+        api.stack_trees(trees)
+
+
+def test_open_rcm_async(monkeypatch):
+    fs = fsspec.filesystem("memory")
+    root = "/async-product"
+    files = {
+        "manifest.safe": b"<manifest/>",
+        "metadata/product.xml": b"<product/>",
+        "support/schemas/product.xsd": b"<schema/>",
+        "imagery/image_HH.tif": b"tif",
+    }
+    for path, content in files.items():
+        fs.pipe(f"{root}/{path}", content)
+
+    calls = {}
+
+    def fake_read_metadata(mapper, exists, manifest_ignores, nodes=None):
+        calls["mapper"] = mapper
+        calls["exists"] = [exists("imagery/image_HH.tif"), exists("missing.xml")]
+
+        return xr.DataTree(xr.Dataset(attrs={"product": "async"}))
+
+    def fake_open_imagery(tree, opener, **kwargs):
+        calls["imagery"] = opener.fs.cat("imagery/image_HH.tif")
+
+        return xr.Dataset({"band_data": (("y", "x"), np.zeros((2, 2)))})
+
+    monkeypatch.setattr(api, "read_metadata", fake_read_metadata)
+    monkeypatch.setattr(api, "open_imagery", fake_open_imagery)
+
+    actual = asyncio.run(api.open_rcm_async(f"memory://{root}"))
+
+    assert actual.attrs == {"product": "async"}
+    assert list(actual.children) == ["imagery"]
+    assert calls["mapper"] == {
+        path: content for path, content in files.items() if not path.endswith(".tif")
+    }
+    assert calls["exists"] == [True, False]
+    assert calls["imagery"] == b"tif"
+
+    fs.rm(root, recursive=True)
+
+
+@pytest.mark.parametrize(
+    ["zipped", "kwargs"],
+    (
+        pytest.param(False, {}, id="directory"),
+        pytest.param(True, {}, id="zip"),
+        pytest.param(False, {"verify": "checksum"}, id="verify"),
+        pytest.param(
+            True,
+            {"group": "/lookupTables", "drop_variables": ["angles"]},
+            id="group",
+        ),
+        pytest.param(False, {"group": "/imagery", "chunks": {}}, id="imagery"),
+    ),
+)
+def test_open_rcm_async_products(products, tmp_path, zipped, kwargs):
+    url = products[0]
+    if zipped:
+        url = shutil.make_archive(str(tmp_path / "RCM"), "zip", root_dir=url)
+
+    actual = asyncio.run(api.open_rcm_async(url, **kwargs))
+    expected = api.open_rcm(url, **kwargs)
+
+    xr.testing.assert_identical(actual, expected)
+
+
+def test_open_rcm_async_profile(products):
+    actual = asyncio.run(api.open_rcm_async(products[0], profile=True))
+
+    report = actual.encoding["profile"]
+    methods = {request.method for request in report.log}
+    assert {"find", "cat_file"} <= methods
+    assert {("open_rcm", "list"), ("open_rcm", "metadata")} <= set(report.stages)
+
+
+def test_open_rcm_async_invalid(products):
+    with pytest.raises(ValueError, match="verification mode"):
+        asyncio.run(api.open_rcm_async(products[0], verify="size"))
+
+
+@pytest.mark.parametrize(
+    ["group", "drop_variables", "recursive", "expected"],
+    (
+        pytest.param(
+            "/lookupTables",
+            [],
+            True,
+            [
+                "/lookupTables/incidenceAngles",
+                "/lookupTables/lookupTables",
+                "/lookupTables/noiseLevels",
+            ],
+            id="calibration",
+        ),
+        pytest.param(
+            "lookupTables/noiseLevels/referenceNoiseLevel",
+            [],
+            True,
+            ["/lookupTables/noiseLevels"],
+            id="within-file-node",
+        ),
+        pytest.param(
+            "/lookupTables",
+            ["lookup_tables", "angles"],
+            True,
+            ["/lookupTables/noiseLevels"],
+            id="dropped",
+        ),
+        pytest.param("/imagery", [], True, ["/imagery"], id="imagery"),
+        pytest.param(
+            "/sourceAttributes/orbitAndAttitude",
+            [],
+            True,
+            [
+                "/sourceAttributes/orbitAndAttitude/orbitInformation",
+                "/sourceAttributes/orbitAndAttitude/attitudeInformation",
+            ],
+            id="metadata",
+        ),
+        pytest.param("/", [], False, ["/"], id="root"),
+        pytest.param("/lookupTables", [], False, ["/lookupTables"], id="container"),
+    ),
+)
+def test_select_nodes(group, drop_variables, recursive, expected):
+    actual = api.select_nodes(group, drop_variables, recursive=recursive)
+
+    assert actual == expected
+
+
+def test_subset_tree():
+    tree = fake_tree("product0")
+
+    actual = api.subset_tree(tree, "sourceAttributes", drop_variables=["x"])
+
+    assert [node.path for node in actual.subtree] == ["/", "/orbit"]
+    assert list(actual["orbit"].variables) == ["timeStamp"]
+
+
+def test_open_rcm_pushdown(monkeypatch, tmp_path):
+    (tmp_path / "manifest.safe").write_bytes(b"<manifest/>")
+    calls = {}
+
+    def fake_read_metadata(mapper, exists, manifest_ignores, nodes=None):
+        calls["nodes"] = nodes
+
+        tree = fake_tree("product0").drop_nodes("imagery")
+        return tree.assign(
+            {"lookupTables": xr.DataTree.from_dict({"/lookupTables": xr.Dataset()})}
+        )
+
+    def fake_open_imagery(tree, opener, **kwargs):
+        calls["imagery"] = True
+
+        return fake_tree("product0")["imagery"].to_dataset()
+
+    monkeypatch.setattr(api, "read_metadata", fake_read_metadata)
+    monkeypatch.setattr(api, "open_imagery", fake_open_imagery)
+
+    actual = api.open_rcm(tmp_path, group="/lookupTables", drop_variables=["angles"])
+
+    assert calls["nodes"] == {"/lookupTables/lookupTables", "/lookupTables/noiseLevels"}
+    assert "imagery" not in calls
+    assert list(actual.children) == ["lookupTables"]
+
+    actual = api.open_rcm(tmp_path, group="/imagery")
+
+    assert calls["nodes"] == {"/sceneAttributes"}
+    assert calls["imagery"]
+    assert list(actual.data_vars) == ["band_data"]
+
+
+def test_scatter_metadata():
+    dask = pytest.importorskip("dask")
+
+    class FakeClient:
+        def __init__(self):
+            self.scattered = []
+
+        def scatter(self, data, broadcast=False):
+            self.scattered.extend(data)
+            return [dask.delayed(item) for item in data]
+
+    tree = fake_tree("product1")
+    client = FakeClient()
+
+    actual = api.scatter_metadata(tree, client)
+
+    assert len(client.scattered) == 1
+    orbit = actual["/sourceAttributes/orbit"]
+    assert isinstance(orbit["x"].data, dask.array.Array)
+    xr.testing.assert_identical(
+        orbit.to_dataset().compute(), tree["/sourceAttributes/orbit"].to_dataset()
+    )
+    assert isinstance(actual["/imagery/band_data"].data, np.ndarray)
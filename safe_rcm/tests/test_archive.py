@@ -0,0 +1,193 @@
+import zipfile
+
+import numpy as np
+import pytest
+
+from safe_rcm import archive
+
+
+@pytest.fixture
+def contents():
+    rng = np.random.default_rng(0)
+
+    return {
+        "product/manifest.safe": b"<manifest/>",
+        "product/metadata/product.xml": b"<product>" + b"x" * 5000 + b"</product>",
+        "product/imagery/image.tif": rng.integers(
+            0, 256, size=300_000, dtype="uint8"
+        ).tobytes(),
+        "product/imagery/zeros.tif": bytes(200_000),
+    }
+
+
+@pytest.fixture
+def zip_path(tmp_path, contents):
+    path = tmp_path / "product.zip"
+    with zipfile.ZipFile(path, "w") as f:
+        for name, data in contents.items():
+            compression = zipfile.ZIP_STORED if name.endswith("image.tif") else None
+            f.writestr(name, data, compress_type=compression or zipfile.ZIP_DEFLATED)
+
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    ["url", "expected"],
+    (
+        ("s3://bucket/product.zip", ("s3://bucket/product.zip", "")),
+        ("/data/PRODUCT.ZIP", ("/data/PRODUCT.ZIP", "")),
+        ("zip::s3://bucket/product", ("s3://bucket/product", "")),
+        ("zip://root/dir::s3://bucket/p.zip", ("s3://bucket/p.zip", "root/dir")),
+    ),
+)
+def test_split_zip_url(url, expected):
+    assert archive.is_zip_url(url)
+    assert archive.split_zip_url(url) == expected
+
+
+def test_is_zip_url():
+    assert not archive.is_zip_url("s3://bucket/product")
+    assert not archive.is_zip_url("/data/product.zip.d/")
+
+
+@pytest.mark.parametrize(
+    "name", ["product/imagery/image.tif", "product/imagery/zeros.tif"]
+)
+def test_open_member(zip_path, contents, name):
+    fs = archive.ZipArchiveFileSystem(zip_path, block_size=4096, max_blocks=4)
+    expected = contents[name]
+
+    with fs.open(name) as f:
+        assert f.size == len(expected)
+
+        f.seek(100_000)
+        assert f.read(10_000) == expected[100_000:110_000]
+
+        f.seek(-100, 2)
+        assert f.read() == expected[-100:]
+
+        f.seek(10)
+        assert f.read(5) == expected[10:15]
+        assert f.tell() == 15
+
+
+def test_member_blocks():
+    data = bytes(range(256)) * 4
+    requests = []
+
+    def fetcher(start, end):
+        requests.append((start, end))
+        return data[start:end]
+
+    blocks = archive.MemberBlocks(fetcher, len(data), block_size=100, max_blocks=4)
+
+    assert blocks.fetch(150, 420) == data[150:420]
+    assert requests == [(100, 500)]
+
+    # cached blocks are not fetched again, runs of missing blocks are merged
+    assert blocks.fetch(350, 750) == data[350:750]
+    assert requests[1:] == [(500, 800)]
+
+    # least recently used blocks are evicted
+    assert blocks.fetch(0, 50) == data[:50]
+    assert blocks.fetch(100, 200) == data[100:200]
+    assert requests[2:] == [(0, 100), (100, 200)]
+
+    assert blocks.fetch(1000, 1100) == data[1000:]
+    assert blocks.fetch(10, 10) == b""
+
+
+def test_deflated_member_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "checkpoint_interval", 20_000)
+
+    rng = np.random.default_rng(0)
+    expected = rng.integers(0, 16, size=200_000, dtype="uint8").tobytes()
+    path = tmp_path / "deflated.zip"
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as f:
+        f.writestr("member", expected)
+
+    fs = archive.ZipArchiveFileSystem(str(path), block_size=4096, max_blocks=2)
+    fetched = []
+    fetch_range = fs._fetch_range
+
+    def counting_fetch_range(start, end):
+        fetched.append(end - start)
+        return fetch_range(start, end)
+
+    fs._fetch_range = counting_fetch_range
+    info = fs.info("member")
+
+    with fs.open("member") as f:
+        f.seek(190_000)
+        assert f.read(1000) == expected[190_000:191_000]
+        total = sum(fetched)
+
+        # seeking backwards resumes from the closest checkpoint
+        fetched.clear()
+        f.seek(150_000)
+        assert f.read(1000) == expected[150_000:151_000]
+        assert sum(fetched) < total / 2
+
+        f.seek(10)
+        assert f.read(5) == expected[10:15]
+
+    # the compressed data, and the local header
+    assert total <= info["compress_size"] + archive.local_header.size
+
+
+def test_cat_members(zip_path, contents):
+    fs = archive.ZipArchiveFileSystem(zip_path)
+
+    requests = []
+    fetch_range = fs._fetch_range
+
+    def counting_fetch_range(start, end):
+        requests.append((start, end))
+        return fetch_range(start, end)
+
+    fs._fetch_range = counting_fetch_range
+
+    actual = fs.cat_members(list(contents))
+
+    assert actual == contents
+    assert len(requests) == 1
+
+    with pytest.raises(FileNotFoundError):
+        fs.cat_members(["product/missing.xml"])
+
+
+@pytest.mark.parametrize(
+    "name", ["product/imagery/image.tif", "product/imagery/zeros.tif"]
+)
+@pytest.mark.parametrize(
+    ["start", "end"], [(None, None), (1000, 50_000), (-100, None), (10, 10)]
+)
+def test_cat_file(zip_path, contents, name, start, end):
+    fs = archive.ZipArchiveFileSystem(zip_path)
+
+    actual = fs.cat_file(name, start=start, end=end)
+
+    assert actual == contents[name][start:end]
+
+
+def test_open_archive(zip_path):
+    first = archive.open_archive(zip_path)
+    second = archive.open_archive(zip_path)
+
+    assert first is second
+
+
+def test_product_filesystem(zip_path, contents):
+    mapper, fs = archive.product_filesystem(zip_path)
+
+    assert mapper["manifest.safe"] == contents["product/manifest.safe"]
+    assert fs.cat_file("imagery/image.tif") == contents["product/imagery/image.tif"]
+
+    preloaded, exists = archive.preload_members(fs, (".safe", ".xml"))
+
+    assert preloaded == {
+        "manifest.safe": contents["product/manifest.safe"],
+        "metadata/product.xml": contents["product/metadata/product.xml"],
+    }
+    assert exists("imagery/zeros.tif")
+    assert not exists("imagery/missing.tif")
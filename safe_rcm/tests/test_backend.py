@@ -0,0 +1,140 @@
+import zipfile
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from safe_rcm import api, backend
+from safe_rcm.tests import synthetic
+
+
+@pytest.fixture
+def product(tmp_path):
+    root = tmp_path / "RCM1_product"
+    root.mkdir()
+    (root / "manifest.safe").write_bytes(b"<manifest/>")
+
+    return root
+
+
+@pytest.fixture(scope="module")
+def synthetic_product(tmp_path_factory):
+    path = tmp_path_factory.mktemp("backend") / "RCM"
+
+    return synthetic.generate_product(
+        str(path), shape=(32, 32), tile_size=None, lut_length=8
+    )
+
+
+def fake_tree():
+    return xr.DataTree.from_dict(
+        {
+            "/": xr.Dataset(attrs={"mode": "SC50MB"}),
+            "/sceneAttributes": xr.Dataset({"ipdf": ("pole", ["a.tif"])}),
+            "/imagery": xr.Dataset({"band_data": (("y", "x"), np.zeros((2, 2)))}),
+        }
+    )
+
+
+def test_guess_can_open(product, tmp_path):
+    entrypoint = backend.RcmBackendEntrypoint()
+
+    archive = tmp_path / "RCM1_product.zip"
+    with zipfile.ZipFile(archive, "w") as f:
+        f.writestr("RCM1_product/manifest.safe", b"<manifest/>")
+
+    assert entrypoint.guess_can_open(product)
+    assert entrypoint.guess_can_open(str(archive))
+    assert entrypoint.guess_can_open("s3://bucket/RCM1_product.zip")
+    assert not entrypoint.guess_can_open(tmp_path)
+    assert not entrypoint.guess_can_open(product / "manifest.safe")
+    assert not entrypoint.guess_can_open("s3://bucket/product")
+
+
+def test_open_dataset(monkeypatch, product):
+    calls = {}
+
+    def fake_read_tree(url, nodes, **kwargs):
+        calls["nodes"] = nodes
+        calls["kwargs"] = kwargs
+
+        return fake_tree()
+
+    monkeypatch.setattr(api, "read_tree", fake_read_tree)
+
+    actual = xr.open_dataset(
+        product,
+        engine=backend.RcmBackendEntrypoint,
+        group="imagery",
+        storage_options={"anon": True},
+    )
+
+    assert calls["nodes"] == ["/imagery"]
+    assert calls["kwargs"]["backend_kwargs"] == {"storage_options": {"anon": True}}
+    assert list(actual.data_vars) == ["band_data"]
+
+    actual = xr.open_dataset(
+        product, engine=backend.RcmBackendEntrypoint, drop_variables=["band_data"]
+    )
+
+    assert calls["nodes"] == ["/"]
+    assert actual.attrs == {"mode": "SC50MB"}
+
+
+def test_open_datatree(monkeypatch, product):
+    calls = {}
+
+    def fake_open_rcm(url, **kwargs):
+        calls.update(kwargs)
+
+        return fake_tree()
+
+    monkeypatch.setattr(api, "open_rcm", fake_open_rcm)
+
+    actual = xr.open_datatree(
+        product, engine=backend.RcmBackendEntrypoint, drop_variables=["band_data"]
+    )
+
+    assert calls["group"] == "/"
+    assert calls["drop_variables"] == ["band_data"]
+    assert [node.path for node in actual.subtree] == [
+        "/",
+        "/sceneAttributes",
+        "/imagery",
+    ]
+
+    groups = xr.open_groups(product, engine=backend.RcmBackendEntrypoint)
+    assert list(groups) == ["/", "/sceneAttributes", "/imagery"]
+
+
+@pytest.mark.parametrize(
+    "group",
+    (
+        pytest.param("/", id="root"),
+        pytest.param("sceneAttributes", id="leaf"),
+        pytest.param("sourceAttributes/radarParameters/prfInformation", id="nested"),
+        pytest.param("lookupTables/lookupTables", id="calibration"),
+        pytest.param("imagery", id="imagery"),
+        pytest.param("sourceAttributes", id="parent"),
+        pytest.param("lookupTables/noiseLevels", id="file-parent"),
+        pytest.param("lookupTables", id="intermediate"),
+        pytest.param("imageGenerationParameters", id="intermediate-metadata"),
+        pytest.param("sourceAttributes/orbitAndAttitude", id="intermediate-nested"),
+    ),
+)
+def test_open_dataset_product(synthetic_product, group):
+    actual = xr.open_dataset(
+        synthetic_product, engine=backend.RcmBackendEntrypoint, group=group
+    )
+    expected = api.open_rcm(synthetic_product)[group].to_dataset()
+
+    # coordinates inherited from the parent are only kept where used
+    assert set(actual.data_vars) == set(expected.data_vars)
+    xr.testing.assert_identical(actual, expected[list(actual.variables)])
+
+
+def test_open_dataset_product_missing_group(synthetic_product):
+    with pytest.raises(KeyError):
+        xr.open_dataset(
+            synthetic_product, engine=backend.RcmBackendEntrypoint, group="missing"
+        )
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from safe_rcm import bursts
+from safe_rcm.api import open_rcm
+from safe_rcm.tests import synthetic
+
+
+def burst_map(extents):
+    # extents as (line_start, line_end, pixel_start, pixel_end) per burst and
+    # beam, with the end excluded
+    extents = np.asarray(extents, dtype="float64")
+    names = ["lineStart", "lineEnd", "pixelStart", "pixelEnd"]
+    offsets = [0, 1, 0, 1]
+
+    return xr.Dataset(
+        {
+            name: (["burst_maps", "burst", "beam"], extents[None, ..., index] - offset)
+            for index, (name, offset) in enumerate(zip(names, offsets))
+        },
+        coords={"beam": [f"S{index + 1}" for index in range(extents.shape[1])]},
+    )
+
+
+@pytest.mark.parametrize(
+    ["extents", "expected"],
+    (
+        pytest.param(
+            [
+                [[0, 32, 0, 16], [0, 32, 16, 40]],
+                [[32, 64, 0, 16], [32, 64, 16, 40]],
+            ],
+            ([0, 64], [0, 16, 40]),
+            id="aligned",
+        ),
+        pytest.param(
+            [
+                [[0, 32, 0, 16], [0, 20, 16, 40]],
+                [[32, 64, 0, 16], [20, 64, 16, 40]],
+            ],
+            ([0, 64], [0, 16, 40]),
+            id="staggered-bursts",
+        ),
+        pytest.param(
+            [
+                [[0, 32, 0, 16], [0, 32, 16, 40]],
+                [[32, 64, 0, 20], [32, 64, 20, 40]],
+            ],
+            ([0, 32, 64], [0, 16, 20, 40]),
+            id="shifted-beams",
+        ),
+        pytest.param(
+            [
+                [[0, 32, 0, 16], [np.nan, np.nan, np.nan, np.nan]],
+                [[32, 64, 0, 16], [32, 64, 16, 40]],
+            ],
+            ([0, 32, 64], [0, 16, 40]),
+            id="missing",
+        ),
+    ),
+)
+def test_beam_edges(extents, expected):
+    line_edges, pixel_edges = bursts.beam_edges(burst_map(extents), (64, 40))
+
+    np.testing.assert_equal(line_edges, expected[0])
+    np.testing.assert_equal(pixel_edges, expected[1])
+
+
+@pytest.mark.parametrize(
+    ["edges", "max_size", "expected"],
+    (
+        ([0, 64], 64, (64,)),
+        ([0, 16, 40], 16, (16, 16, 8)),
+        ([0, 10, 64], 32, (10, 32, 22)),
+    ),
+)
+def test_split_edges(edges, max_size, expected):
+    assert bursts.split_edges(np.array(edges), max_size) == expected
+
+
+def test_open_rcm_bursts(tmp_path):
+    url = synthetic.generate_product(
+        str(tmp_path / "RCM"), shape=(64, 48), tile_size=16, n_beams=3, n_bursts=2
+    )
+
+    tree = open_rcm(url, chunks="bursts")
+    imagery = tree["imagery/band_data"]
+
+    burst_map = tree["grdBurstMap"].to_dataset()
+    pixel_starts = np.unique(burst_map["pixelStart"].values)
+    chunk_starts = np.cumsum((0,) + imagery.chunksizes["x"][:-1])
+    assert set(pixel_starts) <= set(chunk_starts)
+    assert max(imagery.chunksizes["x"]) <= 48
+
+    xr.testing.assert_identical(imagery.compute(), open_rcm(url)["imagery/band_data"])
+
+
+def test_open_rcm_bursts_group(tmp_path):
+    url = synthetic.generate_product(
+        str(tmp_path / "RCM"), shape=(64, 48), tile_size=16, n_beams=3
+    )
+
+    tree = open_rcm(url, chunks="bursts", group="/imagery")
+
+    assert tree["band_data"].chunksizes["x"] == (16, 16, 16)
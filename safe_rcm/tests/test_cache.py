@@ -0,0 +1,186 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from safe_rcm import api, cache
+
+pytest.importorskip("zarr")
+
+
+def metadata_tree(value=0.0):
+    times = pd.to_datetime(
+        ["2020-02-14T12:00:00", "2020-02-14T12:00:30"], utc=True
+    ).as_unit("ns")
+    orbit = xr.Dataset(
+        {"z": ("timeStamp", [value, 1.0], {"units": "m"})},
+        coords={"timeStamp": times},
+        attrs={"passDirection": "Descending"},
+    )
+    noise = xr.Dataset(
+        {
+            "noiseLevelValues": (("coefficients", "pole"), [[1.0, np.nan]]),
+            "sarCalibrationType": ("pole", np.array(["Beta", "Sigma"], dtype=object)),
+        },
+        coords={"pole": ["HH", "HV"]},
+    )
+    nodes = {
+        "/": xr.Dataset(attrs={"productId": "product", "count": 3}),
+        "/sourceAttributes/orbit": orbit,
+        "/lookupTables/noiseLevels": noise,
+        "/a": xr.Dataset({"b": ("x", [1, 2]), "a": ("x", [3, 4])}),
+        "/stacked": xr.Dataset(
+            {"gains": ("stacked", [1.0, 2.0, 3.0])},
+            coords={
+                "pole": ("stacked", ["HH", "HH", "HV"]),
+                "beam": ("stacked", [1, 2, 1]),
+            },
+        ).set_index(stacked=["pole", "beam"]),
+    }
+    for path, ds in nodes.items():
+        ds.encoding["xpath"] = path
+
+    return xr.DataTree.from_dict(nodes)
+
+
+def assert_trees_identical(actual, expected):
+    xr.testing.assert_identical(actual, expected)
+
+    assert [node.path for node in actual.subtree] == [
+        node.path for node in expected.subtree
+    ]
+    for node in expected.subtree:
+        other = actual[node.path]
+        assert other.encoding == node.encoding
+        assert list(other.ds.variables) == list(node.ds.variables)
+        for name, var in node.ds.variables.items():
+            assert other.ds.variables[name].dtype == var.dtype
+
+
+def test_roundtrip(tmp_path):
+    tree = metadata_tree()
+
+    cache.encode_tree(tree).to_zarr(tmp_path / "tree.zarr", zarr_format=2)
+    with xr.open_datatree(tmp_path / "tree.zarr", engine="zarr") as stored:
+        actual = cache.decode_tree(stored.load())
+
+    assert_trees_identical(actual, tree)
+
+
+def test_metadata_cache(tmp_path):
+    metadata_cache = cache.MetadataCache(tmp_path / "cache")
+    key = metadata_cache.key("s3://bucket/product", b"<manifest/>")
+
+    assert key != metadata_cache.key("s3://bucket/product", b"<manifest2/>")
+    assert key != metadata_cache.key("s3://bucket/product2", b"<manifest/>")
+    assert key not in metadata_cache
+    assert metadata_cache.get(key) is None
+
+    tree = metadata_tree()
+    metadata_cache.put(key, tree)
+
+    assert key in metadata_cache
+    assert_trees_identical(metadata_cache.get(key), tree)
+
+    metadata_cache.clear()
+    assert metadata_cache.entries() == []
+
+
+def test_metadata_cache_eviction(tmp_path):
+    metadata_cache = cache.MetadataCache(tmp_path)
+
+    keys = ["a", "b", "c"]
+    for index, key in enumerate(keys):
+        metadata_cache.put(key, metadata_tree(float(index)))
+        os.utime(metadata_cache._path(key), (index, index))
+
+    # using an entry makes it the most recently used
+    metadata_cache.get("a")
+    assert [key for key, _, _ in metadata_cache.entries()] == ["b", "c", "a"]
+
+    size = metadata_cache.entries()[0][2]
+    metadata_cache.max_size = 2 * size + size // 2
+    metadata_cache.evict()
+
+    assert [key for key, _, _ in metadata_cache.entries()] == ["c", "a"]
+
+
+def test_metadata_cache_put_size(tmp_path, monkeypatch):
+    metadata_cache = cache.MetadataCache(tmp_path)
+    metadata_cache.put("a", metadata_tree(0.0))
+    os.utime(metadata_cache._path("a"), (0, 0))
+    size = metadata_cache.entries()[0][2]
+
+    scanned = []
+    directory_size = cache._directory_size
+
+    def recording_directory_size(path):
+        scanned.append(os.path.basename(path))
+        return directory_size(path)
+
+    monkeypatch.setattr(cache, "_directory_size", recording_directory_size)
+
+    # within budget, only the new entries are measured
+    metadata_cache.max_size = 3 * size + size // 2
+    for index, key in enumerate(["b", "c"], start=1):
+        metadata_cache.put(key, metadata_tree(0.0))
+        os.utime(metadata_cache._path(key), (index, index))
+    assert all(name.endswith(".tmp") for name in scanned)
+
+    # other instances scan the cache before adding to it, and evict once the
+    # estimate exceeds the budget
+    other = cache.MetadataCache(tmp_path, max_size=metadata_cache.max_size)
+    scanned.clear()
+    other.put("d", metadata_tree(0.0))
+
+    assert "a.zarr" in scanned
+    assert [key for key, _, _ in other.entries()] == ["b", "c", "d"]
+
+
+def test_metadata_cache_entries_evicted(tmp_path, monkeypatch):
+    metadata_cache = cache.MetadataCache(tmp_path)
+    metadata_cache.put("a", metadata_tree(0.0))
+    metadata_cache.put("b", metadata_tree(0.0))
+
+    directory_size = cache._directory_size
+
+    def evicting_directory_size(path):
+        # removed by another process after listing the directory
+        if os.path.basename(path) == "a.zarr":
+            raise FileNotFoundError(path)
+        return directory_size(path)
+
+    monkeypatch.setattr(cache, "_directory_size", evicting_directory_size)
+
+    assert [key for key, _, _ in metadata_cache.entries()] == ["b"]
+
+
+def test_metadata_cache_corrupted(tmp_path):
+    metadata_cache = cache.MetadataCache(tmp_path)
+    os.makedirs(metadata_cache._path("a"))
+
+    assert metadata_cache.get("a") is None
+    assert "a" not in metadata_cache
+
+
+def test_read_cached_metadata(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_read_metadata(mapper, exists, manifest_ignores):
+        calls.append(mapper)
+        return metadata_tree()
+
+    monkeypatch.setattr(api, "read_metadata", fake_read_metadata)
+    mapper = {"manifest.safe": b"<manifest/>"}
+
+    first = api.read_cached_metadata("product", mapper, None, [], cache=tmp_path)
+    second = api.read_cached_metadata("product", mapper, None, [], cache=tmp_path)
+
+    assert len(calls) == 1
+    assert_trees_identical(second, first)
+
+    mapper["manifest.safe"] = b"<modified/>"
+    api.read_cached_metadata("product", mapper, None, [], cache=tmp_path)
+    assert len(calls) == 2
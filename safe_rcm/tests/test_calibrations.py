@@ -0,0 +1,210 @@
+import posixpath
+
+import fsspec
+import numpy as np
+import pytest
+import xarray as xr
+from tlz.dicttoolz import valmap
+from tlz.functoolz import compose_left, curry, juxt
+
+from safe_rcm import calibrations
+from safe_rcm.product.reader import read_product
+from safe_rcm.product.transformers import extract_dataset
+from safe_rcm.product.utils import starcall
+from safe_rcm.tests import synthetic
+from safe_rcm.xml import read_xml
+
+
+def level(values, **metadata):
+    return metadata | {
+        "numberOfValues": len(values),
+        "noiseLevelValues": {"@units": "dB", "$": values},
+    }
+
+
+calibration_types = ["Sigma Nought", "Beta Nought", "Gamma"]
+
+
+@pytest.mark.parametrize(
+    ["entries", "kwargs", "combine"],
+    (
+        pytest.param(
+            [
+                level(
+                    [1.0 + i, 2.0, 3.0],
+                    sarCalibrationType=type_,
+                    pixelFirstNoiseValue=0,
+                    stepSize=8,
+                )
+                for i, type_ in enumerate(calibration_types)
+            ],
+            {"dims": ["sarCalibrationType"]},
+            calibrations._combine_reference_levels,
+            id="reference",
+        ),
+        pytest.param(
+            [
+                level(
+                    [1.0 + i, 2.0, 3.0][: 3 - i % 2],
+                    sarCalibrationType=type_,
+                    beam="S1",
+                    pixelFirstNoiseValue=i,
+                    stepSize=8,
+                )
+                for i, type_ in enumerate(calibration_types)
+            ],
+            {"dims": ["sarCalibrationType", "beam"], "squeeze": ["beam"]},
+            calibrations._combine_per_beam_levels,
+            id="per-beam",
+        ),
+        pytest.param(
+            [level([1.0, 2.0], beam="S1", stepSize=100)],
+            {"dims": ["beam"], "squeeze": ["beam"]},
+            calibrations._combine_azimuth_scaling,
+            id="azimuth-scaling",
+        ),
+    ),
+)
+def test_assemble_levels(entries, kwargs, combine):
+    actual = calibrations.assemble_levels(entries, **kwargs)
+    expected = combine(entries)
+
+    xr.testing.assert_identical(actual, expected)
+
+
+def test_assemble_levels_beams():
+    entries = [
+        level(
+            [1.0, 2.0, 3.0][: 3 - beam_index],
+            sarCalibrationType=type_,
+            beam=beam,
+            pixelFirstNoiseValue=beam_index * 10,
+            stepSize=8,
+        )
+        for type_ in calibration_types
+        for beam_index, beam in enumerate(["S1", "S2"])
+    ]
+
+    actual = calibrations.assemble_levels(
+        entries, dims=["sarCalibrationType", "beam"], squeeze=["beam"]
+    )
+
+    assert actual["noiseLevelValues"].dims == (
+        "sarCalibrationType",
+        "beam",
+        "coefficients",
+    )
+    assert actual.attrs == {}
+    np.testing.assert_equal(actual["pixelFirstNoiseValue"].values, [0, 10])
+    assert actual["pixelFirstNoiseValue"].dims == ("beam",)
+    assert actual["stepSize"].dims == ()
+    np.testing.assert_equal(
+        actual["noiseLevelValues"].sel(sarCalibrationType="Gamma").values,
+        [[1.0, 2.0, 3.0], [1.0, 2.0, np.nan]],
+    )
+
+
+def test_assemble_levels_fallback():
+    entries = [
+        level([1.0], sarCalibrationType="Gamma"),
+        level([2.0], sarCalibrationType="Gamma"),
+    ]
+    calls = []
+
+    def fallback(entries):
+        calls.append(entries)
+        return xr.Dataset()
+
+    calibrations.assemble_levels(
+        entries, dims=["sarCalibrationType"], fallback=fallback
+    )
+
+    assert calls == [entries]
+
+
+@pytest.mark.parametrize("poles", (["HH"], ["VV", "HH", "VH", "HV"]))
+def test_read_lookup_tables(tmp_path, poles):
+    url = synthetic.generate_product(
+        str(tmp_path / "RCM"), poles=poles, shape=(16, 16), tile_size=None, lut_length=8
+    )
+    mapper = fsspec.get_mapper(url)
+    fnames = xr.DataArray(
+        [
+            [f"lut{name}_{pole}.xml" for pole in poles]
+            for name in synthetic.calibration_types
+        ],
+        dims=["sarCalibrationType", "pole"],
+        coords={
+            "sarCalibrationType": list(synthetic.calibration_types.values()),
+            "pole": poles,
+        },
+    )
+    if len(poles) == 1:
+        fnames = fnames.squeeze("pole", drop=True).assign_attrs(pole=poles[0])
+
+    actual = calibrations.read_lookup_tables(mapper, "metadata/calibration", fnames)
+
+    assert actual["lookup_tables"].dims == (
+        "coefficients",
+        "sarCalibrationType",
+        "pole",
+    )
+    assert list(actual["pole"].values) == sorted(poles)
+    assert actual["pole"].dtype.kind == "U"
+    assert list(actual["sarCalibrationType"].values) == sorted(
+        synthetic.calibration_types.values()
+    )
+
+    expected = read_xml(mapper, f"metadata/calibration/lutGamma_{poles[-1]}.xml")
+    np.testing.assert_equal(
+        actual["lookup_tables"].sel(sarCalibrationType="Gamma", pole=poles[-1]).values,
+        expected["gains"],
+    )
+    assert actual["lookup_tables"].attrs["numberOfValues"] == 8
+
+
+def stacked_lookup_tables(mapper, root, fnames):
+    # the pipeline replaced by `read_lookup_tables`
+    return compose_left(
+        lambda obj: obj.stack(stacked=["sarCalibrationType", "pole"]),
+        lambda obj: obj.reset_index("stacked"),
+        juxt(
+            compose_left(
+                lambda obj: obj.to_series().to_dict(),
+                curry(valmap, curry(posixpath.join, root)),
+                curry(valmap, curry(read_xml)(mapper)),
+                curry(valmap, curry(extract_dataset, dims="coefficients")),
+                curry(valmap, lambda ds: ds["gains"].assign_attrs(ds.attrs)),
+                lambda d: xr.concat(list(d.values()), dim="stacked"),
+            ),
+            lambda obj: obj.coords,
+        ),
+        curry(starcall, lambda arr, coords: arr.assign_coords(coords)),
+        lambda arr: arr.set_index({"stacked": ["sarCalibrationType", "pole"]}),
+        lambda arr: arr.unstack("stacked"),
+        lambda arr: arr.rename("lookup_tables"),
+        lambda arr: arr.to_dataset(),
+    )(fnames)
+
+
+@pytest.mark.parametrize("n_beams", [1, 2, 4])
+@pytest.mark.parametrize(
+    "poles", (["HH", "HV"], ["VV", "HH", "VH", "HV"]), ids=["dual", "quad"]
+)
+def test_read_lookup_tables_stacked(tmp_path, poles, n_beams):
+    url = synthetic.generate_product(
+        str(tmp_path / "RCM"),
+        poles=poles,
+        shape=(16, 16),
+        tile_size=None,
+        lut_length=8,
+        n_beams=n_beams,
+    )
+    mapper = fsspec.get_mapper(url)
+    tree = read_product(mapper, "metadata/product.xml")
+    fnames = tree["/imageReferenceAttributes/lookupTableFileName"]
+
+    actual = calibrations.read_lookup_tables(mapper, "metadata/calibration", fnames)
+    expected = stacked_lookup_tables(mapper, "metadata/calibration", fnames)
+
+    xr.testing.assert_identical(actual, expected)
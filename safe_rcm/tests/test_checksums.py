@@ -0,0 +1,83 @@
+import hashlib
+
+import fsspec
+import pytest
+from fsspec.implementations.dirfs import DirFileSystem
+
+from safe_rcm import checksums
+
+try:
+    ExceptionGroup
+except NameError:
+    from exceptiongroup import ExceptionGroup
+
+
+@pytest.fixture
+def product(tmp_path):
+    files = {
+        "metadata/product.xml": b"<product/>",
+        "imagery/image.tif": bytes(range(256)) * 1000,
+        "support/notes.pdf": b"%PDF",
+    }
+    for path, data in files.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_bytes(data)
+
+    declared = {
+        path: ("MD5", hashlib.md5(data).hexdigest(), len(data))
+        for path, data in files.items()
+    }
+
+    return tmp_path, declared
+
+
+def test_hash_file(product):
+    root, declared = product
+    fs = DirFileSystem(path=str(root), fs=fsspec.filesystem("file"))
+
+    actual = checksums.hash_file(fs, "imagery/image.tif", "SHA-256", chunk_size=1000)
+    data = (root / "imagery/image.tif").read_bytes()
+
+    assert actual == (hashlib.sha256(data).hexdigest(), len(data))
+
+
+def test_verify_files(product):
+    root, declared = product
+    fs = DirFileSystem(path=str(root), fs=fsspec.filesystem("file"))
+
+    checksums.verify_files(fs, declared, max_workers=2, chunk_size=1000)
+
+
+def test_verify_files_errors(product):
+    root, declared = product
+    fs = DirFileSystem(path=str(root), fs=fsspec.filesystem("file"))
+
+    (root / "support/notes.pdf").unlink()
+    (root / "metadata/product.xml").write_bytes(b"<product>")
+    (root / "imagery/image.tif").unlink()
+    declared["metadata/calibration.xml"] = declared["metadata/product.xml"]
+    # same size, different content
+    (root / "metadata/calibration.xml").write_bytes(b"<corrupt/>")
+
+    with pytest.raises(ExceptionGroup, match="checksums of some files") as e:
+        checksums.verify_files(fs, declared, chunk_size=4)
+
+    messages = sorted(str(error) for error in e.value.exceptions)
+    assert len(messages) == 3
+    assert messages[0] == "imagery/image.tif does not exist"
+    assert "MD5 checksum mismatch" in messages[1]
+    assert messages[2].startswith("metadata/product.xml: size mismatch")
+
+
+def test_verify_checksums(monkeypatch, product):
+    root, declared = product
+    monkeypatch.setattr(checksums, "read_checksums", lambda mapper, path: declared)
+
+    checksums.verify_checksums(root, max_workers=1)
+
+    (root / "imagery/image.tif").write_bytes(b"truncated")
+    with pytest.raises(ExceptionGroup) as e:
+        checksums.verify_checksums(root)
+
+    [error] = e.value.exceptions
+    assert str(error).startswith("imagery/image.tif: size mismatch")
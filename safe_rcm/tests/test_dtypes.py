@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from safe_rcm import dtypes
+from safe_rcm.api import open_rcm
+from safe_rcm.calibrations import calibrate
+from safe_rcm.tests import synthetic
+
+
+def dataset():
+    return xr.Dataset(
+        {
+            "values": (("pole", "line"), np.ones((2, 3))),
+            "counts": ("line", np.arange(3)),
+        },
+        coords={
+            "pole": np.array(["HH", "HV"], dtype=object),
+            "line": np.arange(3, dtype="float64"),
+            "height": ("line", np.zeros(3)),
+            "beam": ("pole", np.array(["S1", "S2"], dtype=object)),
+        },
+        attrs={"units": "m"},
+    )
+
+
+@pytest.mark.parametrize("floats", (True, False))
+def test_compact_dataset(floats):
+    ds = dataset()
+
+    actual = dtypes.compact_dataset(ds, floats=floats)
+
+    float_dtype = np.dtype("float32" if floats else "float64")
+    assert actual["values"].dtype == float_dtype
+    assert actual["height"].dtype == float_dtype
+    assert actual["line"].dtype == np.dtype("float64")
+    assert actual["counts"].dtype == np.dtype("int64")
+    assert actual["pole"].dtype.kind == "U"
+    assert actual["beam"].dtype.kind == "U"
+    assert actual.attrs == ds.attrs
+
+    xr.testing.assert_allclose(actual, ds)
+
+
+def test_apply_dtype_policy():
+    tree = xr.DataTree.from_dict(
+        {
+            "/lookupTables/noiseLevels": dataset(),
+            "/orbitInformation": dataset(),
+        }
+    )
+
+    assert dtypes.apply_dtype_policy(tree, None) is tree
+    with pytest.raises(ValueError, match="unknown dtype policy"):
+        dtypes.apply_dtype_policy(tree, "small")
+
+    actual = dtypes.apply_dtype_policy(tree, "compact")
+
+    assert actual["lookupTables/noiseLevels/values"].dtype == np.dtype("float32")
+    assert actual["orbitInformation/values"].dtype == np.dtype("float64")
+    assert actual["orbitInformation/pole"].dtype.kind == "U"
+
+
+def test_open_rcm_compact(tmp_path):
+    url = synthetic.generate_product(
+        str(tmp_path / "RCM"), shape=(32, 24), tile_size=None, lut_length=8
+    )
+
+    default = open_rcm(url)
+    compact = open_rcm(url, dtype_policy="compact")
+
+    assert compact["imagery/band_data"].dtype == np.dtype("uint16")
+    assert compact["lookupTables/lookupTables/lookup_tables"].dtype == np.dtype(
+        "float32"
+    )
+    grid = compact["imageReferenceAttributes/geographicInformation/geolocationGrid"]
+    assert grid["latitude"].dtype == np.dtype("float32")
+
+    actual = calibrate(compact, "Sigma Nought")
+    expected = calibrate(default, "Sigma Nought")
+
+    assert actual.dtype == np.dtype("float32")
+    xr.testing.assert_allclose(actual, expected, rtol=1e-6)
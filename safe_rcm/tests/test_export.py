@@ -0,0 +1,172 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from safe_rcm import export
+
+pytest.importorskip("zarr")
+pytest.importorskip("dask")
+
+
+def product_tree():
+    rng = np.random.default_rng(0)
+
+    band_data = xr.Variable(
+        ("pole", "band", "y", "x"),
+        rng.integers(1, 1000, size=(2, 1, 40, 24)).astype("float32"),
+    )
+    band_data.encoding = {"preferred_chunks": {"band": 1, "y": 8, "x": 8}}
+    imagery = xr.Dataset(
+        {"band_data": band_data},
+        coords={
+            "pole": ["HH", "HV"],
+            "band": [1],
+            "y": np.arange(40) + 0.5,
+            "x": np.arange(24) + 0.5,
+        },
+    )
+
+    gains = np.linspace(1, 2, 4 * 2 * 2).reshape(4, 2, 2)
+    lookup_tables = xr.Dataset(
+        {
+            "lookup_tables": (
+                ("coefficients", "sarCalibrationType", "pole"),
+                gains,
+                {"pixelFirstLutValue": 0, "stepSize": 8, "offset": 0.0},
+            )
+        },
+        coords={
+            "sarCalibrationType": ["Beta Nought", "Sigma Nought"],
+            "pole": ["HH", "HV"],
+        },
+    )
+
+    return xr.DataTree.from_dict(
+        {
+            "/": xr.Dataset(attrs={"productId": "product"}),
+            "/sceneAttributes": xr.Dataset({"ipdf": ("pole", ["a.tif", "b.tif"])}),
+            "/lookupTables/lookupTables": lookup_tables,
+            "/imagery": imagery,
+        }
+    )
+
+
+def test_imagery_chunks():
+    imagery = product_tree()["imagery"].to_dataset()
+
+    actual = export.imagery_chunks(imagery, target_size=4 * 8 * 8 * 4)
+
+    assert actual == {"pole": 1, "band": 1, "y": 16, "x": 16}
+
+
+def test_to_zarr(tmp_path):
+    tree = product_tree()
+    store = tmp_path / "product.zarr"
+
+    kwargs = {"calibration": "Sigma Nought", "target_chunk_size": 8 * 8 * 4}
+    assert export.to_zarr(tree, store, **kwargs)
+    assert not export.to_zarr(tree, store, **kwargs)
+
+    actual = export.open_zarr(store, storage_options={})
+
+    xr.testing.assert_identical(
+        actual.drop_nodes("imagery"), tree.drop_nodes("imagery")
+    )
+    assert actual["imagery/band_data"].chunks == ((1, 1), (1,), (8,) * 5, (8,) * 3)
+    np.testing.assert_equal(
+        actual["imagery/band_data"].values, tree["imagery/band_data"].values
+    )
+
+    # at the positions of the lookup table values
+    sigma0 = actual["imagery/sigma0"].sel(pole="HH").isel(band=0, x=[0, 8, 16])
+    gains = tree["lookupTables/lookupTables/lookup_tables"].sel(
+        pole="HH", sarCalibrationType="Sigma Nought"
+    )
+    expected = tree["imagery/band_data"].sel(pole="HH").isel(
+        band=0, x=[0, 8, 16]
+    ) ** 2 / (gains.values[:3])
+    np.testing.assert_allclose(sigma0.values, expected.values, rtol=1e-6)
+
+
+def test_to_zarr_resume(tmp_path, monkeypatch):
+    tree = product_tree()
+    store = tmp_path / "product.zarr"
+
+    regions = []
+    to_zarr = xr.Dataset.to_zarr
+
+    def interrupted_to_zarr(self, *args, region=None, **kwargs):
+        if len(regions) == 2:
+            raise KeyboardInterrupt
+
+        regions.append(region["y"])
+        return to_zarr(self, *args, region=region, **kwargs)
+
+    monkeypatch.setattr(xr.Dataset, "to_zarr", interrupted_to_zarr)
+    with pytest.raises(KeyboardInterrupt):
+        export.to_zarr(tree, store, chunks={"y": 8}, rows_per_region=1)
+
+    with pytest.raises(ValueError, match="incomplete"):
+        export.open_zarr(store)
+
+    monkeypatch.setattr(xr.Dataset, "to_zarr", to_zarr)
+    written = []
+
+    def counting_to_zarr(self, *args, region=None, **kwargs):
+        written.append(region["y"])
+        return to_zarr(self, *args, region=region, **kwargs)
+
+    monkeypatch.setattr(xr.Dataset, "to_zarr", counting_to_zarr)
+    assert export.to_zarr(tree, store, chunks={"y": 8}, rows_per_region=1)
+
+    assert [region.start for region in written] == [16, 24, 32]
+
+    actual = export.open_zarr(store)
+    np.testing.assert_equal(
+        actual["imagery/band_data"].values, tree["imagery/band_data"].values
+    )
+
+
+@pytest.mark.parametrize(
+    ["kwargs", "match"],
+    (
+        pytest.param({"chunks": {"y": 16}}, "different chunks", id="chunks"),
+        pytest.param(
+            {"chunks": {"y": 8}, "calibration": "Sigma Nought"},
+            "different calibration",
+            id="calibration",
+        ),
+    ),
+)
+def test_to_zarr_resume_mismatch(tmp_path, monkeypatch, kwargs, match):
+    tree = product_tree()
+    store = tmp_path / "product.zarr"
+
+    to_zarr = xr.Dataset.to_zarr
+
+    def interrupted_to_zarr(self, *args, region=None, **kwargs):
+        if region is not None and region["y"].start > 0:
+            raise KeyboardInterrupt
+
+        return to_zarr(self, *args, region=region, **kwargs)
+
+    monkeypatch.setattr(xr.Dataset, "to_zarr", interrupted_to_zarr)
+    with pytest.raises(KeyboardInterrupt):
+        export.to_zarr(tree, store, chunks={"y": 8}, rows_per_region=1)
+    monkeypatch.setattr(xr.Dataset, "to_zarr", to_zarr)
+
+    with pytest.raises(ValueError, match=match):
+        export.to_zarr(tree, store, **kwargs)
+
+    # another product
+    other = tree.copy()
+    other.attrs["productId"] = "other"
+    with pytest.raises(ValueError, match="different product"):
+        export.to_zarr(other, store, chunks={"y": 8})
+
+    # starting over
+    assert export.to_zarr(tree, store, resume=False, **kwargs)
+    actual = export.open_zarr(store)
+    np.testing.assert_equal(
+        actual["imagery/band_data"].values, tree["imagery/band_data"].values
+    )
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from safe_rcm import geolocation
+
+pytest.importorskip("scipy")
+
+
+def linear_geolocation(line, pixel):
+    latitude = 45.0 - 0.002 * line + 0.0003 * pixel
+    longitude = -60.0 - 0.0005 * line - 0.003 * pixel
+
+    return latitude, longitude
+
+
+@pytest.fixture
+def grid():
+    lines = np.linspace(0, 2000, 11)
+    pixels = np.linspace(0, 3000, 16)
+    latitude, longitude = linear_geolocation(lines[:, None], pixels[None, :])
+
+    return xr.Dataset(
+        {
+            "latitude": (["line", "pixel"], latitude),
+            "longitude": (["line", "pixel"], longitude),
+        },
+        coords={"line": lines, "pixel": pixels},
+    )
+
+
+@pytest.fixture
+def tree(grid):
+    return xr.DataTree.from_dict({geolocation.geolocation_grid_path: grid})
+
+
+def test_to_cartesian():
+    actual = geolocation.to_cartesian(np.array([0, 0, 90]), np.array([0, 90, 0]))
+    expected = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]])
+
+    np.testing.assert_allclose(actual, expected, atol=1e-15)
+
+
+def test_locate_tie_points(grid):
+    index = geolocation.GeolocationIndex(grid)
+
+    lat = grid["latitude"].values
+    lon = grid["longitude"].values
+    line, pixel = index.locate(lat, lon)
+
+    np.testing.assert_allclose(
+        line, np.broadcast_to(grid["line"].values[:, None], lat.shape)
+    )
+    np.testing.assert_allclose(
+        pixel, np.broadcast_to(grid["pixel"].values[None, :], lat.shape), atol=1e-6
+    )
+
+
+def test_locate(grid):
+    index = geolocation.GeolocationIndex(grid)
+
+    rng = np.random.default_rng(0)
+    expected_line = rng.uniform(0, 2000, size=(20, 5))
+    expected_pixel = rng.uniform(0, 3000, size=(20, 5))
+    lat, lon = linear_geolocation(expected_line, expected_pixel)
+
+    line, pixel = index.locate(lat, lon)
+
+    assert line.shape == expected_line.shape
+    np.testing.assert_allclose(line, expected_line, atol=0.05)
+    np.testing.assert_allclose(pixel, expected_pixel, atol=0.05)
+
+
+def test_locate_outside(grid):
+    index = geolocation.GeolocationIndex(grid)
+
+    line, pixel = index.locate([0.0, 45.0], [0.0, -60.0])
+
+    np.testing.assert_equal(line, [np.nan, 0.0])
+    np.testing.assert_allclose(pixel, [np.nan, 0.0], atol=1e-6)
+
+
+def test_geolocation_index_cached(tree):
+    index = geolocation.geolocation_index(tree)
+
+    assert geolocation.geolocation_index(tree) is index
+
+    line, pixel = geolocation.locate(tree, 45.0, -60.0)
+    assert line.shape == ()
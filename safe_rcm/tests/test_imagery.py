@@ -0,0 +1,279 @@
+import pickle
+import subprocess
+import sys
+import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from safe_rcm import imagery
+from safe_rcm.api import open_rcm
+from safe_rcm.imagery import ProductOpener
+from safe_rcm.tests import synthetic
+
+rasterio = pytest.importorskip("rasterio")
+
+
+@pytest.fixture
+def product(tmp_path):
+    (tmp_path / "imagery").mkdir()
+    data = np.arange(64 * 32, dtype="uint16").reshape(1, 64, 32)
+
+    profile = {
+        "driver": "GTiff",
+        "width": 32,
+        "height": 64,
+        "count": 1,
+        "dtype": "uint16",
+        "tiled": True,
+        "blockxsize": 16,
+        "blockysize": 16,
+    }
+    with rasterio.open(tmp_path / "imagery" / "image_HH.tif", "w", **profile) as f:
+        f.write(data)
+
+    return str(tmp_path), data
+
+
+def test_product_opener(product):
+    root, _ = product
+    opener = ProductOpener(root, {"auto_mkdir": False})
+
+    assert opener.path("imagery/image_HH.tif") == f"{root}/imagery/image_HH.tif"
+    assert opener.ls(f"{root}/imagery") == [f"{root}/imagery/image_HH.tif"]
+    assert opener.isdir(f"{root}/imagery")
+    assert opener.isfile(f"{root}/imagery/image_HH.tif")
+
+    # pickles without the filesystem
+    opener.fs
+    restored = pickle.loads(pickle.dumps(opener))
+
+    assert restored == opener
+    assert hash(restored) == hash(opener)
+    assert restored._fs is None
+    assert restored.size(f"{root}/imagery/image_HH.tif") == opener.size(
+        f"{root}/imagery/image_HH.tif"
+    )
+
+
+def test_pickle_imagery(product):
+    root, data = product
+    opener = ProductOpener(root)
+
+    ds = xr.open_dataset(
+        opener.path("imagery/image_HH.tif"),
+        engine="rasterio",
+        open_kwargs={"opener": opener},
+        chunks={},
+    )
+    restored = pickle.loads(pickle.dumps(ds))
+
+    np.testing.assert_equal(restored["band_data"].values, data)
+
+
+@pytest.mark.parametrize("chunks", [None, {}], ids=["lazy", "dask"])
+def test_imagery_backend(product, chunks):
+    root, data = product
+    opener = ProductOpener(root)
+    path = opener.path("imagery/image_HH.tif")
+
+    ds = xr.open_dataset(
+        path, engine=imagery.ImageryBackendEntrypoint, opener=opener, chunks=chunks
+    )
+    expected = xr.open_dataset(path, engine="rasterio", open_kwargs={"opener": opener})
+
+    # read by threads that exit afterwards
+    with ThreadPoolExecutor(2) as executor:
+        subset = executor.submit(ds.isel, y=slice(10, 40), x=[1, 5, 7])
+        actual = executor.submit(subset.result().compute).result()
+
+    xr.testing.assert_identical(actual, expected.isel(y=slice(10, 40), x=[1, 5, 7]))
+
+    restored = pickle.loads(pickle.dumps(ds))
+    np.testing.assert_equal(restored["band_data"].values, data)
+
+
+def test_open_in_threads_exit(tmp_path):
+    # datasets opened in threads that have exited used to crash the interpreter
+    # when they were closed
+    urls = [
+        synthetic.generate_product(
+            str(tmp_path / f"RCM_{index}"), shape=(32, 32), tile_size=None
+        )
+        for index in range(3)
+    ]
+    script = textwrap.dedent(f"""
+        import gc
+        from concurrent.futures import ThreadPoolExecutor
+
+        from safe_rcm.api import open_mfrcm, open_rcm
+
+        urls = {urls!r}
+
+        def read(url):
+            tree = open_rcm(url)
+            tree["imagery/band_data"].isel(y=slice(8)).load()
+            return tree
+
+        with ThreadPoolExecutor(3) as executor:
+            trees = list(executor.map(read, urls))
+        combined = open_mfrcm(urls)
+        del trees
+        gc.collect()
+        """)
+
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", script],
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert "Error" not in result.stderr
+    assert "Exception ignored" not in result.stderr
+
+
+@pytest.mark.parametrize(
+    ["options", "expected"],
+    (
+        pytest.param({}, (512,) * 8, id="tiled"),
+        pytest.param({"BIGTIFF": "YES"}, (512,) * 8, id="bigtiff"),
+        pytest.param(
+            {"tiled": False, "blockysize": 8, "blockxsize": 32},
+            (512,) * 8,
+            id="striped",
+        ),
+    ),
+)
+def test_tiff_byte_counts(tmp_path, options, expected):
+    path = tmp_path / "image.tif"
+    profile = {
+        "driver": "GTiff",
+        "width": 32,
+        "height": 64,
+        "count": 1,
+        "dtype": "uint16",
+        "tiled": True,
+        "blockxsize": 16,
+        "blockysize": 16,
+    } | options
+    with rasterio.open(path, "w", **profile) as f:
+        f.write(np.ones((1, 64, 32), dtype="uint16"))
+
+    data = path.read_bytes()
+
+    def fetch(start, end):
+        return data[start:end]
+
+    assert imagery.tiff_byte_counts(data[:16], fetch) == expected
+    assert imagery.tile_block_size(data, fetch) == imagery.min_block_size
+    assert imagery.tile_block_size(b"not a tiff", fetch) == imagery.max_block_size
+
+
+class CountingFetch:
+    def __init__(self, block_size=4):
+        self.block_size = block_size
+        self.requests = []
+
+    def __call__(self, first, last):
+        self.requests.append((first, last))
+        return [bytes([index]) * self.block_size for index in range(first, last + 1)]
+
+
+def test_tile_cache():
+    cache = imagery.TileCache(max_bytes=16)
+    fetch = CountingFetch()
+
+    blocks = cache.get("a", [1, 2, 4], fetch)
+    assert blocks == {index: bytes([index]) * 4 for index in [1, 2, 4]}
+    assert fetch.requests == [(1, 2), (4, 4)]
+
+    cache.get("a", [1, 2], fetch)
+    assert len(fetch.requests) == 2
+
+    # evicts the least recently used block
+    cache.get("b", [0, 1], fetch)
+    assert cache.nbytes == 16
+    cache.get("a", [4], fetch)
+    assert fetch.requests[-1] == (4, 4)
+
+    cache.clear()
+    cache.get("a", [0], fetch, readahead=2, n_blocks=5)
+    cache.get("a", [1, 2], fetch, readahead=2, n_blocks=5)
+    assert fetch.requests[-1] == (0, 2)
+
+
+def test_tile_cache_concurrent():
+    cache = imagery.TileCache(max_bytes=2**10)
+    started = threading.Event()
+    release = threading.Event()
+    fetch = CountingFetch()
+
+    def slow_fetch(first, last):
+        started.set()
+        release.wait(timeout=5)
+        return fetch(first, last)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(cache.get, "a", [0, 1], slow_fetch)
+        started.wait(timeout=5)
+        second = executor.submit(cache.get, "a", [1], slow_fetch)
+        release.set()
+
+        assert first.result()[1] == second.result()[1]
+
+    assert fetch.requests == [(0, 1)]
+
+
+def test_tile_cache_error():
+    cache = imagery.TileCache(max_bytes=2**10)
+
+    def failing_fetch(first, last):
+        raise OSError("unavailable")
+
+    with pytest.raises(OSError, match="unavailable"):
+        cache.get("a", [0], failing_fetch)
+
+    fetch = CountingFetch()
+    assert cache.get("a", [0], fetch) == {0: bytes(4)}
+
+
+def test_product_opener_tile_cache(product):
+    root, data = product
+    opener = ProductOpener(root, tile_cache=True)
+    imagery.default_tile_cache.clear()
+
+    ds = xr.open_dataset(
+        opener.path("imagery/image_HH.tif"),
+        engine="rasterio",
+        open_kwargs={"opener": opener},
+        mask_and_scale=False,
+    )
+
+    np.testing.assert_equal(ds["band_data"].values, data)
+    with opener.open(opener.path("imagery/image_HH.tif")) as f:
+        assert isinstance(f, imagery.CachedFile)
+        f.seek(100)
+        assert f.read(10) == (Path(root) / "imagery/image_HH.tif").read_bytes()[100:110]
+
+    restored = pickle.loads(pickle.dumps(opener))
+    assert restored.tile_cache
+    assert restored != ProductOpener(root)
+
+
+def test_open_rcm_tile_cache(tmp_path):
+    url = synthetic.generate_product(
+        str(tmp_path / "RCM"), poles=("HH",), shape=(512, 256), tile_size=128
+    )
+    imagery.default_tile_cache.clear()
+
+    expected = open_rcm(url)["imagery/band_data"].values
+    actual = open_rcm(url, tile_cache=True, chunks={})["imagery/band_data"].values
+
+    np.testing.assert_equal(actual, expected)
+    assert imagery.default_tile_cache.nbytes > 0
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+
+import pytest
+
+heavy_modules = ["xarray", "pandas", "numpy", "xmlschema", "rasterio", "dask", "zarr"]
+
+
+def imported_modules(statement):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # lines look like: "import time:  self [us] | cumulative | imported package"
+    return {
+        line.rsplit("|", 1)[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+
+@pytest.mark.parametrize(
+    ["statement", "allowed"],
+    (
+        pytest.param("import safe_rcm", [], id="package"),
+        pytest.param("from safe_rcm.manifest import read_manifest", [], id="manifest"),
+        pytest.param(
+            "import safe_rcm.backend", ["xarray", "pandas", "numpy"], id="backend"
+        ),
+        pytest.param("import safe_rcm.api", ["xarray", "pandas", "numpy"], id="api"),
+    ),
+)
+def test_lazy_imports(statement, allowed):
+    imported = imported_modules(statement)
+
+    unexpected = [
+        name for name in heavy_modules if name not in allowed and name in imported
+    ]
+    assert not unexpected
+
+
+def test_lazy_attributes():
+    import safe_rcm
+    from safe_rcm import api
+
+    assert safe_rcm.open_rcm is api.open_rcm
+    assert "open_mfrcm" in dir(safe_rcm)
+    assert isinstance(safe_rcm.__version__, str)
+
+    with pytest.raises(AttributeError):
+        safe_rcm.missing
+
+
+def test_runtime_imports_exclude_tests():
+    imported = imported_modules("import safe_rcm.api, safe_rcm.backend")
+
+    assert not any(name.startswith("safe_rcm.tests") for name in imported)
@@ -0,0 +1,171 @@
+import textwrap
+
+import pandas as pd
+import pytest
+
+from safe_rcm import index
+
+pytest.importorskip("pyarrow")
+
+manifest = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<xfdu:XFDU xmlns:xfdu="urn:ccsds:schema:xfdu:1">
+  <dataObjectSection>
+    <dataObject ID="dataObject0">
+      <byteStream mimeType="application/octet-stream" size="100">
+        <fileLocation locatorType="URL" locator="/metadata" href="product.xml"/>
+      </byteStream>
+    </dataObject>
+    <dataObject ID="dataObject1">
+      <byteStream mimeType="application/octet-stream" size="20">
+        <fileLocation locatorType="URL" locator="/imagery" href="image.tif"/>
+      </byteStream>
+    </dataObject>
+  </dataObjectSection>
+</xfdu:XFDU>
+"""
+
+
+def tie_point(line, pixel):
+    return f"""
+        <imageTiePoint>
+          <imageCoordinate><line>{line}</line><pixel>{pixel}</pixel></imageCoordinate>
+          <geodeticCoordinate>
+            <latitude units="deg">{45 - line / 10}</latitude>
+            <longitude units="deg">{-60 - pixel / 10}</longitude>
+          </geodeticCoordinate>
+        </imageTiePoint>"""
+
+
+def product(name):
+    tie_points = "".join(
+        tie_point(line, pixel) for line in [0, 10, 20] for pixel in [0, 10]
+    )
+    return textwrap.dedent(f"""\
+        <?xml version="1.0" encoding="UTF-8"?>
+        <product xmlns="rcmGsProductSchema">
+          <productId>{name}</productId>
+          <sourceAttributes>
+            <satellite>RCM-2</satellite>
+            <beamModeMnemonic>SC50MB</beamModeMnemonic>
+            <radarParameters>
+              <acquisitionType>ScanSAR</acquisitionType>
+              <polarizations>HH HV</polarizations>
+            </radarParameters>
+            <orbitAndAttitude>
+              <orbitInformation><passDirection>Ascending</passDirection></orbitInformation>
+            </orbitAndAttitude>
+          </sourceAttributes>
+          <imageGenerationParameters>
+            <generalProcessingInformation><productType>GRD</productType></generalProcessingInformation>
+            <sarProcessingInformation>
+              <zeroDopplerTimeFirstLine>2021-03-01T10:00:00.000000Z</zeroDopplerTimeFirstLine>
+              <zeroDopplerTimeLastLine>2021-03-01T10:00:30.500000Z</zeroDopplerTimeLastLine>
+            </sarProcessingInformation>
+          </imageGenerationParameters>
+          <imageReferenceAttributes>
+            <geographicInformation><geolocationGrid>{tie_points}
+            </geolocationGrid></geographicInformation>
+          </imageReferenceAttributes>
+        </product>
+        """)
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "products"
+    for name in ["b", "a", "nested/c"]:
+        path = root / name
+        (path / "metadata").mkdir(parents=True)
+        (path / "manifest.safe").write_text(manifest)
+        (path / "metadata" / "product.xml").write_text(product(path.name))
+
+    return root
+
+
+def test_find_products(root):
+    actual = index.find_products(str(root))
+    expected = [f"file://{root}/{name}" for name in ["a", "b", "nested/c"]]
+
+    assert actual == expected
+
+
+def test_extract_record(root):
+    actual = index.extract_record(str(root / "a"))
+
+    expected = {
+        "url": str(root / "a"),
+        "product_id": "a",
+        "satellite": "RCM-2",
+        "beam_mode": "SC50MB",
+        "acquisition_type": "ScanSAR",
+        "polarizations": "HH HV",
+        "pass_direction": "Ascending",
+        "product_type": "GRD",
+        "start_time": pd.Timestamp("2021-03-01T10:00:00Z"),
+        "stop_time": pd.Timestamp("2021-03-01T10:00:30.5Z"),
+        "footprint": (
+            "POLYGON ((-60.0 45.0, -61.0 45.0, -61.0 44.0, -61.0 43.0, -60.0 43.0,"
+            " -60.0 44.0, -60.0 45.0))"
+        ),
+        "n_files": 2,
+        "size": 120,
+    }
+
+    assert actual == expected
+
+
+def test_index_products(root, tmp_path):
+    output = tmp_path / "catalog.parquet"
+
+    n_indexed, n_failed = index.index_products(
+        str(root), str(output), max_workers=1, batch_size=2
+    )
+    assert (n_indexed, n_failed) == (3, 0)
+    assert sorted(p.name for p in output.iterdir()) == [
+        "part-00000.parquet",
+        "part-00001.parquet",
+    ]
+
+    catalog = pd.read_parquet(output)
+    assert sorted(catalog["product_id"]) == ["a", "b", "c"]
+
+    # resume: only new products are indexed
+    path = root / "d"
+    (path / "metadata").mkdir(parents=True)
+    (path / "manifest.safe").write_text(manifest)
+    (path / "metadata" / "product.xml").write_text(product("d"))
+    (root / "broken").mkdir()
+    (root / "broken" / "manifest.safe").write_text(manifest)
+
+    n_indexed, n_failed = index.index_products(str(root), str(output), max_workers=1)
+    assert (n_indexed, n_failed) == (1, 1)
+
+    catalog = pd.read_parquet(output)
+    assert sorted(catalog["product_id"]) == ["a", "b", "c", "d"]
+
+
+def test_main(root, tmp_path, capsys):
+    output = tmp_path / "catalog.parquet"
+
+    assert index.main([str(root), "-o", str(output), "-j", "1"]) == 0
+    assert "indexed 3 products, 0 failed" in capsys.readouterr().err
+
+
+def test_main_storage_options(root, tmp_path, capsys, monkeypatch):
+    output = tmp_path / "catalog.parquet"
+    argv = [str(root), "-o", str(output), "-j", "1"]
+
+    assert index.main(argv + ["--storage-options", '{"auto_mkdir": true}']) == 0
+    assert "indexed 3 products, 0 failed" in capsys.readouterr().err
+
+    calls = []
+    monkeypatch.setattr(
+        index, "index_products", lambda *args, **kwargs: calls.append(kwargs) or (0, 0)
+    )
+    index.main(argv + ["--storage-options", '{"anon": true}'])
+    assert calls[0]["storage_options"] == {"anon": True}
+
+    for options in ["{anon: true}", "[1, 2]"]:
+        with pytest.raises(SystemExit):
+            index.main(argv + ["--storage-options", options])
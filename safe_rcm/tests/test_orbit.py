@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from safe_rcm import orbit
+
+radius = 7.07e6
+angular_rate = 1.06e-3
+start = np.datetime64("2020-02-14T11:59:05", "ns")
+
+
+def circular_orbit(times):
+    seconds = (times - start) / np.timedelta64(1, "s")
+    phase = angular_rate * seconds
+
+    position = radius * np.stack(
+        [np.cos(phase), np.sin(phase), np.zeros_like(phase)], axis=-1
+    )
+    velocity = (
+        radius
+        * angular_rate
+        * np.stack([-np.sin(phase), np.cos(phase), np.zeros_like(phase)], axis=-1)
+    )
+
+    return position, velocity
+
+
+@pytest.fixture
+def orbit_information():
+    times = start + np.arange(12) * np.timedelta64(30, "s")
+    position, velocity = circular_orbit(times)
+
+    timestamps = pd.to_datetime(times, utc=True)
+    data_vars = {
+        name: ("timeStamp", values, {"units": units})
+        for names, data, units in [
+            (orbit.positions, position, "m"),
+            (orbit.velocities, velocity, "m/s"),
+        ]
+        for name, values in zip(names, data.T)
+    }
+
+    return xr.Dataset(data_vars, coords={"timeStamp": timestamps})
+
+
+@pytest.mark.parametrize(
+    "times",
+    (
+        pytest.param(["2020-02-14T12:00:00Z"], id="strings"),
+        pytest.param(
+            np.array(["2020-02-14T12:00:00"], dtype="datetime64[us]"), id="us"
+        ),
+        pytest.param(pd.to_datetime(["2020-02-14T13:00:00+01:00"]), id="tz-aware"),
+    ),
+)
+def test_as_datetime64(times):
+    actual = orbit.as_datetime64(times)
+    expected = np.array(["2020-02-14T12:00:00"], dtype="datetime64[ns]")
+
+    np.testing.assert_equal(actual, expected)
+
+
+@pytest.mark.parametrize("window", [2, 4, 6])
+def test_polynomial_interpolator_hermite(window):
+    times = start + np.arange(12) * np.timedelta64(30, "s")
+    position, velocity = circular_orbit(times)
+
+    interpolator = orbit.PolynomialInterpolator(
+        times, position, velocity, window=window
+    )
+
+    # exact at the nodes
+    values, derivatives = interpolator(times)
+    np.testing.assert_allclose(values, position, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(derivatives, velocity, rtol=0, atol=1e-6)
+
+    query = start + np.arange(0, 330 * 10**3, 7) * np.timedelta64(1, "ms")
+    expected_position, expected_velocity = circular_orbit(query)
+    values, derivatives = interpolator(query)
+
+    tolerance = {2: 1.0, 4: 1e-6, 6: 1e-6}[window]
+    np.testing.assert_allclose(values, expected_position, rtol=0, atol=tolerance)
+
+
+def test_polynomial_interpolator_lagrange():
+    times = start + np.arange(10) * np.timedelta64(10, "s")
+    values = 3.0 * ((times - start) / np.timedelta64(1, "s")) ** 2
+
+    interpolator = orbit.PolynomialInterpolator(times, values, window=3)
+
+    query = start + np.array([5, 12, 87], dtype="timedelta64[s]")
+    seconds = (query - start) / np.timedelta64(1, "s")
+    actual, derivatives = interpolator(query)
+
+    np.testing.assert_allclose(actual[:, 0], 3 * seconds**2)
+    np.testing.assert_allclose(derivatives[:, 0], 6 * seconds)
+
+
+def test_polynomial_interpolator_outside():
+    times = start + np.arange(5) * np.timedelta64(10, "s")
+    interpolator = orbit.PolynomialInterpolator(times, np.arange(5.0))
+
+    query = start + np.array([-1, 20, 41], dtype="timedelta64[s]")
+    actual, _ = interpolator(query)
+    np.testing.assert_equal(actual[:, 0], [np.nan, 2.0, np.nan])
+
+    actual, _ = interpolator(query, extrapolate=True)
+    np.testing.assert_allclose(actual[:, 0], [-0.1, 2.0, 4.1])
+
+
+def test_polynomial_interpolator_invalid():
+    times = start + np.array([0, 10, 10], dtype="timedelta64[s]")
+
+    with pytest.raises(ValueError, match="strictly increasing"):
+        orbit.PolynomialInterpolator(times, np.arange(3.0))
+
+
+def test_orbit_interpolator(orbit_information):
+    interpolator = orbit.orbit_interpolator(orbit_information)
+
+    times = start + np.array([15, 100, 250], dtype="timedelta64[s]")
+    actual = interpolator(times, dim="line")
+    expected_position, expected_velocity = circular_orbit(times)
+
+    assert actual.sizes == {"line": 3}
+    assert list(actual.data_vars) == orbit.positions + orbit.velocities
+    assert actual["xVelocity"].attrs == {"units": "m/s"}
+    np.testing.assert_allclose(
+        actual[orbit.positions].to_array("c").transpose().values,
+        expected_position,
+        atol=1e-6,
+    )
+    np.testing.assert_allclose(
+        actual[orbit.velocities].to_array("c").transpose().values,
+        expected_velocity,
+        atol=1e-6,
+    )
+
+
+def test_attitude_interpolator():
+    times = start + np.arange(8) * np.timedelta64(10, "s")
+    attitude = xr.Dataset(
+        {
+            "yaw": ("timeStamp", np.linspace(0, 1, 8)),
+            "roll": ("timeStamp", np.full(8, -29.0)),
+            "source": ("timeStamp", ["a"] * 8),
+        },
+        coords={"timeStamp": times},
+    )
+
+    interpolator = orbit.attitude_interpolator(attitude)
+    query = xr.DataArray(
+        start + np.array([[5, 15], [25, 35]], dtype="timedelta64[s]"),
+        dims=["y", "x"],
+    )
+    actual = interpolator(query)
+
+    assert list(actual.data_vars) == ["yaw", "roll"]
+    assert actual["yaw"].dims == ("y", "x")
+    np.testing.assert_allclose(
+        actual["yaw"].values, [[0.5 / 7, 1.5 / 7], [2.5 / 7, 3.5 / 7]]
+    )
+    np.testing.assert_allclose(actual["roll"].values, -29.0)
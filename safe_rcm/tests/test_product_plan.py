@@ -0,0 +1,95 @@
+import pytest
+import xarray as xr
+from tlz.functoolz import compose_left, curry, juxt
+
+from safe_rcm.product.plan import Plan, Step, compile_function
+
+
+def make_dataset(value, name="a"):
+    return xr.Dataset(attrs={name: value})
+
+
+@pytest.mark.parametrize(
+    "f",
+    (
+        pytest.param(len, id="plain"),
+        pytest.param(curry(sorted)(reverse=True), id="curry"),
+        pytest.param(compose_left(sorted, curry(map, str), list), id="compose"),
+        pytest.param(
+            compose_left(juxt(min, compose_left(max, str)), list), id="nested"
+        ),
+    ),
+)
+def test_compile_function(f):
+    compiled = compile_function(f)
+    value = [3, 1, 2]
+
+    assert not isinstance(compiled, (curry, juxt))
+    assert compiled(value) == f(value)
+
+
+@pytest.mark.parametrize(
+    ["path", "expected"],
+    (
+        ("/", {"a": {"b": 1}}),
+        ("/a", {"b": 1}),
+        ("/a/b", 1),
+    ),
+)
+def test_step(path, expected):
+    step = Step(path=path, f=make_dataset)
+
+    actual = step({"a": {"b": 1}})
+
+    assert actual.attrs == {"a": expected}
+    assert actual.encoding == {"xpath": path}
+
+
+def test_step_missing():
+    step = Step(path="/a/c", f=make_dataset)
+
+    with pytest.raises(KeyError):
+        step({"a": {"b": 1}})
+
+
+def test_plan():
+    plan = Plan(
+        {
+            "/": {"path": "/a", "f": make_dataset},
+            "/b": {"path": "/a/b", "f": curry(make_dataset)(name="b")},
+        }
+    )
+
+    assert list(plan) == ["/", "/b"]
+    assert plan["/b"].keys == ("a", "b")
+
+    actual = plan({"a": {"b": 1}})
+    assert list(actual) == ["/", "/b"]
+    assert actual["/b"].attrs == {"b": 1}
+
+    # reusable
+    assert plan({"a": {"b": 2}})["/b"].attrs == {"b": 2}
+
+
+def test_plan_extend():
+    plan = Plan(
+        {
+            "/": {"path": "/", "f": make_dataset},
+            "/b": {"path": "/a/b", "f": make_dataset},
+        }
+    )
+
+    extended = plan.extend(
+        {
+            "/b": {"path": "/a/b", "f": curry(make_dataset)(name="b")},
+            "/c": {"path": "/c", "f": make_dataset},
+        },
+        drop=["/"],
+    )
+
+    assert list(plan) == ["/", "/b"]
+    assert list(extended) == ["/b", "/c"]
+
+    actual = extended({"a": {"b": 1}, "c": 2})
+    assert actual["/b"].attrs == {"b": 1}
+    assert actual["/c"].attrs == {"a": 2}
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from safe_rcm.product import predicates
+from safe_rcm.product.predicates import Kind
+
+
+@pytest.mark.parametrize(
+    ["obj", "expected"],
+    (
+        pytest.param(1.5, Kind.SCALAR | Kind.SCALAR_VALUED, id="scalar"),
+        pytest.param("abc", Kind.SCALAR | Kind.SCALAR_VALUED, id="string"),
+        pytest.param([1, 2], Kind.ARRAY, id="array"),
+        pytest.param([1], Kind.ARRAY | Kind.SCALAR_VALUED, id="array-1"),
+        pytest.param(
+            [{"@dataStream": "Magnitude", "$": 1.0}],
+            Kind.COMPOSITE | Kind.MAGNITUDE | Kind.NESTED | Kind.NESTED_ARRAY,
+            id="magnitude",
+        ),
+        pytest.param(
+            [
+                {"@dataStream": "Real", "$": [1.0, 2.0]},
+                {"@dataStream": "Imaginary", "$": [0.0, 1.0]},
+            ],
+            Kind.COMPOSITE | Kind.COMPLEX | Kind.ARRAY,
+            id="complex-array",
+        ),
+        pytest.param(
+            {"@units": "m", "$": 1.0},
+            Kind.SCALAR_VARIABLE | Kind.SCALAR_VALUED,
+            id="scalar-variable",
+        ),
+        pytest.param({"a": [1, 2]}, Kind(0), id="mapping"),
+        pytest.param(
+            [{"@pole": "HH", "$": 1.0}, {"@pole": "VV", "$": 2.0}],
+            Kind.NESTED | Kind.NESTED_ARRAY,
+            id="nested-array",
+        ),
+        pytest.param(
+            [{"@pole": "HH", "a": 1.0, "b": {"@units": "m", "$": 2}}],
+            Kind.NESTED | Kind.NESTED_DATASET,
+            id="nested-dataset",
+        ),
+        pytest.param([{"a": [{"b": 1}]}], Kind(0), id="deeply-nested"),
+        pytest.param([], Kind(0), id="empty"),
+    ),
+)
+def test_classify(obj, expected):
+    assert predicates.classify(obj) == expected
+
+    with predicates.classification_cache():
+        assert predicates.classify(obj) == expected
+        assert predicates.classify(obj) == expected
+
+
+def test_classification_cache():
+    obj = [{"@pole": "HH", "$": 1.0}]
+
+    with predicates.classification_cache():
+        assert predicates.is_nested_array(obj)
+
+        # memoized by identity
+        obj[0] = 1
+        assert predicates.is_nested_array(obj)
+
+    assert not predicates.is_nested_array(obj)
+
+
+@pytest.mark.parametrize(
+    ["column", "expected"],
+    (
+        (np.array([]), False),
+        (np.array(["a", "a"]), True),
+        (np.array(["a", "b"]), False),
+        (np.array([1.5, 1.5, 1.5]), True),
+        (np.array([np.nan, np.nan]), True),
+        (np.array([np.nan, 1.0]), False),
+        (np.array([1, 2, 1]), False),
+    ),
+)
+def test_is_attr(column, expected):
+    assert predicates.is_attr(column) is expected
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from tlz.dicttoolz import merge_with
+
+from safe_rcm.product import transformers
+
+
+@pytest.mark.parametrize(
+    "records",
+    (
+        pytest.param([], id="empty"),
+        pytest.param([{"a": 1, "b": 2}, {"b": 4, "a": 3}], id="same keys"),
+        pytest.param([{"a": 1}, {"a": 2, "b": 3}, {"b": 4}], id="different keys"),
+    ),
+)
+def test_to_columns(records):
+    actual = transformers.to_columns(records)
+    expected = merge_with(list, *records)
+
+    assert actual == expected
+
+
+@pytest.mark.parametrize(
+    ["column", "expected_shape"],
+    (
+        ([1, 2, 3], (3,)),
+        ([[1], [2]], (2,)),
+        ([[[1, 2]]], (1, 2)),
+        ([[1]], (1,)),
+    ),
+)
+def test_squeeze_column(column, expected_shape):
+    actual = transformers.squeeze_column(column)
+
+    assert actual.shape == expected_shape
+
+
+def test_extract_nested_array_single_entry():
+    obj = [{"@pole": "HH", "@beam": "S1", "$": 1.5}]
+
+    actual = transformers.extract_nested_array(obj, dims="pole")
+
+    assert actual.attrs == {"pole": "HH", "beam": "S1"}
+    np.testing.assert_equal(actual.values, [1.5])
+
+
+def test_extract_nested_dataset_single_entry():
+    obj = [{"@beam": "S1", "pulseRepetitionFrequency": {"@units": "Hz", "$": 2600.0}}]
+
+    actual = transformers.extract_nested_dataset(obj)
+
+    assert actual.attrs == {"beam": "S1"}
+    assert actual["pulseRepetitionFrequency"].dims == ()
+    assert actual["pulseRepetitionFrequency"].attrs == {"units": "Hz"}
+    assert actual["pulseRepetitionFrequency"].item() == 2600.0
@@ -0,0 +1,132 @@
+import collections
+
+import fsspec
+import pytest
+
+from safe_rcm import profiling, xml
+from safe_rcm.api import open_rcm
+from safe_rcm.tests import synthetic
+
+
+def test_stage_disabled():
+    assert profiling.current_profile() is None
+
+    with profiling.stage("a"):
+        profiling.record_request("cat_file", "a", 10)
+
+
+def test_profile():
+    with profiling.profile() as profile:
+        assert profiling.current_profile() is profile
+
+        with profiling.stage("a"):
+            profiling.record_request("cat_file", "a", 10)
+            with profiling.stage("b"):
+                profiling.record_request("cat_file", "b", 5)
+            with profiling.stage("b"):
+                pass
+
+        with profiling.stage("c"):
+            pass
+
+    assert profiling.current_profile() is None
+    assert (profile.requests, profile.bytes) == (2, 15)
+
+    report = profile.report()
+    assert list(report.index) == ["a", "a > b", "c"]
+    assert report.loc["a", "requests"] == 2
+    assert report.loc["a > b"].to_dict() == {
+        "calls": 2,
+        "time": pytest.approx(report.loc["a > b", "time"]),
+        "requests": 1,
+        "bytes": 5,
+    }
+
+    # stops recording once the context exits
+    profile.record_request("cat_file", "c", 10)
+    assert profile.requests == 2
+
+
+def test_recording_filesystem():
+    fs = fsspec.filesystem("memory")
+    fs.pipe("/profiling/a.txt", b"abcdef")
+
+    with profiling.profile() as profile:
+        recording = profiling.RecordingFileSystem(fs, profile)
+        mapper = fsspec.FSMap("/profiling", recording)
+
+        assert mapper["a.txt"] == b"abcdef"
+        assert recording.exists("/profiling/a.txt")
+        with recording.open("/profiling/a.txt") as f:
+            assert f.read(3) == b"abc"
+
+    assert (profile.requests, profile.bytes) == (4, 9)
+
+
+@pytest.fixture(scope="module")
+def product(tmp_path_factory):
+    path = tmp_path_factory.mktemp("products") / "RCM_profiled"
+
+    return synthetic.generate_product(str(path), shape=(64, 64), tile_size=None)
+
+
+def test_open_rcm_profile(product):
+    tree = open_rcm(product, profile=True)
+    profile = tree.encoding["profile"]
+
+    report = profile.report()
+    stages = list(report.index)
+
+    assert stages[0] == "open_rcm"
+    assert "open_rcm > metadata > manifest" in stages
+    assert "open_rcm > metadata > product > /sourceAttributes" in stages
+    assert "open_rcm > metadata > /lookupTables/noiseLevels" in stages
+    assert "open_rcm > imagery" in stages
+
+    assert report.loc["open_rcm", "requests"] == profile.requests > 0
+    assert report.loc["open_rcm", "bytes"] == profile.bytes > 0
+    assert report.loc["open_rcm > imagery", "bytes"] > 0
+
+    assert "profile" not in open_rcm(product).encoding
+
+
+def test_open_rcm_requests(product):
+    cache = xml.DocumentCache()
+
+    mapper = fsspec.get_mapper(product)
+    metadata_files = [
+        path for path in mapper if path.endswith((".safe", ".xml", ".xsd"))
+    ]
+
+    with profiling.profile() as profile:
+        open_rcm(product, document_cache=cache)
+
+    requests = collections.Counter(
+        (request.method, request.path) for request in profile.log
+    )
+    methods = collections.Counter(request.method for request in profile.log)
+
+    # every file is fetched at most once, and only the metadata is fetched
+    fetched = [path for method, path in requests if method == "cat_file"]
+    assert max(requests[("cat_file", path)] for path in fetched) == 1
+    assert len(fetched) <= len(metadata_files)
+
+    # a single listing instead of probing files
+    assert methods["exists"] == methods["isfile"] == 0
+    assert methods["find"] <= 1
+    assert methods["ls"] <= 1
+
+    # the versions of the documents are taken from the listing
+    assert methods["info"] == 0
+    # the images, once for the metadata and once to read the data
+    assert methods["open"] == 2 * 2
+
+    # the document cache avoids fetching the metadata again
+    with profiling.profile() as profile:
+        open_rcm(product, document_cache=cache)
+
+    assert not any(
+        request.path.endswith((".xml", ".xsd"))
+        for request in profile.log
+        if request.method == "cat_file"
+    )
@@ -0,0 +1,82 @@
+import time
+
+import fsspec
+import pytest
+
+from safe_rcm.api import open_rcm
+from safe_rcm.manifest import read_checksums
+from safe_rcm.tests import synthetic
+
+
+@pytest.fixture(scope="module")
+def product(tmp_path_factory):
+    path = tmp_path_factory.mktemp("products") / "RCM_synthetic"
+
+    return synthetic.generate_product(
+        str(path),
+        poles=("HH", "HV", "VV"),
+        shape=(300, 200),
+        tile_size=128,
+        lut_length=20,
+        tie_points=(4, 5),
+        n_bursts=2,
+    )
+
+
+def test_generate_product(product):
+    tree = open_rcm(product)
+
+    assert tree["imagery"].sizes == {"pole": 3, "band": 1, "y": 300, "x": 200}
+    assert tree["imagery/band_data"].encoding["preferred_chunks"]["y"] == 128
+    assert tree["lookupTables/lookupTables"].sizes["coefficients"] == 20
+    grid = tree["imageReferenceAttributes/geographicInformation/geolocationGrid"]
+    assert grid.to_dataset(inherit=False).sizes == {"line": 4, "pixel": 5}
+    noise_levels = tree["lookupTables/noiseLevels/referenceNoiseLevel"]
+    assert list(noise_levels["pole"].values) == ["HH", "HV", "VV"]
+
+
+@pytest.mark.parametrize("n_beams", (1, 2, 4))
+def test_generate_product_beams(tmp_path, n_beams):
+    url = synthetic.generate_product(
+        str(tmp_path / "RCM"), shape=(32, 32), tile_size=None, n_beams=n_beams
+    )
+
+    tree = open_rcm(url, chunks="bursts")
+
+    beams = synthetic.beam_names(n_beams)
+    assert tree["sourceAttributes/radarParameters"].attrs["beams"] == " ".join(beams)
+    assert list(tree["grdBurstMap"]["beam"].values) == beams
+    prf = tree["sourceAttributes/radarParameters/prfInformation"]
+    if n_beams == 1:
+        # the parameters of a single beam are not indexed by beam
+        assert prf.attrs["beam"] == "S1"
+        assert prf["pulseRepetitionFrequency"].dims == ()
+    else:
+        assert list(prf["beam"].values) == beams
+    assert tree["imagery/band_data"].compute().notnull().all()
+
+
+def test_generate_product_checksums(product):
+    mapper = fsspec.get_mapper(product)
+    checksums = read_checksums(mapper, "manifest.safe")
+
+    assert "imagery/RCM_synthetic_HH.tif" in checksums
+    assert all(size == len(mapper[path]) for path, (_, _, size) in checksums.items())
+
+
+def test_latency_filesystem(product):
+    fs = fsspec.filesystem("latency", delay=0.05)
+    path = f"{product}/manifest.safe"
+    expected = fsspec.filesystem("file").cat_file(path)
+
+    start = time.perf_counter()
+    actual = fs.cat_file(f"latency://{path}")
+    assert time.perf_counter() - start >= 0.05
+    assert actual == expected
+
+    with fs.open(path, block_size=1024) as f:
+        f.seek(10)
+        assert f.read(100) == expected[10:110]
+
+    with pytest.raises(NotImplementedError):
+        fs.open(path, mode="wb")
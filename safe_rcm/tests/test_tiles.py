@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from safe_rcm import tiles
+from safe_rcm.api import open_rcm
+from safe_rcm.calibrations import calibrate
+from safe_rcm.tests import synthetic
+
+
+@pytest.fixture(scope="module")
+def product(tmp_path_factory):
+    path = tmp_path_factory.mktemp("tiles") / "RCM"
+
+    return synthetic.generate_product(
+        str(path), shape=(48, 40), tile_size=None, lut_length=8
+    )
+
+
+@pytest.mark.parametrize(
+    ["shape", "size", "overlap", "expected"],
+    (
+        pytest.param((32, 32), 16, 0, ([0, 0, 16, 16], [0, 16, 0, 16]), id="exact"),
+        pytest.param(
+            (32, 40),
+            (16, 16),
+            0,
+            ([0, 0, 0, 16, 16, 16], [0, 16, 24] * 2),
+            id="shifted",
+        ),
+        pytest.param(
+            (32, 24), 16, (8, 4), ([0, 0, 8, 8, 16, 16], [0, 8] * 3), id="overlap"
+        ),
+        pytest.param((8, 40), 16, 0, ([0, 0, 0], [0, 16, 24]), id="small"),
+    ),
+)
+def test_tile_windows(shape, size, overlap, expected):
+    windows = tiles.tile_windows(shape, size, overlap)
+
+    assert [window["y"].start for window in windows] == expected[0]
+    assert [window["x"].start for window in windows] == expected[1]
+    size = tiles._pair(size)
+    assert all(
+        window["y"].stop - window["y"].start == min(size[0], shape[0])
+        and window["x"].stop - window["x"].start == min(size[1], shape[1])
+        for window in windows
+    )
+
+
+@pytest.mark.parametrize(
+    ["size", "overlap"], ((0, 0), (16, 16), (16, -1), ((16, 8), (4, 8)))
+)
+def test_tile_windows_invalid(size, overlap):
+    with pytest.raises(ValueError):
+        tiles.tile_windows((32, 32), size, overlap)
+
+
+@pytest.mark.parametrize("calibration_type", (None, "Sigma Nought"))
+def test_iter_tiles(product, calibration_type):
+    tree = open_rcm(product)
+
+    actual = list(
+        tiles.iter_tiles(tree, size=(20, 16), overlap=4, calibrate=calibration_type)
+    )
+
+    imagery = tree["imagery/band_data"]
+    if calibration_type is not None:
+        imagery = calibrate(tree, calibration_type)
+    expected = imagery.isel(band=0).transpose("pole", "y", "x").values
+
+    assert len(actual) == 9
+    for tile in actual:
+        np.testing.assert_allclose(
+            tile.data, expected[:, tile.window["y"], tile.window["x"]], rtol=1e-6
+        )
+        assert tile.latitude.shape == tile.data.shape[1:]
+        assert tile.longitude.shape == tile.data.shape[1:]
+        assert tile.incidence.shape == tile.data.shape[1:]
+
+
+def test_iter_tiles_geolocation(product):
+    pytest.importorskip("scipy")
+
+    tree = open_rcm(product)
+    grid = tree[
+        "imageReferenceAttributes/geographicInformation/geolocationGrid"
+    ].to_dataset()
+    angles = tree["lookupTables/incidenceAngles"]
+
+    (tile,) = tiles.iter_tiles(tree, size=(48, 40))
+
+    expected = grid.interp(line=np.arange(48), pixel=np.arange(40))
+    np.testing.assert_allclose(tile.latitude, expected["latitude"].values)
+    np.testing.assert_allclose(tile.longitude, expected["longitude"].values)
+    np.testing.assert_allclose(tile.incidence[0, 0], angles["angles"].values[0])
+    assert np.all(np.diff(tile.incidence, axis=1) >= 0)
+
+
+def test_iter_tiles_without_metadata(product):
+    tree = xr.DataTree.from_dict(
+        {"/imagery": open_rcm(product, group="/imagery").to_dataset()}
+    )
+
+    tile = next(tiles.iter_tiles(tree, size=16))
+
+    assert tile.data.shape == (2, 16, 16)
+    assert tile.latitude is None and tile.longitude is None
+    assert tile.incidence is None
+
+
+@pytest.mark.parametrize("prefetch", (0, 2))
+def test_iter_tiles_prefetch(product, monkeypatch, prefetch):
+    tree = open_rcm(product)
+    reads = []
+    read = tiles.TileReader.read
+
+    def record(self, window):
+        reads.append(window)
+        return read(self, window)
+
+    monkeypatch.setattr(tiles.TileReader, "read", record)
+
+    iterator = tiles.iter_tiles(tree, size=8, prefetch=prefetch)
+    next(iterator)
+    # cancels the windows that were not started yet
+    iterator.close()
+
+    # 30 windows, of which at most the first and the prefetched ones are read
+    assert 1 <= len(reads) <= prefetch + 1
+
+    with pytest.raises(ValueError, match="prefetch"):
+        tiles.iter_tiles(tree, prefetch=-1)
+
+
+def test_iter_tiles_antimeridian():
+    imagery = xr.Dataset(
+        {"band_data": (["pole", "band", "y", "x"], np.ones((1, 1, 4, 5)))},
+        coords={"pole": ["HH"]},
+    )
+    grid = xr.Dataset(
+        {
+            "latitude": (["line", "pixel"], np.zeros((2, 2))),
+            "longitude": (["line", "pixel"], [[179.0, -179.0], [179.0, -179.0]]),
+        },
+        coords={"line": [0.0, 3.0], "pixel": [0.0, 4.0]},
+    )
+    tree = xr.DataTree.from_dict(
+        {"/imagery": imagery, tiles.geolocation_grid_path: grid}
+    )
+
+    tile = next(tiles.iter_tiles(tree, size=4))
+
+    np.testing.assert_allclose(tile.longitude[0], [179.0, 179.5, -180.0, -179.5])
@@ -261,6 +261,45 @@ def test_schema_paths(schema_paths_setup):
     assert actual == expected
 
 
+class CountingMapping(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetched = collections.Counter()
+
+    def __getitem__(self, key):
+        self.fetched[key] += 1
+        return super().__getitem__(key)
+
+
+def test_schema_texts(schema_paths_setup):
+    mapping = CountingMapping(schema_paths_setup.mapper)
+
+    actual = xml.schema_texts(mapping, schema_paths_setup.path)
+
+    assert list(actual) == schema_paths_setup.expected
+    assert all(count == 1 for count in mapping.fetched.values())
+
+
+def test_schema_cache(schema_setup):
+    _, mapper = schema_setup
+    mapping = CountingMapping(mapper)
+    # includes the same file as `schema2.xsd`
+    mapping["schemas/other.xsd"] = mapping["schemas/schema2.xsd"]
+    mapping.fetched.clear()
+
+    with xml.schema_cache():
+        first = xml.open_schema(mapping, "schemas/root.xsd")
+        with xml.schema_cache():
+            assert xml.open_schema(mapping, "schemas/root.xsd") is first
+        xml.open_schema(mapping, "schemas/other.xsd")
+
+    # files shared between schemas are only fetched once
+    assert all(count == 1 for count in mapping.fetched.values())
+
+    xml.open_schema(mapping, "schemas/root.xsd")
+    assert mapping.fetched["schemas/root.xsd"] == 2
+
+
 def test_open_schemas(schema_content_setup):
     container = schema_content_setup
     actual = xml.open_schema(container.mapper, container.path)
@@ -269,9 +308,134 @@ def test_open_schemas(schema_content_setup):
     assert extract_schema_properties(actual) == expected
 
 
+def test_open_schema_cached(schema_setup):
+    _, mapper = schema_setup
+
+    first = xml.open_schema(mapper, "schemas/root.xsd")
+    assert xml.open_schema(mapper, "schemas/root.xsd") is first
+
+    # same content in a different location
+    copied = {
+        path.replace("schemas/", "copy/"): value for path, value in mapper.items()
+    }
+    assert xml.open_schema(copied, "copy/root.xsd") is first
+
+    # different content
+    mapper["schemas/root.xsd"] = mapper["schemas/root.xsd"] + b"\n"
+    assert xml.open_schema(mapper, "schemas/root.xsd") is not first
+
+
 def test_read_xml(data_file_setup):
     container = data_file_setup
 
     actual = xml.read_xml(container.mapper, container.path)
 
     assert actual == container.expected
+
+
+def test_document_cache():
+    cache = xml.DocumentCache(max_size=150)
+    document = {"a": [1, 2, 3], "b": {"c": "d"}}
+
+    cache.put("key1", document)
+    document["a"].append(4)
+
+    actual = cache.get("key1")
+    assert actual == {"a": [1, 2, 3], "b": {"c": "d"}}
+
+    # lookups return copies
+    actual["b"]["c"] = "e"
+    assert cache.get("key1") == {"a": [1, 2, 3], "b": {"c": "d"}}
+    assert cache.get("key2") is None
+
+    # least recently used entries are evicted once the budget is exceeded
+    cache.put("key2", {"a": "x" * 50})
+    cache.get("key1")
+    cache.put("key3", {"a": "y" * 50})
+    assert "key1" in cache
+    assert "key2" not in cache
+    assert cache.size <= cache.max_size
+
+    # too large
+    cache.put("key4", {"a": "z" * 500})
+    assert "key4" not in cache
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_read_xml_cached(data_file_setup):
+    container = data_file_setup
+    cache = xml.DocumentCache()
+
+    with xml.document_caching(cache):
+        first = xml.read_xml(container.mapper, container.path)
+        assert len(cache) == 1
+
+        first["count"] = 4
+        assert xml.read_xml(container.mapper, container.path) == container.expected
+
+        # modified files are decoded again
+        modified = container.mapper[container.path].replace(
+            b"<count>3</count>", b"<count>5</count>"
+        )
+        container.mapper[container.path] = modified
+
+        actual = xml.read_xml(container.mapper, container.path)
+        assert actual["count"] == 5
+        assert len(cache) == 2
+
+
+@pytest.mark.parametrize("enabled", [False, None, xml.DocumentCache(max_size=0)])
+def test_read_xml_cache_disabled(data_file_setup, monkeypatch, enabled):
+    container = data_file_setup
+    cache = xml.DocumentCache()
+    monkeypatch.setattr(xml, "document_cache", cache)
+
+    # disabled by default
+    xml.read_xml(container.mapper, container.path)
+    with xml.document_caching(enabled):
+        xml.read_xml(container.mapper, container.path)
+    assert len(cache) == 0
+
+    with xml.document_caching(True):
+        xml.read_xml(container.mapper, container.path)
+    assert len(cache) == 1
+
+
+def test_read_xml_uncached_mapping(data_file_setup):
+    container = data_file_setup
+    cache = xml.DocumentCache()
+
+    mapping = dict(container.mapper)
+    with xml.document_caching(cache):
+        assert xml.read_xml(mapping, container.path) == container.expected
+    assert len(cache) == 0
+
+
+def test_read_xml_cached_listing(data_file_setup, monkeypatch):
+    container = data_file_setup
+    cache = xml.DocumentCache()
+
+    def info(path, **kwargs):
+        raise AssertionError(f"unexpected info request for {path}")
+
+    monkeypatch.setattr(container.mapper.fs, "info", info)
+
+    listing = {container.path: {"size": 10, "created": "1"}}
+    with xml.document_caching(cache), xml.file_listing(container.mapper, listing):
+        assert xml.read_xml(container.mapper, container.path) == container.expected
+        assert xml.read_xml(container.mapper, container.path) == container.expected
+    assert len(cache) == 1
+
+    # the version is taken from the listing
+    listing = {container.path: {"size": 10, "created": "2"}}
+    with xml.document_caching(cache), xml.file_listing(container.mapper, listing):
+        xml.read_xml(container.mapper, container.path)
+    assert len(cache) == 2
+
+    # files missing from the listing are not cached
+    with xml.file_listing(container.mapper, {}):
+        assert xml.read_xml(container.mapper, container.path) == container.expected
+    assert len(cache) == 2
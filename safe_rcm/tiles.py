@@ -0,0 +1,265 @@
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from safe_rcm import calibrations
+from safe_rcm.geolocation import geolocation_grid_path
+
+incidence_angles_path = "/lookupTables/incidenceAngles"
+
+Tile = namedtuple("Tile", ["window", "data", "latitude", "longitude", "incidence"])
+
+
+def _pair(value):
+    if np.ndim(value) == 0:
+        return int(value), int(value)
+
+    first, second = value
+
+    return int(first), int(second)
+
+
+def _starts(length, size, step):
+    if length <= size:
+        return [0]
+
+    starts = list(range(0, length - size + 1, step))
+    if starts[-1] + size < length:
+        # shift the last window inwards instead of truncating it
+        starts.append(length - size)
+
+    return starts
+
+
+def tile_windows(shape, size, overlap=0):
+    """the windows of a tiling of an image
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The shape of the image, as (lines, pixels).
+    size : int or tuple of int
+        The shape of the windows.
+    overlap : int or tuple of int, default: 0
+        The number of lines and pixels shared by neighbouring windows.
+
+    Returns
+    -------
+    list of dict of str to slice
+        The windows, in row-major order, as indexers for ``y`` and ``x``. All
+        windows have the same shape unless the image is smaller than ``size``:
+        the last windows along each dimension are shifted inwards.
+    """
+    size = _pair(size)
+    overlap = _pair(overlap)
+    if any(s <= 0 for s in size):
+        raise ValueError(f"window size must be positive, got {size}")
+    if any(not 0 <= o < s for o, s in zip(overlap, size)):
+        raise ValueError(
+            f"overlap must be non-negative and smaller than the window size, got {overlap}"
+        )
+
+    line_starts, pixel_starts = (
+        _starts(length, s, s - o) for length, s, o in zip(shape, size, overlap)
+    )
+
+    return [
+        {
+            "y": slice(line, min(line + size[0], shape[0])),
+            "x": slice(pixel, min(pixel + size[1], shape[1])),
+        }
+        for line in line_starts
+        for pixel in pixel_starts
+    ]
+
+
+def _interp_weights(points, targets):
+    # indices and weights of the linear interpolation, constant outside of points
+    targets = np.clip(targets, points[0], points[-1])
+    indices = np.clip(np.searchsorted(points, targets, side="right") - 1, 0, None)
+    indices = np.minimum(indices, points.size - 2)
+    weights = (targets - points[indices]) / (points[indices + 1] - points[indices])
+
+    return indices, weights
+
+
+def _interp_rows(values, points, targets):
+    indices, weights = _interp_weights(points, targets)
+
+    return (1 - weights[:, None]) * values[indices] + weights[:, None] * values[
+        indices + 1
+    ]
+
+
+def _interp_profile(values, first, step, pixels):
+    table_pixels = first + step * np.arange(values.size)
+    order = np.argsort(table_pixels)
+
+    return np.interp(pixels, table_pixels[order], values[order])
+
+
+class TileReader:
+    """read windows of a product
+
+    Only profiles along range and the geolocation grid interpolated along
+    range are kept in memory, the imagery is read window by window.
+
+    Parameters
+    ----------
+    tree : xarray.DataTree
+        The product, as returned by `safe_rcm.open_rcm`.
+    calibrate : str, optional
+        The calibration type, see `safe_rcm.calibrations.calibrate`. By
+        default, the digital numbers are returned.
+    """
+
+    def __init__(self, tree, calibrate=None):
+        imagery = tree["/imagery/band_data"]
+        if "band" in imagery.dims:
+            imagery = imagery.isel(band=0)
+        self.imagery = imagery.transpose("pole", "y", "x")
+        self.shape = (self.imagery.sizes["y"], self.imagery.sizes["x"])
+        pixels = np.arange(self.shape[1])
+
+        self.gains = None
+        self.offset = 0.0
+        if calibrate is not None:
+            lookup_tables = tree["/lookupTables/lookupTables/lookup_tables"].sel(
+                sarCalibrationType=calibrate, pole=self.imagery["pole"].values
+            )
+            self.gains = (
+                calibrations.interpolate_gains(lookup_tables, pixels)
+                .transpose("pole", "x")
+                .values
+            )
+            self.offset = lookup_tables.attrs.get("offset", 0.0)
+
+        self.incidence = None
+        if incidence_angles_path in tree.groups:
+            node = tree[incidence_angles_path]
+            self.incidence = _interp_profile(
+                np.asarray(node["angles"], dtype="float64"),
+                node.attrs["pixelFirstAnglesValue"],
+                node.attrs["stepSize"],
+                pixels,
+            )
+
+        self.tie_lines = None
+        if geolocation_grid_path in tree.groups:
+            grid = tree[geolocation_grid_path]
+            tie_pixels = np.asarray(grid["pixel"], dtype="float64")
+            latitude = np.asarray(
+                grid["latitude"].transpose("line", "pixel"), dtype="float64"
+            )
+            # unwrap to interpolate across the antimeridian
+            longitude = np.unwrap(
+                np.unwrap(
+                    np.asarray(
+                        grid["longitude"].transpose("line", "pixel"), dtype="float64"
+                    ),
+                    period=360,
+                    axis=1,
+                ),
+                period=360,
+                axis=0,
+            )
+            self.tie_lines = np.asarray(grid["line"], dtype="float64")
+            # interpolated along range once, along azimuth per window
+            self.latitude = _interp_rows(latitude.T, tie_pixels, pixels).T
+            self.longitude = _interp_rows(longitude.T, tie_pixels, pixels).T
+
+    def _geolocate(self, window):
+        if self.tie_lines is None:
+            return None, None
+
+        lines = np.arange(window["y"].start, window["y"].stop)
+        latitude, longitude = (
+            _interp_rows(values[:, window["x"]], self.tie_lines, lines)
+            for values in (self.latitude, self.longitude)
+        )
+
+        return latitude, (longitude + 180) % 360 - 180
+
+    def read(self, window):
+        """read a single window
+
+        Parameters
+        ----------
+        window : dict of str to slice
+            The window, as returned by `tile_windows`.
+
+        Returns
+        -------
+        Tile
+            The window, the data along ``pole``, ``y`` and ``x``, the
+            latitude, longitude and incidence angle of each pixel in degrees.
+            The geolocation and the incidence angle are ``None`` if the nodes
+            are not part of the product.
+        """
+        data = self.imagery.isel(window).values
+        if self.gains is not None:
+            dtype = data.dtype if np.issubdtype(data.dtype, np.floating) else "float32"
+            data = (
+                (data.astype(dtype) ** 2 + self.offset)
+                / self.gains[:, None, window["x"]]
+            ).astype(dtype)
+
+        latitude, longitude = self._geolocate(window)
+        incidence = None
+        if self.incidence is not None:
+            incidence = np.broadcast_to(self.incidence[window["x"]], data.shape[1:])
+
+        return Tile(window, data, latitude, longitude, incidence)
+
+
+def _prefetched(read, windows, prefetch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    pending = deque()
+    try:
+        for window in windows:
+            pending.append(executor.submit(read, window))
+            if len(pending) > prefetch:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_tiles(tree, size=(512, 512), overlap=0, calibrate=None, prefetch=2):
+    """iterate over the windows of a product
+
+    The windows are read once each, in row-major order, on a background
+    thread. At most ``prefetch + 1`` windows are held in memory by the
+    iterator, independent of the size of the scene.
+
+    Parameters
+    ----------
+    tree : xarray.DataTree
+        The product, as returned by `safe_rcm.open_rcm`.
+    size : int or tuple of int, default: (512, 512)
+        The shape of the windows, as (lines, pixels).
+    overlap : int or tuple of int, default: 0
+        The number of lines and pixels shared by neighbouring windows.
+    calibrate : str, optional
+        If given, return calibrated values of this type instead of digital
+        numbers, see `safe_rcm.calibrations.calibrate`.
+    prefetch : int, default: 2
+        The number of windows to read ahead.
+
+    Returns
+    -------
+    iterator of Tile
+        The window, the data along ``pole``, ``y`` and ``x``, the latitude,
+        longitude and incidence angle of each pixel. Closing the iterator
+        cancels the windows that were not read yet.
+    """
+    if prefetch < 0:
+        raise ValueError(f"prefetch must be non-negative, got {prefetch}")
+
+    reader = TileReader(tree, calibrate=calibrate)
+    windows = tile_windows(reader.shape, size, overlap)
+
+    return _prefetched(reader.read, windows, prefetch)
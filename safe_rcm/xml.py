@@ -1,14 +1,178 @@
+import contextlib
+import contextvars
+import hashlib
 import io
+import pickle
 import posixpath
 import re
-from collections import deque
+import threading
+from collections import OrderedDict, deque
 
-import xmlschema
+from fsspec.mapping import FSMap
 from lxml import etree
 from tlz.dicttoolz import keymap
 
+from safe_rcm.profiling import stage
+
 include_re = re.compile(r'\s*<xsd:include schemaLocation="(?P<location>[^"/]+)"\s?/>')
 
+# parsed schemas, shared between products with identical schema files
+max_cached_schemas = 16
+_schemas = OrderedDict()
+_schemas_lock = threading.Lock()
+
+# files and schemas opened within `schema_cache`, by mapper
+_opened_schemas = contextvars.ContextVar("opened_schemas", default=None)
+
+# file info entries of a listing, by absolute path, see `file_listing`
+_listed_files = contextvars.ContextVar("listed_files", default=None)
+
+# the cache of decoded documents, see `document_caching`
+_active_document_cache = contextvars.ContextVar("document_cache", default=None)
+
+# file info entries that identify a version of a file
+version_fields = (
+    "ETag",
+    "etag",
+    "mtime",
+    "LastModified",
+    "last_modified",
+    "updated",
+    "created",
+)
+
+
+class DocumentCache:
+    """in-memory LRU cache of decoded xml documents
+
+    Only used within `document_caching`, e.g. by passing ``document_cache`` to
+    `safe_rcm.open_rcm`. Documents are stored pickled, such that every lookup returns a new copy
+    that can be freely modified by the caller. The size of the pickled data is
+    used for the memory budget.
+
+    Parameters
+    ----------
+    max_size : int, default: 256 MiB
+        The memory budget, in bytes. Set to 0 to disable the cache.
+    """
+
+    def __init__(self, max_size=256 * 2**20):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @staticmethod
+    def key(mapper, path):
+        """the cache key of a document
+
+        Parameters
+        ----------
+        mapper : fsspec.FSMap
+            The mapper containing the document.
+        path : str
+            The path of the document, relative to the mapper root.
+
+        Returns
+        -------
+        tuple or None
+            The protocol, the absolute path, and the version of the file. ``None``
+            if the document can't be identified.
+
+        Notes
+        -----
+        Within `file_listing`, the version is taken from the listing. Otherwise,
+        it is requested from the filesystem.
+        """
+        if not isinstance(mapper, FSMap):
+            return None
+
+        fs = mapper.fs
+        full_path = mapper._key_to_str(path)
+        listed = _listed_files.get()
+        if listed is not None:
+            info = listed.get(full_path)
+            if info is None:
+                return None
+        else:
+            try:
+                info = fs.info(full_path)
+            except (FileNotFoundError, OSError):
+                return None
+
+        version = tuple(
+            (name, str(info[name])) for name in version_fields if name in info
+        )
+        if not version:
+            return None
+
+        protocol = fs.protocol if isinstance(fs.protocol, str) else fs.protocol[0]
+
+        return protocol, full_path, version + (("size", info.get("size")),)
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                return None
+            self._entries.move_to_end(key)
+
+        return pickle.loads(data)
+
+    def put(self, key, decoded):
+        data = pickle.dumps(decoded, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_size:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+
+            self._entries[key] = data
+            self.size += len(data)
+
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+# shared by all calls that enable the document cache without passing one
+document_cache = DocumentCache()
+
+
+@contextlib.contextmanager
+def document_caching(cache):
+    """cache the documents decoded by `read_xml` while the context is active
+
+    Parameters
+    ----------
+    cache : DocumentCache or bool or None
+        The cache. ``True`` uses the shared `document_cache`, ``False`` and
+        ``None`` disable caching.
+    """
+    if cache is True:
+        cache = document_cache
+    elif cache is False:
+        cache = None
+
+    token = _active_document_cache.set(cache)
+    try:
+        yield
+    finally:
+        _active_document_cache.reset(token)
+
 
 def remove_includes(text):
     return include_re.sub("", text)
@@ -25,23 +189,61 @@ def normalize(root, path):
     return posixpath.join(root, path)
 
 
-def schema_paths(mapper, root_schema):
+def schema_texts(mapper, root_schema):
+    """fetch a schema and all the schemas it includes
+
+    Parameters
+    ----------
+    mapper : mapping
+        The mapper containing the schema files.
+    root_schema : str
+        The path of the schema, relative to the mapper root.
+
+    Returns
+    -------
+    dict of str to str
+        The text of each schema file, in breadth-first order. Every file is
+        fetched once.
+    """
     unvisited = deque([root_schema])
-    visited = []
+    texts = {}
     while unvisited:
         path = unvisited.popleft()
-        if path not in visited:
-            visited.append(path)
+        if path in texts:
+            continue
 
         text = mapper[path].decode()
-        includes = extract_includes(text)
+        texts[path] = text
 
         current_root = posixpath.dirname(path)
-        normalized = [normalize(current_root, p) for p in includes]
+        normalized = [normalize(current_root, p) for p in extract_includes(text)]
 
-        unvisited.extend([p for p in normalized if p not in visited])
+        unvisited.extend([p for p in normalized if p not in texts])
 
-    return visited
+    return texts
+
+
+def schema_paths(mapper, root_schema):
+    return list(schema_texts(mapper, root_schema))
+
+
+@contextlib.contextmanager
+def schema_cache():
+    """reuse opened schemas while the context is active
+
+    Within the context, `open_schema` fetches the files of each schema at most
+    once per mapper. The mappers must not be modified while the context is
+    active. Nested contexts share the cache of the outermost context.
+    """
+    if _opened_schemas.get() is not None:
+        yield
+        return
+
+    token = _opened_schemas.set({})
+    try:
+        yield
+    finally:
+        _opened_schemas.reset(token)
 
 
 def open_schema(mapper, schema):
@@ -49,29 +251,117 @@ def open_schema(mapper, schema):
 
     Parameters
     ----------
-    fs : fsspec.filesystem
-        pre-instantiated fsspec filesystem instance
-    root : str
-        URL of the root directory of the schema files
-    name : str
-        File name of the schema to open.
-    glob : str, default: "*.xsd"
-        The glob used to find other schema files
+    mapper : mapping
+        The mapper containing the schema files.
+    schema : str
+        The path of the schema to open, relative to the mapper root. Included
+        schemas are resolved relative to this path.
 
     Returns
     -------
     xmlschema.XMLSchema
         The opened schema object
     """
-    paths = schema_paths(mapper, schema)
-    preprocessed = [io.StringIO(remove_includes(mapper[p].decode())) for p in paths]
+    opened = _opened_schemas.get()
+    if opened is None:
+        return _open_schema(mapper, schema)
+
+    # keep a reference to the mapper, such that its id is not reused
+    _, files, schemas = opened.setdefault(id(mapper), (mapper, {}, {}))
+    if schema not in schemas:
+        schemas[schema] = _open_schema(_FileCache(mapper, files), schema)
+
+    return schemas[schema]
+
+
+class _FileCache:
+    # fetch each file once, even if it is included by multiple schemas
+    def __init__(self, mapper, files):
+        self.mapper = mapper
+        self.files = files
+
+    def __getitem__(self, path):
+        data = self.files.get(path)
+        if data is None:
+            data = self.files[path] = self.mapper[path]
+
+        return data
+
 
-    return xmlschema.XMLSchema(preprocessed)
+def _open_schema(mapper, schema):
+    # importing xmlschema is slow, so defer it until it is needed
+    import xmlschema
+
+    texts = [remove_includes(text) for text in schema_texts(mapper, schema).values()]
+
+    # parsing the schema is expensive, so cache by the content of the files
+    key = hashlib.sha256("\0".join(texts).encode()).hexdigest()
+    with _schemas_lock:
+        cached = _schemas.get(key)
+        if cached is not None:
+            _schemas.move_to_end(key)
+            return cached
+
+    parsed = xmlschema.XMLSchema([io.StringIO(text) for text in texts])
+
+    with _schemas_lock:
+        _schemas[key] = parsed
+        while len(_schemas) > max_cached_schemas:
+            _schemas.popitem(last=False)
+
+    return parsed
+
+
+@contextlib.contextmanager
+def file_listing(mapper, infos):
+    """identify documents by a listing while the context is active
+
+    Within the context, the document cache takes the version of the files of
+    ``mapper`` from ``infos`` instead of requesting it from the filesystem.
+    Files that are not part of the listing are not cached.
+
+    Parameters
+    ----------
+    mapper : mapping
+        The mapper the listing was made from.
+    infos : dict of str to dict
+        The info entries of the files, by path relative to the mapper root, as
+        returned by ``fs.find(..., detail=True)``.
+    """
+    listed = dict(_listed_files.get() or {})
+    if isinstance(mapper, FSMap):
+        listed |= {mapper._key_to_str(path): info for path, info in infos.items()}
+
+    token = _listed_files.set(listed)
+    try:
+        yield
+    finally:
+        _listed_files.reset(token)
 
 
 def read_xml(mapper, path):
-    raw_data = mapper[path]
-    tree = etree.fromstring(raw_data)
+    with stage(path):
+        cache = _active_document_cache.get()
+        key = cache.key(mapper, path) if cache is not None and cache.max_size else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        decoded = _read_xml(mapper, path)
+
+        if key is not None:
+            cache.put(key, decoded)
+
+    return decoded
+
+
+def _read_xml(mapper, path):
+    with stage("fetch"):
+        raw_data = mapper[path]
+
+    with stage("parse"):
+        tree = etree.fromstring(raw_data)
 
     namespaces = keymap(lambda x: x if x is not None else "rcm", tree.nsmap)
     schema_location = tree.xpath("./@xsi:schemaLocation", namespaces=namespaces)[0]
@@ -80,8 +370,10 @@ def read_xml(mapper, path):
     schema_path = posixpath.normpath(
         posixpath.join(posixpath.dirname(path), schema_path_)
     )
-    schema = open_schema(mapper, schema_path)
+    with stage("schema"):
+        schema = open_schema(mapper, schema_path)
 
-    decoded = schema.decode(tree)
+    with stage("decode"):
+        decoded = schema.decode(tree)
 
     return decoded